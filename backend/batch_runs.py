@@ -0,0 +1,151 @@
+from typing import Dict, Any, List, Optional, TextIO
+from sqlalchemy import String
+from models import Task
+import json
+import csv
+import re
+import os
+
+# Records a single batch run may take
+BATCH_MAX_RECORDS = int(os.getenv('BATCH_MAX_RECORDS', 100000))
+# Records run at once when the request doesn't say; high enough that
+# batching integrations (CRM, Sheets) see many records per flush window
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 50))
+RECORD_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv"
+}
+RECORD_EXTENSIONS = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+
+# {{field}}, or {{field.nested}} for JSON records
+TEMPLATE = re.compile(r"\{\{\s*([^{}\s]+)\s*\}\}")
+# Task columns that may hold templates, besides config
+TEMPLATE_FIELDS = tuple(
+    column.name for column in Task.__table__.columns
+    if isinstance(column.type, String) and column.name not in ("name", "task_type")
+)
+
+class InvalidRecords(ValueError):
+    """Raised when a batch run's input can't be read as a list of records."""
+
+class TemplateError(ValueError):
+    """Raised when a template refers to a field the record doesn't have."""
+
+def records_format(content_type: Optional[str], filename: Optional[str] = None) -> Optional[str]:
+    """``json``, ``ndjson`` or ``csv`` from an upload's file name or content type; None if neither says."""
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in RECORD_EXTENSIONS:
+            return RECORD_EXTENSIONS[extension]
+    return RECORD_FORMATS.get((content_type or "").split(";", 1)[0].strip().lower())
+
+def _check_count(count: int):
+    if count > BATCH_MAX_RECORDS:
+        raise InvalidRecords(f"A batch run takes at most {BATCH_MAX_RECORDS} records")
+
+def parse_records(source: TextIO, format: str) -> List[Dict[str, Any]]:
+    """Read records from a JSON array of objects, NDJSON or CSV with a header row."""
+    if format == "json":
+        try:
+            records = json.load(source)
+        except ValueError as e:
+            raise InvalidRecords(f"Invalid JSON: {str(e)}")
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise InvalidRecords("Expected a JSON array of objects")
+        _check_count(len(records))
+        return records
+
+    if format == "csv":
+        try:
+            records = []
+            for record in csv.DictReader(source):
+                records.append(record)
+                _check_count(len(records))
+        except csv.Error as e:
+            raise InvalidRecords(f"Invalid CSV: {str(e)}")
+        return records
+
+    records = []
+    for number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise InvalidRecords(f"line {number}: {str(e)}")
+        if not isinstance(record, dict):
+            raise InvalidRecords(f"line {number}: expected a JSON object")
+        records.append(record)
+        _check_count(len(records))
+    return records
+
+def lookup(record: Dict[str, Any], path: str) -> Any:
+    value = record
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            raise TemplateError(f"Record has no field {path}")
+    return value
+
+def render(value: Any, record: Dict[str, Any]) -> Any:
+    """Fill ``{{field}}`` templates in strings, dicts and lists from a record.
+
+    A string that is exactly one template takes the field's value as is, so
+    numbers and objects keep their type; otherwise fields are formatted into
+    the string.
+    """
+    if isinstance(value, str):
+        whole = TEMPLATE.fullmatch(value)
+        if whole:
+            return lookup(record, whole.group(1))
+        return TEMPLATE.sub(lambda match: str(lookup(record, match.group(1))), value)
+    if isinstance(value, dict):
+        return {key: render(item, record) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render(item, record) for item in value]
+    return value
+
+def has_template(value: Any) -> bool:
+    if isinstance(value, str):
+        return TEMPLATE.search(value) is not None
+    if isinstance(value, dict):
+        return any(has_template(item) for item in value.values())
+    if isinstance(value, list):
+        return any(has_template(item) for item in value)
+    return False
+
+class RecordBinder:
+    """Makes a copy of a workflow's tasks with their templates filled from one record.
+
+    Which fields hold templates is worked out once per run; tasks without
+    any are shared by every record instead of copied.
+    """
+
+    def __init__(self, tasks: List[Task]):
+        self.tasks = tasks
+        self.templated = {
+            task.id: [field for field in ("config",) + TEMPLATE_FIELDS if has_template(getattr(task, field))]
+            for task in tasks
+        }
+
+    def bind(self, record: Dict[str, Any]) -> List[Task]:
+        bound = []
+        for task in self.tasks:
+            fields = self.templated[task.id]
+            if not fields:
+                bound.append(task)
+                continue
+            copy = Task(**{column.name: getattr(task, column.name) for column in Task.__table__.columns})
+            for field in fields:
+                value = render(getattr(task, field), record)
+                # Text columns stay text whatever the record holds
+                if field != "config" and value is not None and not isinstance(value, str):
+                    value = str(value)
+                setattr(copy, field, value)
+            bound.append(copy)
+        return bound
\ No newline at end of file
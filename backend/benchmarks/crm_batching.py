@@ -0,0 +1,60 @@
+"""Compare one-call-per-record CRM writes with batched writes.
+
+Submits ``--records`` concurrent contact writes against the local fake CRM
+API, first one REST call per record and then through CRMBatcher, and reports
+round trips and wall time. Run from ``backend/``:
+
+    python -m benchmarks.crm_batching --records 2000 --crm salesforce
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import time
+import os
+
+from fakes.crm_server import FakeCRMServer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--crm", choices=["salesforce", "hubspot"], default="salesforce")
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    fake = FakeCRMServer(latency=args.latency).start()
+    os.environ.update({
+        "SALESFORCE_API_KEY": "bench",
+        "HUBSPOT_API_KEY": "bench",
+        "SALESFORCE_BASE_URL": f"{fake.url}/salesforce",
+        "HUBSPOT_BASE_URL": f"{fake.url}/hubspot"
+    })
+    from services.crm_service import CRMService
+    from services.crm_batcher import CRMBatcher
+
+    service = CRMService()
+    object_type = "Contact" if args.crm == "salesforce" else "contacts"
+    records = [{"LastName": f"Contact {i}", "Email": f"c{i}@example.com"} for i in range(args.records)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        single = list(pool.map(lambda r: service.update_crm(args.crm, object_type, "create", r), records))
+    single_time = time.perf_counter() - start
+    single_calls = len(fake.requests)
+
+    batcher = CRMBatcher(service)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        futures = list(pool.map(lambda r: batcher.submit(args.crm, object_type, "create", r), records))
+        batched = [future.result() for future in futures]
+    batched_time = time.perf_counter() - start
+    batched_calls = len(fake.requests) - single_calls
+    batcher.stop()
+    fake.stop()
+
+    print(f"records: {args.records} ({args.crm})")
+    print(f"one call per record: {single_calls:6d} requests  {single_time:6.2f}s  {sum(single)} ok")
+    print(f"batched:             {batched_calls:6d} requests  {batched_time:6.2f}s  {sum(r['success'] for r in batched)} ok")
+    print(f"batcher: {batcher.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measure per-call CRM latency with and without pooled keep-alive sessions.
+
+Runs against the local fake CRM API, with ``--connect-delay`` standing in for
+the TCP+TLS handshake of a real CRM host. Run from ``backend/``:
+
+    python -m benchmarks.crm_pool --calls 200 --threads 8 --connect-delay 0.05
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import requests
+import time
+import os
+
+from fakes.crm_server import FakeCRMServer
+
+def timed(fn, calls: int, threads: int):
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--connect-delay", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeCRMServer(
+        connect_delay=args.connect_delay,
+        latency=args.latency,
+        error_rate=args.error_rate
+    ).start()
+    os.environ.update({
+        "SALESFORCE_API_KEY": "bench",
+        "SALESFORCE_BASE_URL": f"{fake.url}/salesforce",
+        "CRM_BACKOFF_BASE": "0.01"
+    })
+    from services.crm_service import CRMService
+
+    service = CRMService()
+    url = f"{fake.url}/salesforce/sobjects/Contact"
+    headers = {"Authorization": "Bearer bench"}
+
+    unpooled = timed(lambda i: requests.post(url, headers=headers, json={"LastName": f"n{i}"}), args.calls, args.threads)
+    connections_before = fake.connections
+    pooled = timed(
+        lambda i: service.update_crm("salesforce", "Contact", "create", {"LastName": f"n{i}"}),
+        args.calls,
+        args.threads
+    )
+    fake.stop()
+
+    for label, (elapsed, p50, p95) in (("module-level requests", unpooled), ("pooled CRMService", pooled)):
+        print(f"{label:22s} total {elapsed:6.2f}s  p50 {p50 * 1000:7.1f}ms  p95 {p95 * 1000:7.1f}ms")
+    print(f"connections opened: unpooled {connections_before}, pooled {fake.connections - connections_before}")
+    print(f"metrics: {service.metrics()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Load-test execution history writes against one or more database backends.
+
+For each ``--url`` this seeds a workflow of no-op tasks, submits
+``--executions`` runs from ``--clients`` threads while other threads keep
+reading the execution list, and reports submit, completion and read
+throughput. Each backend runs in its own process because the engine is
+configured from ``DATABASE_URL`` at import time. Run from ``backend/``:
+
+    python -m benchmarks.db_load --url sqlite:////tmp/bench.db \\
+        --url postgresql+psycopg2://postgres@localhost/bench
+
+Use ``SQLITE_JOURNAL_MODE=DELETE`` to compare against SQLite's default
+rollback journal.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import subprocess
+import threading
+import json
+import time
+import sys
+import os
+
+def run_single(args):
+    os.environ["DATABASE_URL"] = args.url
+    from database import SessionLocal, engine
+    from models import Base, Workflow, Task, Execution
+    from execution_engine import ExecutionEngine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    workflow = Workflow(name="db-load", max_concurrency=args.tasks)
+    db.add(workflow)
+    db.flush()
+    for i in range(args.tasks):
+        db.add(Task(workflow_id=workflow.id, name=f"noop {i}", task_type="api_call", config={}, order=0, depends_on=[]))
+    db.commit()
+    workflow_id = workflow.id
+    db.close()
+
+    engine_workers = ExecutionEngine(SessionLocal, max_workers=args.workers, poll_interval=0.05)
+    engine_workers.start()
+
+    stop_reading = threading.Event()
+    reads = []
+
+    def reader():
+        session = SessionLocal()
+        try:
+            while not stop_reading.is_set():
+                start = time.perf_counter()
+                session.query(Execution).order_by(Execution.started_at.desc()).limit(50).all()
+                session.rollback()
+                reads.append(time.perf_counter() - start)
+        finally:
+            session.close()
+
+    def submit(_):
+        session = SessionLocal()
+        try:
+            start = time.perf_counter()
+            engine_workers.submit(session, workflow_id)
+            return time.perf_counter() - start
+        finally:
+            session.close()
+
+    readers = [threading.Thread(target=reader, daemon=True) for _ in range(args.readers)]
+    for thread in readers:
+        thread.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        submit_latencies = sorted(pool.map(submit, range(args.executions)))
+    submitted = time.perf_counter() - start
+
+    session = SessionLocal()
+    while session.query(Execution).filter(Execution.status.in_(["queued", "running"])).count():
+        session.rollback()
+        time.sleep(0.05)
+    completed = time.perf_counter() - start
+    failed = session.query(Execution).filter(Execution.status == "failed").count()
+    session.close()
+
+    stop_reading.set()
+    for thread in readers:
+        thread.join()
+    engine_workers.stop()
+    reads.sort()
+
+    return {
+        "backend": engine.dialect.name,
+        "executions": args.executions,
+        "failed": failed,
+        "submit_per_sec": round(args.executions / submitted, 1),
+        "submit_p95_ms": round(submit_latencies[int(len(submit_latencies) * 0.95) - 1] * 1000, 2),
+        "completed_per_sec": round(args.executions / completed, 1),
+        "reads": len(reads),
+        "read_p95_ms": round(reads[int(len(reads) * 0.95) - 1] * 1000, 2) if reads else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", action="append", help="SQLAlchemy URL; repeat to compare backends")
+    parser.add_argument("--executions", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    urls = args.url or ["sqlite:///./bench_load.db"]
+
+    if args.single:
+        args.url = urls[0]
+        print(json.dumps(run_single(args)))
+        return
+
+    for url in urls:
+        command = [sys.executable, "-m", "benchmarks.db_load", "--single", "--url", url,
+                   "--executions", str(args.executions), "--tasks", str(args.tasks),
+                   "--workers", str(args.workers), "--clients", str(args.clients),
+                   "--readers", str(args.readers)]
+        output = subprocess.run(command, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{url}: failed\n{output.stderr}")
+            continue
+        print(f"{url}: {output.stdout.strip().splitlines()[-1]}")
+
+if __name__ == "__main__":
+    main()
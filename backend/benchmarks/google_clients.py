@@ -0,0 +1,49 @@
+"""Measure per-call client setup overhead in GoogleService.
+
+Compares the old per-call path (unpickle ``token_<type>.pickle`` and build a
+new discovery client) with the cached credentials and per-thread clients.
+No requests are sent to Google; only setup cost is measured. Run from
+``backend/``:
+
+    python -m benchmarks.google_clients --calls 200
+"""
+from datetime import datetime, timedelta
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+import argparse
+import tempfile
+import pickle
+import time
+import os
+
+from services.google_service import GoogleService
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    credentials = Credentials(token="benchmark", expiry=datetime.utcnow() + timedelta(hours=1))
+    for service_type in ("sheets", "calendar"):
+        with open(f"token_{service_type}.pickle", "wb") as token:
+            pickle.dump(credentials, token)
+
+    for api, version in (("sheets", "v4"), ("calendar", "v3")):
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            with open(f"token_{api}.pickle", "rb") as token:
+                creds = pickle.load(token)
+            build(api, version, credentials=creds, cache_discovery=False)
+        uncached = (time.perf_counter() - start) / args.calls
+
+        service = GoogleService()
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            service.get_client(api, api, version)
+        cached = (time.perf_counter() - start) / args.calls
+
+        print(f"{api:9s} per-call setup: uncached {uncached * 1000:7.3f}ms  cached {cached * 1000:7.3f}ms")
+
+if __name__ == "__main__":
+    main()
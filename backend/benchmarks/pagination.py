@@ -0,0 +1,59 @@
+"""Compare offset and cursor pagination latency at increasing page depths.
+
+Seeds ``--rows`` executions into a scratch database and times fetching one
+page at several depths, with ``skip`` and with the equivalent cursor, using
+the same query as ``GET /executions/``. Run from ``backend/``:
+
+    python -m benchmarks.pagination --rows 1000000
+"""
+from datetime import datetime, timedelta
+import argparse
+import time
+import os
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--url", default="sqlite:///./bench_pagination.db")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.url
+    from database import SessionLocal, engine
+    from models import Base, Workflow, Execution
+    from pagination import keyset_page, encode_cursor
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    start_time = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(Workflow.__table__.insert(), [{"id": 1, "name": "bench"}])
+        for offset in range(0, args.rows, 50000):
+            connection.execute(Execution.__table__.insert(), [
+                {"workflow_id": 1, "status": "completed", "started_at": start_time + timedelta(seconds=i)}
+                for i in range(offset, min(offset + 50000, args.rows))
+            ])
+
+    db = SessionLocal()
+    columns = [Execution.id]
+    print(f"{'depth':>10s} {'offset ms':>10s} {'cursor ms':>10s}")
+    depth = args.limit
+    while depth < args.rows:
+        # The cursor for a page at this depth points at the row just before it
+        boundary = args.rows - depth
+        cursor = encode_cursor([boundary + 1])
+
+        timings = {}
+        for label, kwargs in (("offset", {"skip": depth}), ("cursor", {"cursor": cursor})):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                keyset_page(db.query(Execution), columns, args.limit, descending=True, **kwargs)
+                db.rollback()
+            timings[label] = (time.perf_counter() - start) / args.repeat * 1000
+        print(f"{depth:>10d} {timings['offset']:>10.2f} {timings['cursor']:>10.2f}")
+        depth *= 10
+    db.close()
+
+if __name__ == "__main__":
+    main()
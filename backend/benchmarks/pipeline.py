@@ -0,0 +1,412 @@
+"""Load-test the execution pipeline end to end and save the results as JSON.
+
+Seeds a scratch database with ``--workflows`` workflows of ``--tasks`` tasks
+each plus ``--history`` finished executions. Starts fake CRM, Google and
+SMTP servers that add ``--latency`` seconds to every call and fail
+``--error-rate`` of them. Serves the API with uvicorn and drives it from
+``--clients`` threads, which trigger ``--runs`` executions between them and
+read the list endpoints ``--reads-per-run`` times per run. Finally it fires
+``--fires`` scheduled runs through the scheduler's fire path from two
+competing threads, as two scheduler processes would.
+
+The report covers:
+
+* executions per second
+* task latency percentiles, overall and by task type
+* server-side latency and SQL statements per request, for each endpoint
+* scheduler fire throughput
+
+It is printed and written to ``--output``. Pass an earlier report as
+``--compare`` to also print the change. Run from ``backend/``:
+
+    python -m benchmarks.pipeline --runs 500 --output before.json
+    python -m benchmarks.pipeline --runs 500 --compare before.json
+
+Application settings (e.g. ``SHEETS_BUFFER_MAX_DELAY`` or
+``SALESFORCE_RATE_LIMIT``) can be set in the environment as usual.
+Integration rate limits are off unless ``--rate-limits`` is given.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List
+import subprocess
+import threading
+import argparse
+import tempfile
+import random
+import pickle
+import socket
+import json
+import time
+import os
+
+from fakes.crm_server import FakeCRMServer
+from fakes.google_server import FakeGoogleServer
+from fakes.smtp_server import FakeSMTPServer
+
+TASK_TYPES = ["api_call", "crm_update", "google_sheets", "email", "google_calendar"]
+
+def task_fields(task_type: str, i: int) -> Dict[str, Any]:
+    """Columns a task of ``task_type`` needs to reach its fake integration."""
+    if task_type == "email":
+        return {"email_to": f"user{i}@example.com", "email_subject": "Benchmark", "email_body": "Hello"}
+    if task_type == "employee_assignment":
+        return {"assignee_email": f"user{i}@example.com", "assignment_title": "Benchmark",
+                "assignment_description": "Hello", "due_date": datetime(2024, 1, 2)}
+    if task_type == "crm_update":
+        return {"crm_type": "salesforce", "crm_object": "Contact", "crm_action": "create",
+                "config": {"LastName": f"benchmark {i}"}}
+    if task_type == "google_sheets":
+        return {"spreadsheet_id": "benchmark", "sheet_name": "Sheet1", "config": {"row": i}}
+    if task_type == "google_calendar":
+        return {"calendar_id": "primary", "event_title": "Benchmark", "event_description": "",
+                "event_start": datetime(2024, 1, 1, 9), "event_end": datetime(2024, 1, 1, 10)}
+    return {}
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted ``values``."""
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))], 2)
+
+def summarize(durations_ms: List[float]) -> Dict[str, Any]:
+    durations_ms = sorted(durations_ms)
+    return {
+        "count": len(durations_ms),
+        "p50_ms": percentile(durations_ms, 50),
+        "p95_ms": percentile(durations_ms, 95),
+        "p99_ms": percentile(durations_ms, 99)
+    }
+
+def configure_environment(args, database: str, crm: FakeCRMServer, google: FakeGoogleServer,
+                          smtp: FakeSMTPServer):
+    """Point the application at the scratch database and the fakes; must run before it is imported."""
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{database}",
+        "SALESFORCE_API_KEY": "benchmark",
+        "SALESFORCE_BASE_URL": f"{crm.url}/salesforce",
+        "HUBSPOT_API_KEY": "benchmark",
+        "HUBSPOT_BASE_URL": f"{crm.url}/hubspot",
+        "GOOGLE_SHEETS_API_ENDPOINT": f"{google.url}/",
+        "GOOGLE_CALENDAR_API_ENDPOINT": f"{google.url}/calendar/v3/",
+        "SMTP_SERVER": smtp.host,
+        "SMTP_PORT": str(smtp.port),
+        "SMTP_STARTTLS": "false",
+        "SMTP_USERNAME": "benchmark@example.com",
+        "SMTP_PASSWORD": "benchmark",
+        "EXECUTION_WORKERS": str(args.workers)
+    })
+    for name, value in (("EXECUTION_POLL_INTERVAL", "0.05"), ("TASK_RETRY_BACKOFF", "0.05"),
+                        ("CRM_BACKOFF_BASE", "0.05")):
+        os.environ.setdefault(name, value)
+    if not args.rate_limits:
+        for integration in ("SALESFORCE", "HUBSPOT", "GOOGLE_SHEETS", "GOOGLE_CALENDAR", "SMTP"):
+            os.environ.setdefault(f"{integration}_RATE_LIMIT", "0")
+
+def seed(args, task_types: List[str]) -> List[int]:
+    """Insert the workflows, their tasks and the execution history; returns the workflow ids."""
+    from database import engine
+    from models import Workflow, Task, Execution, ExecutionResult
+    from migrations import migrate
+
+    migrate(engine)
+    workflow_ids = list(range(1, args.workflows + 1))
+    start_time = datetime.utcnow() - timedelta(days=30)
+    with engine.begin() as connection:
+        connection.execute(Workflow.__table__.insert(), [
+            {"id": workflow_id, "name": f"benchmark {workflow_id}", "is_active": True,
+             "max_concurrency": args.tasks, "created_at": start_time, "updated_at": start_time}
+            for workflow_id in workflow_ids
+        ])
+        tasks = [
+            dict({"workflow_id": workflow_id, "name": f"task {i}", "task_type": task_types[i % len(task_types)],
+                  "config": {}, "order": 0, "depends_on": []},
+                 **task_fields(task_types[i % len(task_types)], workflow_id * args.tasks + i))
+            for workflow_id in workflow_ids for i in range(args.tasks)
+        ]
+        # executemany takes its columns from the first row, so every row needs every key
+        columns = {column for task in tasks for column in task}
+        connection.execute(Task.__table__.insert(), [
+            {column: task.get(column) for column in columns} for task in tasks
+        ])
+        for offset in range(0, args.history, 10000):
+            batch = range(offset, min(offset + 10000, args.history))
+            inserted = connection.execute(Execution.__table__.insert().returning(Execution.id), [
+                {"workflow_id": workflow_ids[i % len(workflow_ids)], "status": "completed",
+                 "started_at": start_time + timedelta(seconds=i * 10),
+                 "completed_at": start_time + timedelta(seconds=i * 10 + 2)}
+                for i in batch
+            ]).scalars().all()
+            connection.execute(ExecutionResult.__table__.insert(), [
+                {"execution_id": execution_id,
+                 "data": [{"task_id": t, "status": "success", "attempts": 1, "duration_ms": 120.0}
+                          for t in range(args.tasks)]}
+                for execution_id in inserted
+            ])
+    return workflow_ids
+
+def build_app(request_stats: Dict[str, List]):
+    """The API routers plus ``/metrics``, recording latency and SQL statements per request."""
+    from fastapi import FastAPI, Request, Response
+    from routers import workflows, tasks, executions
+    from metrics import REGISTRY, CONTENT_TYPE, count_queries
+
+    app = FastAPI()
+    app.include_router(workflows.router, prefix="/workflows")
+    app.include_router(tasks.router, prefix="/tasks")
+    app.include_router(executions.router, prefix="/executions")
+
+    @app.get("/metrics")
+    def get_metrics():
+        return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+    @app.middleware("http")
+    async def record_request(request: Request, call_next):
+        start = time.perf_counter()
+        with count_queries() as queries:
+            response = await call_next(request)
+        route = request.scope.get("route")
+        key = f"{request.method} {route.path if route else request.url.path}"
+        request_stats[key].append(((time.perf_counter() - start) * 1000, queries.count))
+        return response
+
+    return app
+
+def serve(app):
+    """Run ``app`` with uvicorn on a free local port in a background thread; returns the server and URL."""
+    import uvicorn
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="benchmark-api", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+def generate_load(args, url: str, workflow_ids: List[int]) -> List[int]:
+    """Trigger ``--runs`` executions from ``--clients`` threads, mixing in list reads."""
+    import requests
+
+    reads = [
+        lambda workflow_id: "/executions/?limit=50",
+        lambda workflow_id: f"/executions/workflow/{workflow_id}?limit=50",
+        lambda workflow_id: "/workflows/?limit=50",
+        lambda workflow_id: f"/tasks/workflow/{workflow_id}",
+        lambda workflow_id: f"/workflows/{workflow_id}"
+    ]
+    submitted = []
+    lock = threading.Lock()
+
+    def client(runs: range):
+        session = requests.Session()
+        for run in runs:
+            workflow_id = workflow_ids[run % len(workflow_ids)]
+            response = session.post(f"{url}/workflows/{workflow_id}/execute")
+            if response.status_code == 202:
+                with lock:
+                    submitted.append(response.json()["execution_id"])
+            for _ in range(args.reads_per_run):
+                session.get(url + random.choice(reads)(workflow_id))
+        session.close()
+
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(client, [range(i, args.runs, args.clients) for i in range(args.clients)]))
+    return submitted
+
+def wait_for(execution_ids: List[int], timeout: float) -> bool:
+    from database import SessionLocal
+    from models import Execution
+
+    deadline = time.monotonic() + timeout
+    db = SessionLocal()
+    try:
+        while time.monotonic() < deadline:
+            pending = db.query(Execution.id).filter(
+                Execution.id.in_(execution_ids),
+                Execution.status.in_(("queued", "running"))
+            ).count()
+            db.rollback()
+            if not pending:
+                return True
+            time.sleep(0.05)
+        return False
+    finally:
+        db.close()
+
+def execution_report(execution_ids: List[int], elapsed: float) -> Dict[str, Any]:
+    from database import SessionLocal
+    from models import Execution, Task, TaskRun
+
+    db = SessionLocal()
+    try:
+        statuses = defaultdict(int)
+        for (status,) in db.query(Execution.status).filter(Execution.id.in_(execution_ids)):
+            statuses[status] += 1
+        by_type = defaultdict(list)
+        task_statuses = defaultdict(int)
+        for task_type, status, started_at, completed_at in db.query(
+            Task.task_type, TaskRun.status, TaskRun.started_at, TaskRun.completed_at
+        ).join(Task, Task.id == TaskRun.task_id).filter(TaskRun.execution_id.in_(execution_ids)):
+            task_statuses[status] += 1
+            if started_at and completed_at:
+                by_type[task_type].append((completed_at - started_at).total_seconds() * 1000)
+    finally:
+        db.close()
+
+    finished = sum(count for status, count in statuses.items() if status not in ("queued", "running"))
+    return {
+        "executions": {
+            "submitted": len(execution_ids),
+            "statuses": dict(statuses),
+            "elapsed_s": round(elapsed, 2),
+            "per_sec": round(finished / elapsed, 1) if elapsed else None
+        },
+        "tasks": dict(
+            summarize([duration for durations in by_type.values() for duration in durations]),
+            statuses=dict(task_statuses),
+            by_type={task_type: summarize(durations) for task_type, durations in sorted(by_type.items())}
+        )
+    }
+
+def request_report(request_stats: Dict[str, List]) -> Dict[str, Any]:
+    report = {}
+    for route, samples in sorted(request_stats.items()):
+        queries = [count for _, count in samples]
+        report[route] = dict(
+            summarize([duration for duration, _ in samples]),
+            queries_mean=round(sum(queries) / len(queries), 2),
+            queries_max=max(queries)
+        )
+    return report
+
+def scheduler_report(args, workflow_id: int) -> Dict[str, Any]:
+    """Fire ``--fires`` scheduled runs, each from two threads at once; only one of each should count."""
+    from scheduler import fire_workflow
+    from database import SessionLocal
+    from models import ScheduledFire
+
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    fire_times = [base + timedelta(minutes=i) for i in range(args.fires)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for _ in pool.map(lambda times: [fire_workflow(workflow_id, at) for at in times], [fire_times, fire_times]):
+            pass
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    try:
+        accepted = db.query(ScheduledFire).filter(ScheduledFire.workflow_id == workflow_id).count()
+    finally:
+        db.close()
+    return {
+        "fires": len(fire_times) * 2,
+        "accepted": accepted,
+        "elapsed_s": round(elapsed, 2),
+        "per_sec": round(len(fire_times) * 2 / elapsed, 1) if elapsed else None
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(previous: Dict[str, Any], report: Dict[str, Any]):
+    """Print the headline numbers of two reports side by side."""
+    def line(label, old, new):
+        if old is None or new is None:
+            return
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+        print(f"  {label:48s} {old:>10} {new:>10} {change:>8s}")
+
+    print(f"\ncompared with {previous.get('commit')} ({previous.get('created_at')}):")
+    line("executions/s", previous["executions"]["per_sec"], report["executions"]["per_sec"])
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        line(f"task {key}", previous["tasks"].get(key), report["tasks"].get(key))
+    for route, stats in report["requests"].items():
+        old = previous["requests"].get(route)
+        if old:
+            line(f"{route} p95_ms", old["p95_ms"], stats["p95_ms"])
+            line(f"{route} queries", old["queries_mean"], stats["queries_mean"])
+    if previous.get("scheduler") and report.get("scheduler"):
+        line("scheduler fires/s", previous["scheduler"]["per_sec"], report["scheduler"]["per_sec"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workflows", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=5, help="tasks per workflow")
+    parser.add_argument("--task-types", default=",".join(TASK_TYPES))
+    parser.add_argument("--history", type=int, default=20000, help="finished executions to seed")
+    parser.add_argument("--runs", type=int, default=300, help="executions to trigger")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--reads-per-run", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=8, help="execution engine workers")
+    parser.add_argument("--fires", type=int, default=200, help="scheduled runs to fire; 0 skips")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every fake integration call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake integration calls that fail")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the integration rate limits on")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for the runs to finish")
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--compare", help="earlier report to compare with")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    crm = FakeCRMServer(latency=args.latency, error_rate=args.error_rate).start()
+    google = FakeGoogleServer(latency=args.latency, error_rate=args.error_rate).start()
+    smtp = FakeSMTPServer(message_delay=args.latency, error_rate=args.error_rate).start()
+    configure_environment(args, os.path.join(workdir, "pipeline.db"), crm, google, smtp)
+
+    workflow_ids = seed(args, args.task_types.split(","))
+    request_stats = defaultdict(list)
+    app = build_app(request_stats)
+    from google.oauth2.credentials import Credentials
+    from execution_engine import execution_engine
+    import handlers
+
+    commit = git_commit()
+    # GoogleService reads its tokens from the working directory
+    output = os.path.abspath(args.output)
+    previous = os.path.abspath(args.compare) if args.compare else None
+    os.chdir(workdir)
+    for service_type in ("sheets", "calendar"):
+        with open(f"token_{service_type}.pickle", "wb") as token:
+            pickle.dump(Credentials(token="benchmark", expiry=datetime.utcnow() + timedelta(days=1)), token)
+
+    server, url = serve(app)
+    execution_engine.start()
+    start = time.perf_counter()
+    execution_ids = generate_load(args, url, workflow_ids)
+    if not wait_for(execution_ids, args.timeout):
+        print(f"Timed out after {args.timeout}s waiting for executions to finish")
+    elapsed = time.perf_counter() - start
+
+    report = {"commit": commit, "created_at": datetime.utcnow().isoformat(), "config": vars(args)}
+    report.update(execution_report(execution_ids, elapsed))
+    report["requests"] = request_report(request_stats)
+    if args.fires:
+        report["scheduler"] = scheduler_report(args, workflow_ids[0])
+    report["integrations"] = {
+        "crm_requests": len(crm.requests),
+        "google_requests": google.requests,
+        "emails": len(smtp.messages)
+    }
+
+    server.should_exit = True
+    execution_engine.stop()
+    handlers.shutdown()
+    for fake in (crm, google, smtp):
+        fake.stop()
+
+    print(json.dumps(report, indent=2))
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    if previous:
+        with open(previous) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
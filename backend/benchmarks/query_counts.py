@@ -0,0 +1,131 @@
+"""Check that API endpoints run a fixed number of SQL statements however much they return.
+
+Seeds a scratch database with a small workflow (2 tasks, 2 executions) and
+a large one (``--tasks`` tasks, ``--executions`` executions with results).
+Each endpoint in ``QUERY_BUDGETS`` is then requested for both; the import
+endpoint gets 2 definitions for the small case and ``--imports`` (of
+``--tasks`` tasks each) for the large one. The check
+fails if an endpoint needs more statements for the large workflow than for
+the small one, which is the sign of an N+1, or if it goes over its budget.
+Exits non-zero on failure. Run from ``backend/``:
+
+    python -m benchmarks.query_counts
+
+``tests/test_query_counts.py`` runs the same checks under pytest.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+import argparse
+import json
+import tempfile
+import sys
+import os
+
+# Path (with {workflow_id} and {execution_id} filled in per workflow) -> most statements allowed
+QUERY_BUDGETS = {
+    "GET /workflows/": 1,
+    "GET /workflows/?include_tasks=true": 2,
+    "GET /workflows/{workflow_id}": 1,
+    "GET /workflows/{workflow_id}?include_tasks=true": 2,
+    "GET /tasks/workflow/{workflow_id}": 1,
+    "GET /executions/": 1,
+    "GET /executions/?include_results=true": 2,
+    "GET /executions/workflow/{workflow_id}": 1,
+    "GET /executions/workflow/{workflow_id}?include_results=true": 2,
+    "GET /executions/{execution_id}": 1,
+    # Existence check and insert; the response comes from the values inserted
+    "POST /workflows/{workflow_id}/execute": 2,
+    # Workflow insert, id read-back, task insert, task id read-back and depends_on update
+    "POST /workflows/import": 5
+}
+
+def import_body(workflows: int, tasks: int) -> bytes:
+    """NDJSON for the import endpoint: ``workflows`` definitions, each a chain of ``tasks`` tasks."""
+    return "\n".join(json.dumps({
+        "name": f"imported {i}",
+        "tasks": [
+            {"name": f"task {j}", "task_type": "api_call", "config": {}, "order": j,
+             "depends_on": [f"task {j - 1}"] if j else []}
+            for j in range(tasks)
+        ]
+    }) for i in range(workflows)).encode()
+
+def seed(tasks: int, executions: int):
+    """Insert one workflow with ``tasks`` tasks and ``executions`` executions; returns their ids."""
+    from database import engine
+    from models import Workflow, Task, Execution, ExecutionResult
+
+    start_time = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        workflow_id = connection.execute(
+            Workflow.__table__.insert().returning(Workflow.id),
+            {"name": f"{tasks} tasks", "is_active": True, "created_at": start_time, "updated_at": start_time}
+        ).scalar_one()
+        connection.execute(Task.__table__.insert(), [
+            {"workflow_id": workflow_id, "name": f"task {i}", "task_type": "api_call", "config": {}, "order": i}
+            for i in range(tasks)
+        ])
+        execution_ids = connection.execute(Execution.__table__.insert().returning(Execution.id), [
+            {"workflow_id": workflow_id, "status": "completed", "started_at": start_time + timedelta(seconds=i)}
+            for i in range(executions)
+        ]).scalars().all()
+        connection.execute(ExecutionResult.__table__.insert(), [
+            {"execution_id": execution_id, "data": [{"task_id": i, "status": "success"} for i in range(tasks)]}
+            for execution_id in execution_ids
+        ])
+    return workflow_id, execution_ids[-1]
+
+def check_endpoint(client, request_stats: Dict[str, List], endpoint: str, sizes: Dict[str, Tuple[int, int]],
+                   bodies: Dict[str, bytes]) -> Tuple[Dict[str, int], List[str]]:
+    """Request ``endpoint`` for each size; returns its statement counts by size and what failed."""
+    budget = QUERY_BUDGETS[endpoint]
+    method, path = endpoint.split(" ", 1)
+    counts, failures = {}, []
+    for size, (workflow_id, execution_id) in sizes.items():
+        request_stats.clear()
+        response = client.request(
+            method, path.format(workflow_id=workflow_id, execution_id=execution_id),
+            content=bodies[size] if path == "/workflows/import" else None
+        )
+        if response.status_code >= 400:
+            failures.append(f"{endpoint} ({size}): HTTP {response.status_code}")
+        counts[size] = sum(count for samples in request_stats.values() for _, count in samples)
+    if counts["large"] > counts["small"]:
+        failures.append(f"{endpoint}: {counts['small']} statements for the small workflow, {counts['large']} for the large one")
+    if max(counts.values()) > budget:
+        failures.append(f"{endpoint}: {max(counts.values())} statements, budget is {budget}")
+    return counts, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--executions", type=int, default=300)
+    parser.add_argument("--imports", type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_counts.db')}"
+    from fastapi.testclient import TestClient
+    from database import engine
+    from migrations import migrate
+    from benchmarks.pipeline import build_app
+
+    migrate(engine)
+    sizes = {"small": seed(2, 2), "large": seed(args.tasks, args.executions)}
+    bodies = {"small": import_body(2, 2), "large": import_body(args.imports, args.tasks)}
+
+    request_stats = defaultdict(list)
+    client = TestClient(build_app(request_stats))
+    failures = []
+    print(f"{'endpoint':60s} {'small':>6s} {'large':>6s} {'budget':>6s}")
+    for endpoint, budget in QUERY_BUDGETS.items():
+        counts, endpoint_failures = check_endpoint(client, request_stats, endpoint, sizes, bodies)
+        failures.extend(endpoint_failures)
+        print(f"{endpoint:60s} {counts['small']:>6d} {counts['large']:>6d} {budget:>6d}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Simulate a burst of CRM writes against a quota-enforcing API.
+
+The local fake CRM API answers requests beyond ``--quota`` per second with
+429. ``--workers`` simulated worker processes, each with its own CRM client
+and ``--threads`` threads, send ``--calls`` single-record writes in total.
+Three setups are compared:
+
+* no governor: clients rely on retries and Retry-After alone
+* memory: each worker has its own token bucket, so together they exceed the quota
+* database: the workers share one bucket through the database
+
+Run from ``backend/``:
+
+    python -m benchmarks.rate_limit --calls 600 --quota 50 --workers 4
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import tempfile
+import time
+import os
+
+from fakes.crm_server import FakeCRMServer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--quota", type=int, default=50, help="requests per second the fake API accepts")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(), "rate_limit.db")
+    fake = FakeCRMServer(latency=args.latency, rate_limit=args.quota).start()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{database}",
+        "SALESFORCE_API_KEY": "bench",
+        "SALESFORCE_BASE_URL": f"{fake.url}/salesforce",
+        "CRM_BACKOFF_BASE": "0.1"
+    })
+    from database import engine
+    from models import Base
+    from services.crm_service import CRMService
+    from services.rate_limit import RateGovernor
+
+    Base.metadata.create_all(bind=engine)
+    # Stay a little under the quota; the fake counts in fixed one-second windows
+    limits = {"salesforce": {"rate": args.quota * 0.9, "burst": args.quota * 0.25, "concurrency": args.threads}}
+
+    print(f"{'governor':10s} {'elapsed':>8s} {'succeeded':>10s} {'failed':>7s} {'429s':>6s} {'waits':>6s}")
+    for mode in ("none", "memory", "database"):
+        services = []
+        for _ in range(args.workers):
+            service = CRMService()
+            service.http.governor = None if mode == "none" else RateGovernor(limits, backend=mode)
+            services.append(service)
+        # Wait out the previous run's quota window
+        time.sleep(1.1)
+
+        def write(i):
+            service = services[i % args.workers]
+            return service.update_crm("salesforce", "Contact", "create", {"LastName": f"n{i}"})
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers * args.threads) as pool:
+            outcomes = list(pool.map(write, range(args.calls)))
+        elapsed = time.perf_counter() - start
+
+        rate_limited = sum(service.http.counters["rate_limited"] for service in services)
+        waits = sum(
+            stats["waits"]
+            for service in services if service.http.governor is not None
+            for stats in service.http.governor.stats().values()
+        )
+        print(f"{mode:10s} {elapsed:7.2f}s {sum(outcomes):>10d} {outcomes.count(False):>7d} {rate_limited:>6d} {waits:>6d}")
+        for service in services:
+            service.http.close()
+    fake.stop()
+
+if __name__ == "__main__":
+    main()
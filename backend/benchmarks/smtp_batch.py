@@ -0,0 +1,73 @@
+"""Compare per-message SMTP sessions with pooled and batched sending.
+
+Runs against the local fake SMTP server, with ``--login-delay`` standing in
+for the connect/STARTTLS/login cost of a real provider. Run from ``backend/``:
+
+    python -m benchmarks.smtp_batch --count 500 --login-delay 0.2
+"""
+from datetime import datetime
+import argparse
+import smtplib
+import time
+import os
+
+from fakes.smtp_server import FakeSMTPServer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--login-delay", type=float, default=0.2)
+    parser.add_argument("--unpooled-sample", type=int, default=20,
+                        help="messages to time for the per-message baseline (extrapolated)")
+    args = parser.parse_args()
+
+    fake = FakeSMTPServer(login_delay=args.login_delay).start()
+    os.environ.update({
+        "SMTP_SERVER": fake.host,
+        "SMTP_PORT": str(fake.port),
+        "SMTP_USERNAME": "bench@example.com",
+        "SMTP_PASSWORD": "secret",
+        "SMTP_STARTTLS": "false"
+    })
+    from services.employee_service import EmployeeService
+
+    service = EmployeeService()
+    assignments = [
+        {
+            "assignee_email": f"employee{i}@example.com",
+            "title": f"Assignment {i}",
+            "description": "Benchmark assignment",
+            "due_date": datetime(2030, 1, 1)
+        }
+        for i in range(args.count)
+    ]
+
+    # Baseline: a fresh authenticated session per message, as before pooling
+    start = time.perf_counter()
+    for assignment in assignments[:args.unpooled_sample]:
+        msg = service._build_assignment_message(**assignment)
+        with smtplib.SMTP(fake.host, fake.port) as server:
+            server.login(service.smtp_username, service.smtp_password)
+            server.send_message(msg)
+    per_message = (time.perf_counter() - start) / args.unpooled_sample
+
+    start = time.perf_counter()
+    for assignment in assignments:
+        service.create_assignment(**assignment)
+    pooled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = service.create_assignments(assignments)
+    batched = time.perf_counter() - start
+
+    service.smtp_pool.close()
+    fake.stop()
+
+    print(f"messages:                 {args.count}")
+    print(f"new session per message:  {per_message * args.count:8.2f}s (extrapolated from {args.unpooled_sample})")
+    print(f"pooled create_assignment: {pooled:8.2f}s")
+    print(f"batched create_assignments: {batched:6.2f}s ({sum(results)} sent)")
+    print(f"pool: {service.smtp_pool.stats()}")
+
+if __name__ == "__main__":
+    main()
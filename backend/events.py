@@ -0,0 +1,219 @@
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+from metrics import Gauge
+import asyncio
+import json
+import threading
+import time
+import os
+
+# Seconds a finished execution's events stay available for replay
+EVENT_REPLAY_TTL = float(os.getenv('EVENT_REPLAY_TTL', 300))
+# Events a subscriber may fall behind by before its stream is closed; it can reconnect for a replay
+EVENT_SUBSCRIBER_QUEUE = int(os.getenv('EVENT_SUBSCRIBER_QUEUE', 1000))
+# Seconds of silence after which a comment is sent to keep proxies from closing the stream
+EVENT_KEEPALIVE = float(os.getenv('EVENT_KEEPALIVE', 15))
+FINISHED_EVENT = "execution.finished"
+SSE_MEDIA_TYPE = "text/event-stream"
+# Stop proxies from buffering or caching event streams
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+EVENT_SUBSCRIBERS = Gauge(
+    "workflow_event_subscribers",
+    "Open execution event streams in this process"
+)
+
+class ExecutionState:
+    """What a late subscriber needs to catch up on one execution.
+
+    Only the latest event of each task is kept, and for a batch run a
+    running count of record outcomes instead of every record's event.
+    """
+
+    def __init__(self, execution_id: int, workflow_id: int):
+        self.execution_id = execution_id
+        self.workflow_id = workflow_id
+        self.started: Optional[Dict[str, Any]] = None
+        self.tasks: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.progress: Optional[Dict[str, Any]] = None
+        self.finished: Optional[Dict[str, Any]] = None
+        self.finished_at: Optional[float] = None
+
+    def apply(self, event: Dict[str, Any]):
+        kind = event["type"]
+        if kind == "execution.started":
+            # A resumed execution starts over; the engine reports its finished tasks again
+            self.started = event
+            self.tasks.clear()
+            self.progress = None
+            self.finished = None
+        elif kind.startswith("task."):
+            self.tasks[event["task_id"]] = event
+        elif kind.startswith("record."):
+            counts = dict(self.progress["counts"]) if self.progress else {}
+            counts[event["status"]] = counts.get(event["status"], 0) + 1
+            self.progress = {key: event[key] for key in ("id", "execution_id", "workflow_id", "timestamp")}
+            self.progress.update(
+                type="execution.progress",
+                record_count=self.started.get("record_count") if self.started else None,
+                counts=counts
+            )
+        elif kind == FINISHED_EVENT:
+            self.finished = event
+
+    def replay(self) -> List[Dict[str, Any]]:
+        events = [self.started] + list(self.tasks.values()) + [self.progress, self.finished]
+        return [event for event in events if event is not None]
+
+class Subscription:
+    """One listener's queue of events, read from an asyncio event loop.
+
+    Events are handed over with ``call_soon_threadsafe`` since the engine
+    publishes from its worker threads. ``None`` on the queue means the
+    subscription was dropped for falling too far behind.
+    """
+
+    def __init__(self, bus: "EventBus", execution_id: Optional[int], workflow_id: Optional[int],
+                 loop: asyncio.AbstractEventLoop):
+        self.bus = bus
+        self.execution_id = execution_id
+        self.workflow_id = workflow_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.execution_id is not None:
+            return event["execution_id"] == self.execution_id
+        return event["workflow_id"] == self.workflow_id
+
+    def deliver(self, event: Dict[str, Any]):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is gone, so is whoever was listening
+            self.bus.unsubscribe(self)
+
+    def _put(self, event: Dict[str, Any]):
+        if self.closed:
+            return
+        if self.queue.qsize() >= EVENT_SUBSCRIBER_QUEUE:
+            self.closed = True
+            self.queue.put_nowait(None)
+            self.bus.unsubscribe(self)
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        return await self.queue.get()
+
+class EventBus:
+    """In-process publish/subscribe for execution progress.
+
+    The engine publishes as executions and tasks start and finish; nothing
+    is read from or written to the database. Subscribers listen to one
+    execution or to every execution of a workflow and are first given a
+    replay of the current state of the executions they cover, so joining
+    late misses nothing that still matters. State is kept while an
+    execution runs and for ``EVENT_REPLAY_TTL`` seconds after it finishes.
+    Only executions run by this process are seen.
+    """
+
+    def __init__(self, replay_ttl: float = EVENT_REPLAY_TTL):
+        self.replay_ttl = replay_ttl
+        self._states: Dict[int, ExecutionState] = {}
+        self._finished: deque = deque()
+        self._subscribers: List[Subscription] = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, execution_id: int, workflow_id: int, **fields: Any):
+        with self._lock:
+            self._sequence += 1
+            event = {
+                "id": self._sequence,
+                "type": event_type,
+                "execution_id": execution_id,
+                "workflow_id": workflow_id,
+                "timestamp": datetime.utcnow().isoformat(),
+                **fields
+            }
+            state = self._states.get(execution_id)
+            if state is None:
+                state = self._states[execution_id] = ExecutionState(execution_id, workflow_id)
+            state.apply(event)
+            if event_type == FINISHED_EVENT:
+                state.finished_at = time.monotonic()
+                self._finished.append((state.finished_at, execution_id))
+            self._expire()
+            subscribers = [subscription for subscription in self._subscribers if subscription.matches(event)]
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def _expire(self):
+        """Forget executions that finished more than ``replay_ttl`` seconds ago; the caller holds the lock."""
+        cutoff = time.monotonic() - self.replay_ttl
+        while self._finished and self._finished[0][0] < cutoff:
+            _, execution_id = self._finished.popleft()
+            state = self._states.get(execution_id)
+            # A resumed execution keeps its state while running and until its latest finish expires
+            if state is not None and state.finished is not None and state.finished_at <= cutoff:
+                del self._states[execution_id]
+
+    def subscribe(self, execution_id: Optional[int] = None, workflow_id: Optional[int] = None,
+                  loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start listening; returns the subscription and the replay of current state, in that order.
+
+        Registering and taking the replay happen under one lock, so no event
+        falls between the two.
+        """
+        subscription = Subscription(self, execution_id, workflow_id, loop or asyncio.get_running_loop())
+        with self._lock:
+            self._expire()
+            if execution_id is not None:
+                states = [self._states[execution_id]] if execution_id in self._states else []
+            else:
+                states = [state for state in self._states.values() if state.workflow_id == workflow_id]
+            replay = [event for state in states for event in state.replay()]
+            self._subscribers.append(subscription)
+        EVENT_SUBSCRIBERS.inc()
+        return subscription, replay
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription not in self._subscribers:
+                return
+            self._subscribers.remove(subscription)
+        EVENT_SUBSCRIBERS.dec()
+
+def format_event(event: Dict[str, Any]) -> str:
+    """One Server-Sent Events message; the event id lets clients tell replayed events apart."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def stream_events(subscription: Subscription, replay: List[Dict[str, Any]], until_finished: bool):
+    """Yield the replay and then live events as SSE, with a comment line as keep-alive when idle.
+
+    A single execution's stream ends after its ``execution.finished`` event.
+    Ending the stream, or the client going away, unsubscribes.
+    """
+    try:
+        for event in replay:
+            yield format_event(event)
+            if until_finished and event["type"] == FINISHED_EVENT:
+                return
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), EVENT_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            yield format_event(event)
+            if until_finished and event["type"] == FINISHED_EVENT:
+                return
+    finally:
+        subscription.bus.unsubscribe(subscription)
+
+event_bus = EventBus()
\ No newline at end of file
@@ -0,0 +1,712 @@
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Any, List, Optional
+from database import SessionLocal
+from models import Workflow, Task, Execution, ExecutionInput, TaskRun
+from task_graph import run_graph, DEFAULT_MAX_CONCURRENCY
+from workflow_plans import WorkflowPlan, plan_cache
+from batch_runs import RecordBinder, TemplateError, DEFAULT_BATCH_CONCURRENCY
+from handlers import dispatch, TaskHandler, TaskContext, CancelToken, TaskCancelled
+from metrics import Counter, Gauge, Histogram
+from events import event_bus
+from datetime import datetime, timedelta
+import threading
+import socket
+import random
+import time
+import uuid
+import os
+
+# Wall-clock seconds an execution may run when its workflow sets no timeout; 0 means no limit
+DEFAULT_EXECUTION_TIMEOUT = float(os.getenv('EXECUTION_TIMEOUT', 3600))
+# Statuses an execution can be resumed from
+RESUMABLE_STATUSES = ("failed", "cancelled", "timed_out")
+# Seconds without a heartbeat after which a running execution's worker is presumed dead
+EXECUTION_LEASE_TIMEOUT = float(os.getenv('EXECUTION_LEASE_TIMEOUT', 60))
+# Seconds between saving a running batch run's finished records
+BATCH_CHECKPOINT_INTERVAL = float(os.getenv('BATCH_CHECKPOINT_INTERVAL', 5))
+
+EXECUTION_DURATION = Histogram(
+    "workflow_execution_duration_seconds",
+    "Time from a worker claiming an execution until it finishes",
+    ["status"]
+)
+EXECUTION_QUEUE_DEPTH = Gauge(
+    "workflow_execution_queue_depth",
+    "Executions waiting for or being run by a worker, across all processes",
+    ["status"]
+)
+EXECUTIONS_RECOVERED = Counter(
+    "workflow_executions_recovered_total",
+    "Running executions whose worker stopped heartbeating, by what was done with them",
+    ["status"]
+)
+BATCH_RECORDS = Counter(
+    "workflow_batch_records_total",
+    "Input records run by batch runs, by outcome",
+    ["status"]
+)
+EXECUTION_WORKERS = Gauge(
+    "workflow_execution_workers",
+    "Execution worker threads in this process, and how many are running an execution",
+    ["state"]
+)
+
+class RetryPolicy:
+    """How often a failing task is retried within one run, and how long to wait in between.
+
+    Waits use full-jitter exponential backoff: attempt ``n`` waits a random
+    time up to ``backoff_base * 2 ** (n - 1)`` seconds, capped at ``backoff_max``.
+    """
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=int(os.getenv('TASK_MAX_ATTEMPTS', 3)),
+            backoff_base=float(os.getenv('TASK_RETRY_BACKOFF', 1.0)),
+            backoff_max=float(os.getenv('TASK_RETRY_BACKOFF_MAX', 60))
+        )
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+class ExecutionEngine:
+    """Runs workflow executions on a pool of background workers.
+
+    The ``executions`` table is the queue: ``submit`` inserts a row with
+    status ``queued`` and returns immediately, and each worker claims the
+    oldest queued row with a conditional UPDATE so that only one worker (or
+    process) ever runs a given execution. Queued rows survive restarts and
+    are picked up again when the engine starts.
+
+    Each task's progress is saved to ``task_runs`` as it happens, so
+    ``resume`` can re-queue a failed execution and only the tasks that
+    haven't succeeded run again. Failing tasks are retried according to
+    ``retry_policy``.
+
+    Every running execution has a ``CancelToken`` shared by its tasks. The
+    token is cancelled when the execution's deadline passes (the workflow's
+    ``timeout`` or ``EXECUTION_TIMEOUT``) or when ``cancel`` is called. Cancel
+    requests made in another process are stored on the execution row, and a
+    watcher thread polls for them. A cancelled token stops the execution's
+    in-flight tasks, and it ends as ``cancelled`` or ``timed_out``.
+
+    A claim is a lease: the claiming engine stores its ``instance_id`` in
+    ``claimed_by`` and renews ``heartbeat_at`` every ``poll_interval``.
+    Running executions whose heartbeat is older than ``lease_timeout``
+    belong to a worker that died. Every engine looks for them when it starts
+    and on each poll, and requeues them so they pick up from their saved
+    task runs, or ends them as ``cancelled`` or ``timed_out`` if they were
+    cancelled or are past their ``deadline_at``.
+
+    A batch run (``submit`` with ``records``) runs the whole workflow once
+    per input record, up to its ``concurrency`` records at a time, with task
+    templates filled from the record. Its results hold one compact outcome
+    per record instead of per task, and resuming it only reruns the records
+    that didn't succeed.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_workers: Optional[int] = None,
+                 poll_interval: Optional[float] = None, retry_policy: Optional[RetryPolicy] = None,
+                 lease_timeout: float = EXECUTION_LEASE_TIMEOUT):
+        self.session_factory = session_factory
+        self.instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_timeout = lease_timeout
+        self.retry_policy = retry_policy or RetryPolicy.from_env()
+        self.max_workers = max_workers or int(os.getenv('EXECUTION_WORKERS', 4))
+        self.poll_interval = poll_interval or float(os.getenv('EXECUTION_POLL_INTERVAL', 1.0))
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._tokens: Dict[int, CancelToken] = {}
+
+    def start(self):
+        """Start the worker threads. Calling this more than once is a no-op."""
+        with self._lock:
+            if self._workers:
+                return
+            self._stopping.clear()
+            for i in range(self.max_workers):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"execution-worker-{i}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+            watcher = threading.Thread(target=self._watch_running, name="execution-watcher", daemon=True)
+            watcher.start()
+            self._workers.append(watcher)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the workers after they finish their current execution."""
+        with self._lock:
+            self._stopping.set()
+            with self._wakeup:
+                self._wakeup.notify_all()
+            for worker in self._workers:
+                worker.join(timeout)
+            self._workers = []
+
+    def enqueue(self, db: Session, workflow_id: int, records: Optional[List[Dict[str, Any]]] = None,
+                concurrency: Optional[int] = None) -> Execution:
+        """Add a queued execution in the caller's transaction; the caller commits and then calls ``wake``."""
+        execution = Execution(
+            workflow_id=workflow_id,
+            started_at=datetime.utcnow(),
+            status="queued"
+        )
+        if records is not None:
+            execution.record_count = len(records)
+            execution.input = ExecutionInput(records=records, concurrency=concurrency)
+        db.add(execution)
+        db.flush()
+        return execution
+
+    def submit(self, db: Session, workflow_id: int, records: Optional[List[Dict[str, Any]]] = None,
+               concurrency: Optional[int] = None) -> Execution:
+        """Queue an execution of a workflow, or a batch run over ``records``, and wake up an idle worker.
+
+        The returned execution's ``id``, ``status`` and ``record_count`` are
+        the values it was queued with. They are kept through the commit
+        rather than reloaded: reloading costs a query, and a worker may have
+        claimed the row by then.
+        """
+        execution = self.enqueue(db, workflow_id, records, concurrency)
+        queued = {"id": execution.id, "status": execution.status, "record_count": execution.record_count}
+        db.commit()
+        for key, value in queued.items():
+            set_committed_value(execution, key, value)
+        self.wake()
+        return execution
+
+    def wake(self):
+        """Start the workers if needed and wake an idle one to look for queued executions."""
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def resume(self, db: Session, execution_id: int) -> bool:
+        """Re-queue a failed, cancelled or timed out execution; False if it is in another state."""
+        resumed = db.query(Execution).filter(
+            Execution.id == execution_id,
+            Execution.status.in_(RESUMABLE_STATUSES)
+        ).update(
+            {"status": "queued", "completed_at": None, "error": None, "deadline_at": None, "cancel_requested": False},
+            synchronize_session=False
+        )
+        db.commit()
+        if not resumed:
+            return False
+
+        self.wake()
+        return True
+
+    def cancel(self, db: Session, execution_id: int) -> Optional[str]:
+        """Cancel a queued or running execution.
+
+        A queued execution is cancelled on the spot. A running one is flagged
+        and stops at once if it runs in this process, or within
+        ``poll_interval`` otherwise; if its worker has died, it is marked
+        cancelled once its lease expires. Returns ``"cancelled"``, ``"cancelling"``
+        or None if the execution has already finished.
+        """
+        cancelled = db.query(Execution).filter(
+            Execution.id == execution_id,
+            Execution.status == "queued"
+        ).update(
+            {"status": "cancelled", "completed_at": datetime.utcnow(), "cancel_requested": True},
+            synchronize_session=False
+        )
+        db.commit()
+        if cancelled:
+            return "cancelled"
+
+        flagged = db.query(Execution).filter(
+            Execution.id == execution_id,
+            Execution.status == "running"
+        ).update({"cancel_requested": True}, synchronize_session=False)
+        db.commit()
+        if not flagged:
+            return None
+
+        token = self._tokens.get(execution_id)
+        if token is not None:
+            token.cancel("cancelled")
+        return "cancelling"
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Number of queued and running executions."""
+        db = self.session_factory()
+        try:
+            counts = dict(db.query(Execution.status, func.count(Execution.id)).filter(
+                Execution.status.in_(("queued", "running"))
+            ).group_by(Execution.status).all())
+            return {status: counts.get(status, 0) for status in ("queued", "running")}
+        finally:
+            db.close()
+
+    def recover_stale(self, now: Optional[datetime] = None) -> int:
+        """Deal with running executions whose lease has expired; returns how many.
+
+        Each case is a conditional UPDATE on the stale rows, so engines that
+        recover at the same time don't step on each other, and a worker that
+        heartbeats in between keeps its execution.
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.lease_timeout)
+        stale = (
+            Execution.status == "running",
+            or_(
+                Execution.heartbeat_at < cutoff,
+                # Claimed before heartbeats existed
+                and_(Execution.heartbeat_at.is_(None), Execution.started_at < cutoff)
+            )
+        )
+        released = {"claimed_by": None, "heartbeat_at": None}
+        db = self.session_factory()
+        try:
+            # A plain read first, so the common case takes no write lock
+            if db.query(Execution.id).filter(*stale).first() is None:
+                db.commit()
+                return 0
+            db.commit()
+            recovered = {}
+            recovered["cancelled"] = db.query(Execution).filter(*stale, Execution.cancel_requested == True).update(
+                {"status": "cancelled", "completed_at": now, "error": "Execution cancelled", **released},
+                synchronize_session=False
+            )
+            recovered["timed_out"] = db.query(Execution).filter(*stale, Execution.deadline_at <= now).update(
+                {"status": "timed_out", "completed_at": now, "error": "Execution timed out", **released},
+                synchronize_session=False
+            )
+            # The deadline is kept, so a requeued execution doesn't get a fresh timeout
+            recovered["queued"] = db.query(Execution).filter(*stale).update(
+                {"status": "queued", **released},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+        for status, count in recovered.items():
+            if count:
+                EXECUTIONS_RECOVERED.inc(count, status=status)
+        if recovered["queued"]:
+            with self._wakeup:
+                self._wakeup.notify_all()
+        return sum(recovered.values())
+
+    def _watch_running(self):
+        """Renew this engine's leases, recover stale ones and pick up cancel requests, every ``poll_interval``.
+
+        Cancel requests for executions running here may have been made in
+        other processes, so they are read from the execution rows.
+        """
+        last_heartbeat = time.monotonic()
+        # The first pass runs straight away, so executions left by a dead worker are recovered at startup
+        while True:
+            try:
+                self.recover_stale()
+            except Exception as e:
+                print(f"Error recovering executions: {str(e)}")
+            running = list(self._tokens)
+            if running:
+                db = self.session_factory()
+                try:
+                    # A few heartbeats per lease is plenty, and keeps writes down with a short poll interval
+                    if time.monotonic() - last_heartbeat >= self.lease_timeout / 4:
+                        db.query(Execution).filter(
+                            Execution.id.in_(running),
+                            Execution.claimed_by == self.instance_id,
+                            Execution.status == "running"
+                        ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+                        db.commit()
+                        last_heartbeat = time.monotonic()
+                    requested = db.query(Execution.id).filter(
+                        Execution.id.in_(running),
+                        Execution.cancel_requested == True
+                    ).all()
+                    for (execution_id,) in requested:
+                        token = self._tokens.get(execution_id)
+                        if token is not None:
+                            token.cancel("cancelled")
+                except Exception as e:
+                    print(f"Error checking running executions: {str(e)}")
+                finally:
+                    db.close()
+            if self._stopping.wait(self.poll_interval):
+                return
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                execution_id = self._claim_next()
+            except Exception as e:
+                print(f"Error claiming execution: {str(e)}")
+                execution_id = None
+
+            if execution_id is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            self._run(execution_id)
+
+    def _claim_next(self) -> Optional[int]:
+        """Atomically move the oldest queued execution to ``running`` and take its lease."""
+        db = self.session_factory()
+        try:
+            candidates = db.query(Execution.id).filter(
+                Execution.status == "queued"
+            ).order_by(Execution.id).limit(self.max_workers).all()
+            # End the read transaction so the UPDATE below starts a fresh write
+            # transaction (avoids SQLite's busy-snapshot error on lock upgrade)
+            db.commit()
+
+            for (execution_id,) in candidates:
+                now = datetime.utcnow()
+                claimed = db.query(Execution).filter(
+                    Execution.id == execution_id,
+                    Execution.status == "queued"
+                ).update(
+                    {"status": "running", "started_at": now, "claimed_by": self.instance_id, "heartbeat_at": now},
+                    synchronize_session=False
+                )
+                db.commit()
+                if claimed:
+                    return execution_id
+            return None
+        finally:
+            db.close()
+
+    def _run(self, execution_id: int):
+        db = self.session_factory()
+        token = CancelToken()
+        self._tokens[execution_id] = token
+        deadline_timer = None
+        start = time.perf_counter()
+        try:
+            # The workflow's revision comes with the execution, so a cached plan costs no extra query
+            execution, revision = db.query(Execution, Workflow.revision).outerjoin(
+                Workflow, Workflow.id == Execution.workflow_id
+            ).filter(Execution.id == execution_id).first()
+            workflow_id = execution.workflow_id
+            try:
+                event_bus.publish(
+                    "execution.started", execution_id, workflow_id,
+                    status="running", record_count=execution.record_count
+                )
+                plan = plan_cache.get(db, workflow_id, revision)
+                timeout = plan.timeout or DEFAULT_EXECUTION_TIMEOUT
+                if execution.deadline_at is not None:
+                    # Requeued after its worker died; the original deadline still stands
+                    timeout = max(0.0, (execution.deadline_at - datetime.utcnow()).total_seconds())
+                elif timeout:
+                    execution.deadline_at = datetime.utcnow() + timedelta(seconds=timeout)
+                if execution.deadline_at is not None:
+                    deadline_timer = threading.Timer(timeout, token.cancel, args=("timed_out",))
+                    deadline_timer.daemon = True
+                    deadline_timer.start()
+                if execution.cancel_requested:
+                    token.cancel("cancelled")
+                if execution.record_count is not None:
+                    self._run_batch(db, execution, plan, token)
+                else:
+                    self._run_tasks(db, execution, plan, token)
+            except Exception as e:
+                db.rollback()
+                execution.completed_at = datetime.utcnow()
+                execution.status = "failed"
+                execution.error = str(e)
+                db.commit()
+            duration = time.perf_counter() - start
+            EXECUTION_DURATION.observe(duration, status=execution.status)
+            event_bus.publish(
+                "execution.finished", execution_id, workflow_id,
+                status=execution.status, error=execution.error, duration_ms=round(duration * 1000, 1)
+            )
+        except Exception as e:
+            print(f"Error running execution {execution_id}: {str(e)}")
+        finally:
+            if deadline_timer is not None:
+                deadline_timer.cancel()
+            self._tokens.pop(execution_id, None)
+            db.close()
+
+    def _run_tasks(self, db: Session, execution: Execution, plan: WorkflowPlan, token: CancelToken):
+        """Run the workflow's tasks once, saving each one's progress as a task run."""
+        execution_id = execution.id
+        task_runs = self._prepare_task_runs(db, execution, plan.tasks)
+        completed = {
+            task_id: self._task_result(task_run)
+            for task_id, task_run in task_runs.items() if task_run.status == "succeeded"
+        }
+        keys = {task_id: task_run.idempotency_key for task_id, task_run in task_runs.items()}
+        db.commit()
+        for task_result in completed.values():
+            event_bus.publish("task.succeeded", execution_id, plan.workflow_id, **progress_fields(task_result))
+
+        results = run_graph(
+            plan.tasks,
+            lambda task: self._run_task(execution_id, task, keys[task.id], token, plan.handlers[task.id]),
+            plan.max_concurrency or DEFAULT_MAX_CONCURRENCY,
+            completed,
+            plan.dependencies
+        )
+        skipped = [result["task_id"] for result in results if result["status"] == "skipped"]
+        for task_id in skipped:
+            event_bus.publish("task.skipped", execution_id, plan.workflow_id, task_id=task_id, status="skipped")
+        if skipped:
+            db.query(TaskRun).filter(
+                TaskRun.execution_id == execution_id,
+                TaskRun.task_id.in_(skipped)
+            ).update({"status": "skipped"}, synchronize_session=False)
+
+        execution.completed_at = datetime.utcnow()
+        if all(r["status"] == "success" for r in results):
+            execution.status = "completed"
+        elif token.cancelled:
+            execution.status = token.reason
+            execution.error = f"Execution {token.reason.replace('_', ' ')}"
+        else:
+            execution.status = "failed"
+        execution.results = results
+        db.commit()
+
+    def _prepare_task_runs(self, db: Session, execution: Execution, tasks: List[Task]) -> Dict[int, TaskRun]:
+        """Load or create the execution's task runs and reset the unfinished ones to pending."""
+        task_runs = {
+            task_run.task_id: task_run
+            for task_run in db.query(TaskRun).filter(TaskRun.execution_id == execution.id)
+        }
+        # Executions from before task runs existed only have their results list
+        legacy_successes = {}
+        if not task_runs and execution.results:
+            legacy_successes = {
+                result.get("task_id"): result for result in execution.results if result.get("status") == "success"
+            }
+
+        for task in tasks:
+            task_run = task_runs.get(task.id)
+            if task_run is None:
+                task_run = TaskRun(
+                    execution_id=execution.id,
+                    task_id=task.id,
+                    status="succeeded" if task.id in legacy_successes else "pending",
+                    attempts=0,
+                    output=legacy_successes.get(task.id, {}).get("output"),
+                    idempotency_key=f"{execution.id}-{task.id}-{uuid.uuid4().hex}"
+                )
+                db.add(task_run)
+                task_runs[task.id] = task_run
+            elif task_run.status != "succeeded":
+                task_run.status = "pending"
+                task_run.error = None
+        return task_runs
+
+    @staticmethod
+    def _task_result(task_run: TaskRun) -> Dict[str, Any]:
+        task_result = {"task_id": task_run.task_id, "status": "success", "attempts": task_run.attempts}
+        if task_run.started_at and task_run.completed_at:
+            task_result.update(task_timing(task_run.started_at, task_run.completed_at))
+        if task_run.output is not None:
+            task_result["output"] = task_run.output
+        return task_result
+
+    def _update_task_run(self, execution_id: int, task_id: int, values: Dict[str, Any]):
+        db = self.session_factory()
+        try:
+            db.query(TaskRun).filter(
+                TaskRun.execution_id == execution_id,
+                TaskRun.task_id == task_id
+            ).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _run_task(self, execution_id: int, task: Task, idempotency_key: str,
+                  token: Optional[CancelToken] = None, handler: Optional[TaskHandler] = None) -> Dict[str, Any]:
+        """Run a task with retries, saving its state before and after every attempt."""
+        started_at = datetime.utcnow()
+
+        def before_attempt(attempt: int):
+            values = {"status": "running", "attempts": TaskRun.attempts + 1}
+            if attempt == 1:
+                values["started_at"] = started_at
+            self._update_task_run(execution_id, task.id, values)
+            event_bus.publish(
+                "task.started", execution_id, task.workflow_id,
+                task_id=task.id, task_type=task.task_type, status="running", attempt=attempt
+            )
+
+        task_result, attempts = self._attempt(task, execution_id, idempotency_key, token, before_attempt, handler)
+        completed_at = datetime.utcnow()
+        self._update_task_run(execution_id, task.id, {
+            "status": "succeeded" if task_result["status"] == "success" else task_result["status"],
+            "output": task_result.get("output"),
+            "error": task_result.get("error"),
+            "completed_at": completed_at
+        })
+        task_result["attempts"] = attempts
+        task_result.update(task_timing(started_at, completed_at))
+        event_bus.publish(
+            "task.succeeded" if task_result["status"] == "success" else "task.failed",
+            execution_id, task.workflow_id, **progress_fields(task_result)
+        )
+        return task_result
+
+    def _attempt(self, task: Task, execution_id: int, idempotency_key: str, token: Optional[CancelToken] = None,
+                 before_attempt: Optional[Callable[[int], None]] = None, handler: Optional[TaskHandler] = None):
+        """Run a task until it succeeds, is cancelled or runs out of attempts; returns its result and attempts."""
+        token = token or CancelToken()
+        attempts = 0
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            if before_attempt is not None:
+                before_attempt(attempt)
+            attempts += 1
+            task_result = execute_task(task, TaskContext(execution_id, idempotency_key, attempt, token), handler)
+            if task_result["status"] in ("success", "cancelled") or token.cancelled:
+                break
+            if attempt < self.retry_policy.max_attempts and token.wait(self.retry_policy.delay(attempt)):
+                break
+        return task_result, attempts
+
+    def _run_batch(self, db: Session, execution: Execution, plan: WorkflowPlan, token: CancelToken):
+        """Run the workflow once per input record and record each record's outcome.
+
+        Records are handed out as earlier ones finish, so no more than the
+        run's concurrency are in flight however long the input is. Records
+        that succeeded in an earlier attempt of this execution are kept.
+        Finished outcomes are saved every ``BATCH_CHECKPOINT_INTERVAL``
+        seconds so progress shows while the run is going.
+        """
+        execution_id = execution.id
+        records = execution.input.records
+        concurrency = max(1, execution.input.concurrency or DEFAULT_BATCH_CONCURRENCY)
+        outcomes = {
+            outcome["record"]: outcome
+            for outcome in (execution.results or []) if outcome.get("status") == "success"
+        }
+        db.commit()
+
+        binder = RecordBinder(plan.tasks)
+        last_checkpoint = time.monotonic()
+
+        def collect(futures):
+            for future in futures:
+                outcome = future.result()
+                outcomes[outcome["record"]] = outcome
+                BATCH_RECORDS.inc(status=outcome["status"])
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"batch-{execution_id}") as pool:
+            running = set()
+            for index, record in enumerate(records):
+                if index in outcomes:
+                    continue
+                if token.cancelled:
+                    break
+                if len(running) >= concurrency:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    collect(done)
+                    if time.monotonic() - last_checkpoint >= BATCH_CHECKPOINT_INTERVAL:
+                        execution.results = [outcomes[i] for i in sorted(outcomes)]
+                        db.commit()
+                        last_checkpoint = time.monotonic()
+                running.add(pool.submit(self._run_record, execution_id, plan, binder, index, record, token))
+            collect(running)
+
+        results = [outcomes.get(index, {"record": index, "status": "skipped"}) for index in range(len(records))]
+        failed = sum(1 for outcome in results if outcome["status"] != "success")
+        execution.completed_at = datetime.utcnow()
+        if not failed:
+            execution.status = "completed"
+        elif token.cancelled:
+            execution.status = token.reason
+            execution.error = f"Execution {token.reason.replace('_', ' ')}"
+        else:
+            execution.status = "failed"
+            execution.error = f"{failed} of {len(records)} records failed"
+        execution.results = results
+        db.commit()
+
+    def _run_record(self, execution_id: int, plan: WorkflowPlan, binder: RecordBinder, index: int,
+                    record: Dict[str, Any], token: CancelToken) -> Dict[str, Any]:
+        """Run the workflow's tasks for one record; returns the record's compact outcome.
+
+        Task attempts are not saved as task runs; a batch run's progress is
+        its per-record outcomes. Idempotency keys depend only on the
+        execution, record and task, so a resumed run reuses them.
+        """
+        started_at = datetime.utcnow()
+        outcome = {"record": index, "status": "success"}
+        try:
+            tasks = binder.bind(record)
+        except TemplateError as e:
+            tasks = None
+            outcome.update(status="failed", error=str(e))
+
+        if tasks is not None:
+            results = run_graph(
+                tasks,
+                lambda task: self._attempt(
+                    task, execution_id, f"{execution_id}-{index}-{task.id}", token, handler=plan.handlers[task.id]
+                )[0],
+                plan.max_concurrency or DEFAULT_MAX_CONCURRENCY,
+                None,
+                plan.dependencies
+            )
+            failure = next((result for result in results if result["status"] not in ("success", "skipped")), None)
+            if failure is not None:
+                outcome.update(status=failure["status"], task_id=failure["task_id"], error=failure.get("error"))
+        outcome["duration_ms"] = round((datetime.utcnow() - started_at).total_seconds() * 1000, 1)
+        event_bus.publish(
+            "record.succeeded" if outcome["status"] == "success" else "record.failed",
+            execution_id, plan.workflow_id, **outcome
+        )
+        return outcome
+
+def task_timing(started_at: datetime, completed_at: datetime) -> Dict[str, Any]:
+    """Start, end and duration of a task across all its attempts, for its result entry."""
+    return {
+        "started_at": started_at.isoformat(),
+        "completed_at": completed_at.isoformat(),
+        "duration_ms": round((completed_at - started_at).total_seconds() * 1000, 1)
+    }
+
+def progress_fields(task_result: Dict[str, Any]) -> Dict[str, Any]:
+    """A task result without its output, which can be large, for progress events."""
+    return {key: value for key, value in task_result.items() if key != "output"}
+
+def execute_task(task: Task, context: Optional[TaskContext] = None,
+                 handler: Optional[TaskHandler] = None) -> Dict[str, Any]:
+    """Run a task and describe the outcome as an execution result entry."""
+    task_result = {"task_id": task.id, "status": "success"}
+    try:
+        output = dispatch(task, context, handler)
+        if output is not None:
+            task_result["output"] = output
+    except TaskCancelled as e:
+        task_result["status"] = e.reason
+        task_result["error"] = str(e)
+    except TimeoutError as e:
+        task_result["status"] = "timed_out"
+        task_result["error"] = str(e)
+    except Exception as e:
+        task_result["status"] = "failed"
+        task_result["error"] = str(e)
+    return task_result
+
+execution_engine = ExecutionEngine()
+EXECUTION_QUEUE_DEPTH.set_function(lambda: {(status,): count for status, count in execution_engine.queue_depth().items()})
+EXECUTION_WORKERS.set_function(lambda: {
+    ("total",): execution_engine.max_workers,
+    ("busy",): len(execution_engine._tokens)
+})
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""A fake Salesforce/HubSpot REST API for local testing and benchmarks.
+
+Salesforce routes live under ``/salesforce`` and HubSpot routes under
+``/hubspot``, so the application can be pointed at it with
+
+    SALESFORCE_BASE_URL=http://127.0.0.1:<port>/salesforce
+    HUBSPOT_BASE_URL=http://127.0.0.1:<port>/hubspot
+
+Records are kept in memory. ``latency`` delays every response,
+``connect_delay`` delays the first request on each new connection (a
+stand-in for the TCP+TLS handshake), ``error_rate`` answers that fraction
+of requests with 503, and ``rate_limit`` answers requests beyond that many
+per second with 429 and a ``Retry-After`` header. The Salesforce sObject
+Collections (``/composite/sobjects``) and HubSpot ``batch/create|update|
+archive`` endpoints are supported as well as single-record calls.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit, parse_qs
+import threading
+import random
+import json
+import time
+import uuid
+
+class _CRMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.fake: "FakeCRMServer" = self.server.fake
+        self.fake._connection_opened()
+        time.sleep(self.fake.connect_delay)
+
+    def send_json(self, status: int, body: Optional[Any] = None, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if payload:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def dispatch(self, method: str):
+        body = self.read_json()
+        fake = self.fake
+        fake._request_received(method, self.path, body, self.headers)
+
+        throttled = fake._throttle()
+        if throttled is not None:
+            self.send_json(429, [{"errorCode": "REQUEST_LIMIT_EXCEEDED"}], {"Retry-After": str(throttled)})
+            return
+        if fake.error_rate and random.random() < fake.error_rate:
+            self.send_json(503, {"message": "Service unavailable"})
+            return
+        time.sleep(fake.latency)
+
+        status, response = fake.route(method, self.path, body)
+        self.send_json(status, response)
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+class FakeCRMServer:
+    """Threaded fake CRM API bound to localhost."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 connect_delay: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: Optional[int] = None):
+        self.latency = latency
+        self.connect_delay = connect_delay
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.requests = []
+        self.connections = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _CRMHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def _request_received(self, method: str, path: str, body: Any, headers):
+        with self._lock:
+            self.requests.append({"method": method, "path": path, "body": body, "headers": dict(headers)})
+
+    def _throttle(self) -> Optional[int]:
+        """Return a Retry-After value if this request exceeds the rate limit."""
+        if not self.rate_limit:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            if self._window_count > self.rate_limit:
+                return 1
+        return None
+
+    def _create(self, object_type: str, data: Any) -> str:
+        record_id = uuid.uuid4().hex[:18]
+        with self._lock:
+            self.records[record_id] = {"type": object_type, "data": data}
+        return record_id
+
+    def _update(self, record_id: str, data: Any) -> bool:
+        with self._lock:
+            if record_id not in self.records:
+                return False
+            self.records[record_id]["data"].update(data or {})
+            return True
+
+    def _delete(self, record_id: str) -> bool:
+        with self._lock:
+            return self.records.pop(record_id, None) is not None
+
+    def _salesforce_composite(self, method: str, query: Dict[str, List[str]], body: Any):
+        results = []
+        if method == "DELETE":
+            for record_id in ",".join(query.get("ids", [])).split(","):
+                ok = self._delete(record_id)
+                results.append({"id": record_id, "success": ok, "errors": [] if ok else [{"message": "entity is deleted"}]})
+            return 200, results
+        for record in (body or {}).get("records", []):
+            data = {k: v for k, v in record.items() if k != "attributes"}
+            if method == "POST":
+                record_id = self._create(record.get("attributes", {}).get("type"), data)
+                results.append({"id": record_id, "success": True, "errors": []})
+            else:
+                ok = self._update(data.get("Id"), data)
+                results.append({"id": data.get("Id"), "success": ok, "errors": [] if ok else [{"message": "entity is deleted"}]})
+        return 200, results
+
+    def _hubspot_batch(self, object_type: str, operation: str, body: Any):
+        results, errors = [], []
+        for item in (body or {}).get("inputs", []):
+            if operation == "create":
+                record_id = self._create(object_type, item.get("properties") or {})
+                results.append({"id": record_id, "properties": item.get("properties")})
+            elif operation == "update":
+                if self._update(item.get("id"), item.get("properties")):
+                    results.append({"id": item.get("id"), "properties": item.get("properties")})
+                else:
+                    errors.append({"message": "Object not found", "context": {"ids": [item.get("id")]}})
+            elif operation == "archive":
+                self._delete(item.get("id"))
+            else:
+                return 404, {"message": "Not found"}
+        if operation == "archive":
+            return 204, None
+        status = 207 if errors else (201 if operation == "create" else 200)
+        return status, {"status": "COMPLETE", "results": results, "errors": errors}
+
+    def route(self, method: str, path: str, body: Any):
+        url = urlsplit(path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts[:3] == ["salesforce", "composite", "sobjects"]:
+            return self._salesforce_composite(method, parse_qs(url.query), body)
+        if len(parts) == 5 and parts[0] == "hubspot" and parts[3] == "batch" and method == "POST":
+            return self._hubspot_batch(parts[2], parts[4], body)
+        if len(parts) < 3:
+            return 404, {"message": "Not found"}
+        crm, collection, object_type = parts[0], parts[1], parts[2]
+        record_id = parts[3] if len(parts) > 3 else None
+
+        if (crm, collection) not in (("salesforce", "sobjects"), ("hubspot", "objects")):
+            return 404, {"message": "Not found"}
+
+        if method == "POST" and record_id is None:
+            record_id = self._create(object_type, body or {})
+            if crm == "salesforce":
+                return 201, {"id": record_id, "success": True, "errors": []}
+            return 201, {"id": record_id, "properties": body}
+        if method == "PATCH" and record_id:
+            if not self._update(record_id, body):
+                return 404, {"message": "Not found"}
+            return (204, None) if crm == "salesforce" else (200, {"id": record_id})
+        if method == "DELETE" and record_id:
+            if not self._delete(record_id):
+                return 404, {"message": "Not found"}
+            return 204, None
+        return 405, {"message": "Method not allowed"}
+
+    def start(self) -> "FakeCRMServer":
+        threading.Thread(target=self._server.serve_forever, name="fake-crm", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake CRM API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--connect-delay", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None)
+    args = parser.parse_args()
+
+    fake = FakeCRMServer(
+        port=args.port,
+        latency=args.latency,
+        connect_delay=args.connect_delay,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit
+    ).start()
+    print(f"Fake CRM API listening on {fake.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,111 @@
+"""A fake Google Sheets and Calendar API for local testing and benchmarks.
+
+Only the calls the application makes are supported: ``values.append`` on
+Sheets and ``events.insert`` on Calendar. Point the Google clients at it with
+
+    GOOGLE_SHEETS_API_ENDPOINT=http://127.0.0.1:<port>/
+    GOOGLE_CALENDAR_API_ENDPOINT=http://127.0.0.1:<port>/calendar/v3/
+
+Rows and events are kept in memory. ``latency`` delays every response,
+``error_rate`` answers that fraction of requests with 503, and inserting an
+event with an id that already exists is answered with 409, like Calendar.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Tuple
+from urllib.parse import urlsplit, unquote
+import threading
+import random
+import json
+import time
+import uuid
+
+class _GoogleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: Any):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        fake: "FakeGoogleServer" = self.server.fake
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        fake._request_received(self.path)
+
+        if fake.error_rate and random.random() < fake.error_rate:
+            self.send_json(503, {"error": {"code": 503, "message": "The service is currently unavailable."}})
+            return
+        time.sleep(fake.latency)
+        self.send_json(*fake.route(self.path, body))
+
+class FakeGoogleServer:
+    """Threaded fake Google API bound to localhost."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rows: Dict[str, List[List[Any]]] = {}
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _GoogleHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _request_received(self, path: str):
+        with self._lock:
+            self.requests += 1
+
+    def _append(self, spreadsheet_id: str, range_name: str, values: List[List[Any]]) -> Tuple[int, Any]:
+        sheet = range_name.split("!", 1)[0]
+        key = f"{spreadsheet_id}/{sheet}"
+        with self._lock:
+            rows = self.rows.setdefault(key, [])
+            first_row = len(rows) + 1
+            rows.extend(values)
+        width = max((len(row) for row in values), default=1)
+        last_column = chr(ord("A") + max(width, 1) - 1)
+        updated_range = f"{sheet}!A{first_row}:{last_column}{first_row + len(values) - 1}"
+        return 200, {
+            "spreadsheetId": spreadsheet_id,
+            "updates": {"updatedRange": updated_range, "updatedRows": len(values)}
+        }
+
+    def _insert_event(self, calendar_id: str, event: Dict[str, Any]) -> Tuple[int, Any]:
+        event_id = event.get("id") or uuid.uuid4().hex
+        with self._lock:
+            if event_id in self.events:
+                return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+            self.events[event_id] = dict(event, id=event_id, calendarId=calendar_id)
+        return 200, self.events[event_id]
+
+    def route(self, path: str, body: Any) -> Tuple[int, Any]:
+        parts = [unquote(part) for part in urlsplit(path).path.split("/") if part]
+        # .../spreadsheets/{id}/values/{range}:append
+        if len(parts) >= 4 and parts[-4] == "spreadsheets" and parts[-2] == "values" and parts[-1].endswith(":append"):
+            return self._append(parts[-3], parts[-1][:-len(":append")], (body or {}).get("values", []))
+        # .../calendars/{id}/events
+        if len(parts) >= 3 and parts[-3] == "calendars" and parts[-1] == "events":
+            return self._insert_event(parts[-2], body or {})
+        return 404, {"error": {"code": 404, "message": "Not found"}}
+
+    def start(self) -> "FakeGoogleServer":
+        threading.Thread(target=self._server.serve_forever, name="fake-google", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""A small in-process SMTP server for local testing and benchmarks.
+
+It speaks enough SMTP for ``smtplib`` (EHLO/HELO, AUTH PLAIN/LOGIN, MAIL,
+RCPT, DATA, NOOP, RSET, QUIT), accepts any credentials unless told to
+reject them and keeps every message it receives in memory. It does not
+offer STARTTLS, so point the application at it with ``SMTP_STARTTLS=false``.
+
+    server = FakeSMTPServer(login_delay=0.2)
+    server.start()
+    ... send mail to 127.0.0.1:server.port ...
+    server.stop()
+"""
+from typing import List, Dict, Any, Optional
+import socketserver
+import threading
+import random
+import time
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server: "FakeSMTPServer" = self.server.fake
+        server._connection_opened()
+        sent_on_connection = 0
+        envelope: Dict[str, Any] = {"from": None, "to": []}
+        self.reply("220 fake-smtp ready")
+
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode(errors="replace").rstrip("\r\n")
+            command = line.split(" ", 1)[0].upper()
+
+            if command in ("EHLO", "HELO"):
+                if command == "EHLO":
+                    self.reply("250-fake-smtp")
+                    self.reply("250 AUTH PLAIN LOGIN")
+                else:
+                    self.reply("250 fake-smtp")
+            elif command == "AUTH":
+                parts = line.split()
+                if len(parts) == 2 and parts[1].upper() == "LOGIN":
+                    self.reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 3 and parts[1].upper() == "LOGIN":
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                time.sleep(server.login_delay)
+                if server.reject_logins:
+                    self.reply("535 Authentication credentials invalid")
+                else:
+                    self.reply("235 Authentication successful")
+            elif command == "MAIL":
+                envelope = {"from": line[10:].strip(), "to": []}
+                self.reply("250 OK")
+            elif command == "RCPT":
+                envelope["to"].append(line[8:].strip())
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                time.sleep(server.message_delay)
+                if server.error_rate and random.random() < server.error_rate:
+                    self.reply("451 Temporary failure, try again later")
+                    continue
+                server._message_received(envelope, b"".join(data))
+                sent_on_connection += 1
+                self.reply("250 OK: queued")
+                if server.drop_after and sent_on_connection >= server.drop_after:
+                    return
+            elif command == "NOOP":
+                self.reply("250 OK")
+            elif command == "RSET":
+                envelope = {"from": None, "to": []}
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class FakeSMTPServer:
+    """Threaded fake SMTP server bound to localhost.
+
+    ``login_delay`` and ``message_delay`` (seconds) simulate the cost of an
+    authenticated handshake and of accepting a message. ``drop_after`` closes
+    each connection after that many messages, to exercise reconnect paths.
+    ``error_rate`` rejects that fraction of messages with a 451 and
+    ``reject_logins`` answers every AUTH with a 535.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, login_delay: float = 0.0,
+                 message_delay: float = 0.0, drop_after: Optional[int] = None, error_rate: float = 0.0,
+                 reject_logins: bool = False):
+        self.login_delay = login_delay
+        self.message_delay = message_delay
+        self.drop_after = drop_after
+        self.error_rate = error_rate
+        self.reject_logins = reject_logins
+        self.messages: List[Dict[str, Any]] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), _SMTPHandler)
+        self._server.fake = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def _message_received(self, envelope: Dict[str, Any], data: bytes):
+        with self._lock:
+            self.messages.append({"from": envelope["from"], "to": list(envelope["to"]), "data": data})
+
+    def start(self) -> "FakeSMTPServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-smtp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake SMTP server")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--login-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeSMTPServer(port=args.port, login_delay=args.login_delay).start()
+    print(f"Fake SMTP server listening on {fake.host}:{fake.port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,409 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Type
+from models import Task
+from services.google_service import GoogleService
+from services.crm_service import CRMService
+from services.employee_service import EmployeeService
+from services.crm_batcher import CRMBatcher
+from services.sheets_buffer import SheetsBuffer
+from metrics import Counter, Gauge, Histogram
+import asyncio
+import functools
+import threading
+import json
+import time
+import os
+
+# Initialize services
+google_service = GoogleService()
+crm_service = CRMService()
+employee_service = EmployeeService()
+crm_batcher = CRMBatcher(
+    crm_service,
+    max_delay=float(os.getenv('CRM_BATCH_MAX_DELAY', 0.05))
+) if os.getenv('CRM_BATCHING', 'true').lower() == 'true' else None
+sheets_buffer = SheetsBuffer(
+    google_service,
+    max_rows=int(os.getenv('SHEETS_BUFFER_MAX_ROWS', 500)),
+    max_delay=float(os.getenv('SHEETS_BUFFER_MAX_DELAY', 1.0))
+) if os.getenv('SHEETS_BUFFERING', 'true').lower() == 'true' else None
+
+TASK_DURATION = Histogram(
+    "workflow_task_duration_seconds",
+    "Duration of a single task attempt, from dispatch until the engine has its outcome",
+    ["task_type", "status"]
+)
+TASKS_IN_FLIGHT = Gauge(
+    "workflow_tasks_in_flight",
+    "Handler runs currently holding a concurrency slot or handler thread",
+    ["task_type"]
+)
+SMTP_POOL_CONNECTIONS = Gauge(
+    "workflow_smtp_pool_connections",
+    "SMTP connections by state",
+    ["state"]
+).set_function(lambda: {
+    (state,): value for state, value in employee_service.smtp_pool.stats().items()
+    if state in ("max_size", "in_use", "idle")
+})
+CRM_HTTP_REQUESTS = Counter(
+    "workflow_crm_http_requests_total",
+    "CRM HTTP client requests, retries, rate limited answers and failures",
+    ["outcome"]
+).set_function(lambda: {(outcome,): value for outcome, value in crm_service.http.counters.items()})
+
+class TaskCancelled(Exception):
+    """Raised when a task is stopped because its execution was cancelled or timed out."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Execution {reason.replace('_', ' ')}")
+        self.reason = reason
+
+class CancelToken:
+    """Shared flag telling the tasks of one execution to stop.
+
+    ``cancel`` records why (``"cancelled"`` or ``"timed_out"``) and runs the
+    registered callbacks, which is how ``dispatch`` stops waiting on a task
+    straight away. Long-running handlers can also poll ``cancelled`` or
+    sleep with ``wait``.
+    """
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``callback`` on cancellation (now, if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelled(self.reason)
+
+    def wait(self, seconds: Optional[float]) -> bool:
+        """Sleep up to ``seconds``; returns True early if cancelled."""
+        return self._event.wait(seconds)
+
+class TaskContext:
+    """What a handler knows about the run it is part of, besides the task itself.
+
+    ``idempotency_key`` stays the same across retries and resumes of the
+    same task in the same execution; handlers pass it on to integrations
+    that can use it to drop duplicate requests. ``attempt`` counts from 1.
+    ``cancel_token`` is cancelled when the execution is cancelled or runs
+    out of time.
+    """
+
+    def __init__(self, execution_id: Optional[int] = None, idempotency_key: Optional[str] = None,
+                 attempt: int = 1, cancel_token: Optional[CancelToken] = None):
+        self.execution_id = execution_id
+        self.idempotency_key = idempotency_key
+        self.attempt = attempt
+        self.cancel_token = cancel_token or CancelToken()
+
+class TaskHandler:
+    """Base class for task handlers.
+
+    Subclasses set ``task_type`` and implement ``run(task, context)``. Handlers doing
+    blocking I/O leave ``is_async`` False and are run on a thread pool;
+    handlers with ``is_async`` True implement ``run`` as a coroutine and are
+    run on the shared event loop. ``timeout`` (seconds) bounds a single run
+    unless the task sets its own, and ``max_concurrency`` bounds how many
+    runs of this type happen at once
+    across all executions in the process. ``run`` raises on failure and may
+    return a JSON-serializable output that is recorded in the task result.
+    """
+    task_type: str = None
+    is_async: bool = False
+    timeout: Optional[float] = None
+    max_concurrency: Optional[int] = None
+
+    def __init__(self):
+        self.slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+
+    def run(self, task: Task, context: TaskContext):
+        raise NotImplementedError
+
+HANDLERS: Dict[str, TaskHandler] = {}
+
+def register_handler(handler_class: Type[TaskHandler]) -> Type[TaskHandler]:
+    """Class decorator adding a handler to the registry under its task type."""
+    HANDLERS[handler_class.task_type] = handler_class()
+    return handler_class
+
+def get_handler(task_type: str) -> TaskHandler:
+    handler = HANDLERS.get(task_type)
+    if handler is None:
+        raise ValueError(f"Unknown task type: {task_type}")
+    return handler
+
+_blocking_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv('HANDLER_THREADS', 32)),
+    thread_name_prefix="task-handler"
+)
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop async handlers run on, starting it on first use."""
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_event_loop.run_forever,
+                name="task-handler-loop",
+                daemon=True
+            ).start()
+        return _event_loop
+
+async def run_blocking(fn, *args):
+    """Run a blocking call on the handler thread pool from an async handler."""
+    return await asyncio.get_running_loop().run_in_executor(_blocking_pool, functools.partial(fn, *args))
+
+def _acquire_slot(handler: TaskHandler, token: CancelToken, deadline: Optional[float]) -> bool:
+    """Wait for one of the handler's concurrency slots, giving up on cancellation or the deadline."""
+    while not handler.slots.acquire(timeout=0.05):
+        if token.cancelled or (deadline is not None and time.monotonic() >= deadline):
+            return False
+    return True
+
+def dispatch(task: Task, context: Optional[TaskContext] = None, handler: Optional[TaskHandler] = None):
+    """Run a task through its handler and wait for it to finish.
+
+    ``handler`` is the one a compiled plan resolved for the task; without it
+    the handler registered for the task's type is looked up.
+
+    Waiting stops as soon as the task's timeout passes or its execution is
+    cancelled, raising ``TimeoutError`` or ``TaskCancelled``. Async handlers
+    are cancelled; a blocking handler's thread can't be interrupted, so it
+    keeps its concurrency slot until its own I/O timeouts let it return.
+    """
+    handler = handler or get_handler(task.task_type)
+    start = time.perf_counter()
+    status = "failed"
+    try:
+        output = _dispatch(handler, task, context)
+        status = "success"
+        return output
+    except TaskCancelled as e:
+        status = e.reason
+        raise
+    except TimeoutError:
+        status = "timed_out"
+        raise
+    finally:
+        TASK_DURATION.observe(time.perf_counter() - start, task_type=task.task_type, status=status)
+
+def _dispatch(handler: TaskHandler, task: Task, context: Optional[TaskContext]):
+    context = context or TaskContext()
+    token = context.cancel_token
+    timeout = getattr(task, "timeout", None) or handler.timeout
+    deadline = time.monotonic() + timeout if timeout else None
+    token.raise_if_cancelled()
+
+    if handler.slots is not None and not _acquire_slot(handler, token, deadline):
+        token.raise_if_cancelled()
+        raise TimeoutError(f"Task {task.id} ({task.task_type}) timed out after {timeout}s waiting for a slot")
+
+    finished = threading.Event()
+
+    def on_done(_):
+        TASKS_IN_FLIGHT.dec(task_type=task.task_type)
+        if handler.slots is not None:
+            handler.slots.release()
+        finished.set()
+
+    TASKS_IN_FLIGHT.inc(task_type=task.task_type)
+    try:
+        if handler.is_async:
+            future = asyncio.run_coroutine_threadsafe(handler.run(task, context), get_event_loop())
+        else:
+            future = _blocking_pool.submit(handler.run, task, context)
+    except Exception:
+        TASKS_IN_FLIGHT.dec(task_type=task.task_type)
+        if handler.slots is not None:
+            handler.slots.release()
+        raise
+    future.add_done_callback(on_done)
+    unregister = token.on_cancel(finished.set)
+    try:
+        finished.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if future.done() and not future.cancelled():
+            return future.result()
+        future.cancel()
+        token.raise_if_cancelled()
+        raise TimeoutError(f"Task {task.id} ({task.task_type}) timed out after {timeout}s")
+    finally:
+        unregister()
+
+def shutdown():
+    """Flush buffered integration writes; call when the application stops."""
+    if crm_batcher is not None:
+        crm_batcher.stop()
+    if sheets_buffer is not None:
+        sheets_buffer.stop()
+
+def task_config(task: Task) -> Dict[str, Any]:
+    """Return the task config as a dict; older rows stored it as a JSON string."""
+    if isinstance(task.config, str):
+        return json.loads(task.config)
+    return task.config or {}
+
+@register_handler
+class EmailHandler(TaskHandler):
+    task_type = "email"
+    timeout = 60.0
+    max_concurrency = 10
+
+    def run(self, task: Task, context: TaskContext):
+        success = employee_service.send_email(
+            task.email_to,
+            task.email_subject,
+            task.email_body,
+            idempotency_key=context.idempotency_key
+        )
+        if not success:
+            raise Exception("Failed to send email")
+
+@register_handler
+class GoogleSheetsHandler(TaskHandler):
+    task_type = "google_sheets"
+    timeout = 60.0
+    # Waiting on the buffer holds no thread, so many tasks can fill one append
+    is_async = True
+    max_concurrency = 500
+
+    async def run(self, task: Task, context: TaskContext):
+        if sheets_buffer is None:
+            success = await run_blocking(
+                google_service.update_google_sheet,
+                task.spreadsheet_id,
+                task.sheet_name,
+                task_config(task),
+                task.data_range
+            )
+            if not success:
+                raise Exception("Failed to update Google Sheet")
+            return None
+
+        result = await asyncio.wrap_future(sheets_buffer.append(
+            task.spreadsheet_id,
+            task.sheet_name,
+            google_service.row_from_data(task_config(task)),
+            task.data_range
+        ))
+        if not result["success"]:
+            raise Exception(f"Failed to update Google Sheet: {result.get('error')}")
+        return {"range": result["range"]} if result["range"] else None
+
+@register_handler
+class GoogleCalendarHandler(TaskHandler):
+    task_type = "google_calendar"
+    timeout = 60.0
+    max_concurrency = 10
+
+    def run(self, task: Task, context: TaskContext):
+        success = google_service.create_calendar_event(
+            task.calendar_id,
+            {
+                "title": task.event_title,
+                "description": task.event_description,
+                "start": task.event_start.isoformat(),
+                "end": task.event_end.isoformat()
+            },
+            idempotency_key=context.idempotency_key
+        )
+        if not success:
+            raise Exception("Failed to create calendar event")
+
+@register_handler
+class CRMUpdateHandler(TaskHandler):
+    task_type = "crm_update"
+    timeout = 30.0
+    # Waiting on the batcher holds no thread, so many tasks can fill one batch
+    is_async = True
+    max_concurrency = 200
+
+    async def run(self, task: Task, context: TaskContext):
+        if crm_batcher is None:
+            success = await run_blocking(
+                crm_service.update_crm,
+                task.crm_type,
+                task.crm_object,
+                task.crm_action,
+                task_config(task),
+                context.idempotency_key
+            )
+            if not success:
+                raise Exception("Failed to update CRM")
+            return None
+
+        result = await asyncio.wrap_future(crm_batcher.submit(
+            task.crm_type,
+            task.crm_object,
+            task.crm_action,
+            task_config(task),
+            context.idempotency_key
+        ))
+        if not result["success"]:
+            raise Exception(f"Failed to update CRM: {'; '.join(str(error) for error in result['errors'])}")
+        return {"id": result["id"]} if result["id"] else None
+
+@register_handler
+class EmployeeAssignmentHandler(TaskHandler):
+    task_type = "employee_assignment"
+    timeout = 60.0
+    max_concurrency = 5
+
+    def run(self, task: Task, context: TaskContext):
+        success = employee_service.create_assignment(
+            task.assignee_email,
+            task.assignment_title,
+            task.assignment_description,
+            task.due_date,
+            idempotency_key=context.idempotency_key
+        )
+        if not success:
+            raise Exception("Failed to create employee assignment")
+
+class NoopHandler(TaskHandler):
+    """Placeholder for task types that have no integration yet; always succeeds."""
+    is_async = True
+
+    async def run(self, task: Task, context: TaskContext):
+        return None
+
+@register_handler
+class APICallHandler(NoopHandler):
+    task_type = "api_call"
+
+@register_handler
+class FileUploadHandler(NoopHandler):
+    task_type = "file_upload"
@@ -1,7 +1,8 @@
-from database import Base, engine
+from database import engine
+from migrations import migrate
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    migrate(engine)
 
 if __name__ == "__main__":
     print("Creating database tables...")
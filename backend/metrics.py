@@ -0,0 +1,201 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+from prometheus_client import CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import Counter as PrometheusCounter, Gauge as PrometheusGauge, Histogram as PrometheusHistogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+import time
+
+# Seconds; spans fast DB statements up to slow integration calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+LabelValues = Tuple[str, ...]
+
+# Statement counters of the enclosing ``count_queries`` blocks, innermost last
+_query_counters: ContextVar[Tuple["QueryCount", ...]] = ContextVar("query_counters", default=())
+
+class Registry(CollectorRegistry):
+    """The set of metrics rendered by the ``/metrics`` endpoint."""
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return generate_latest(self).decode()
+
+REGISTRY = Registry()
+
+class Metric:
+    """A named ``prometheus_client`` metric with a fixed set of label names.
+
+    Labels are passed as keyword arguments to each update, e.g.
+    ``TASK_DURATION.observe(0.2, task_type="email")``. Counters and gauges
+    can instead be given a function with ``set_function``; it is called
+    when the metrics are scraped, which suits values that already exist
+    elsewhere, like queue depth or pool sizes.
+    """
+    metric_class = None
+    family_class = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY, **options):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._metric = self.metric_class(name, documentation, self.labelnames, registry=None, **options)
+        self._function: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None
+        if registry is not None:
+            registry.register(self)
+
+    def _child(self, labels: Dict[str, str]):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return self._metric.labels(**labels) if self.labelnames else self._metric
+
+    def set_function(self, function: Callable[[], Union[float, Dict[LabelValues, float]]]):
+        """Compute the metric at scrape time; without labels ``function`` returns a number,
+        otherwise a dict mapping label value tuples to numbers."""
+        self._function = function
+        return self
+
+    def describe(self):
+        return self._metric.describe()
+
+    def collect(self):
+        if self._function is None:
+            return self._metric.collect()
+        try:
+            values = self._function()
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {str(e)}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        family = self.family_class(self.name, self.documentation, labels=self.labelnames)
+        for key, value in sorted(values.items()):
+            family.add_metric([str(label) for label in key], value)
+        return [family]
+
+class Counter(Metric):
+    metric_class = PrometheusCounter
+    family_class = CounterMetricFamily
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self._child(labels).inc(amount)
+
+class Gauge(Metric):
+    metric_class = PrometheusGauge
+    family_class = GaugeMetricFamily
+
+    def set(self, value: float, **labels: str):
+        self._child(labels).set(value)
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self._child(labels).inc(amount)
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self._child(labels).dec(amount)
+
+class Histogram(Metric):
+    """Observations counted into fixed ``buckets`` (upper bounds in seconds), plus their sum."""
+    metric_class = PrometheusHistogram
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry, buckets=tuple(sorted(buckets)))
+
+    def observe(self, value: float, **labels: str):
+        self._child(labels).observe(value)
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe how long the block takes, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def set_function(self, function):
+        raise TypeError("Histograms can only be updated with observe")
+
+class QueryCount:
+    """Number of SQL statements run inside a ``count_queries`` block."""
+
+    def __init__(self):
+        self.count = 0
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements run by this thread, or this request's threads, inside the block.
+
+    The counter lives in a context variable, so work Starlette hands to its
+    thread pool for the same request is counted too, and concurrent requests
+    don't see each other's statements.
+    """
+    counter = QueryCount()
+    token = _query_counters.set(_query_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _query_counters.reset(token)
+
+DB_QUERY_DURATION = Histogram(
+    "workflow_db_query_duration_seconds",
+    "Time spent executing SQL statements",
+    ["operation"]
+)
+DB_SESSION_DURATION = Histogram(
+    "workflow_db_session_duration_seconds",
+    "Time a session held a pooled database connection, from checkout to checkin"
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "workflow_db_pool_connections",
+    "Database connections by state; checked_out against size plus overflow is pool utilization",
+    ["state"]
+)
+
+def instrument_engine(engine):
+    """Time SQL statements and connection checkouts on ``engine`` and report its pool usage."""
+    from sqlalchemy import event
+
+    # Start times are keyed by cursor, so a statement that fails can't shift the timings of later ones
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", {})[id(cursor)] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop(id(cursor), None)
+        if start is None:
+            return
+        for counter in _query_counters.get():
+            counter.count += 1
+        DB_QUERY_DURATION.observe(time.perf_counter() - start, operation=statement.split(None, 1)[0].upper())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        context = exception_context.execution_context
+        if exception_context.connection is not None and context is not None:
+            exception_context.connection.info.get("query_start", {}).pop(id(context.cursor), None)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_time"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        start = connection_record.info.pop("checkout_time", None)
+        if start is not None:
+            DB_SESSION_DURATION.observe(time.perf_counter() - start)
+
+    def pool_connections():
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return {}
+        values = {("checked_out",): pool.checkedout()}
+        if hasattr(pool, "size"):
+            values[("size",)] = pool.size()
+            values[("idle",)] = pool.checkedin()
+            values[("overflow",)] = max(0, pool.overflow())
+        return values
+    DB_POOL_CONNECTIONS.set_function(pool_connections)
\ No newline at end of file
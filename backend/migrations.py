@@ -0,0 +1,94 @@
+from sqlalchemy import inspect, select, update, table, column, bindparam, JSON, Integer, String
+from sqlalchemy.engine import Engine
+from models import Base, ExecutionResult, new_revision
+import json
+
+def add_missing_columns(engine: Engine):
+    """Add model columns that existing tables don't have yet.
+
+    ``create_all`` only creates missing tables, so columns added to a model
+    after its table was created are added here with ``ALTER TABLE``.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for model_table in Base.metadata.sorted_tables:
+            if not inspector.has_table(model_table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(model_table.name)}
+            for col in model_table.columns:
+                if col.name in existing:
+                    continue
+                column_type = col.type.compile(dialect=engine.dialect)
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.quote(model_table.name)} ADD COLUMN {preparer.quote(col.name)} {column_type}"
+                )
+
+def create_missing_indexes(engine: Engine):
+    inspector = inspect(engine)
+    for model_table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(model_table.name)}
+        for index in model_table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+
+def move_execution_results(engine: Engine, batch_size: int = 500):
+    """Move results from the legacy ``executions.results`` column into ``execution_results``.
+
+    Rows are moved in small batches, each in its own transaction, and the
+    legacy value is cleared once copied so the move can resume if it is
+    interrupted.
+    """
+    if "results" not in {col["name"] for col in inspect(engine).get_columns("executions")}:
+        return
+
+    legacy = table("executions", column("id", Integer), column("results", JSON(none_as_null=True)))
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(legacy.c.id, legacy.c.results)
+                .where(legacy.c.results.isnot(None))
+                .order_by(legacy.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return
+
+            moved = []
+            for execution_id, results in rows:
+                # Older rows stored results as a JSON-encoded string
+                if isinstance(results, str):
+                    results = json.loads(results)
+                if results is not None:
+                    moved.append({"execution_id": execution_id, "data": results})
+            existing = set(connection.execute(
+                select(ExecutionResult.execution_id)
+                .where(ExecutionResult.execution_id.in_([row.id for row in rows]))
+            ).scalars())
+            moved = [row for row in moved if row["execution_id"] not in existing]
+            if moved:
+                connection.execute(ExecutionResult.__table__.insert(), moved)
+            connection.execute(
+                update(legacy)
+                .where(legacy.c.id.in_([row.id for row in rows]))
+                .values(results=None)
+            )
+
+def fill_workflow_revisions(engine: Engine):
+    """Give workflows from before ``revision`` existed a revision, so their plans can be cached."""
+    workflows = table("workflows", column("id", Integer), column("revision", String))
+    with engine.begin() as connection:
+        ids = connection.execute(select(workflows.c.id).where(workflows.c.revision.is_(None))).scalars().all()
+        if ids:
+            connection.execute(
+                update(workflows).where(workflows.c.id == bindparam("workflow_id")).values(revision=bindparam("new_revision")),
+                [{"workflow_id": workflow_id, "new_revision": new_revision()} for workflow_id in ids]
+            )
+
+def migrate(engine: Engine):
+    """Bring a database of any earlier version up to date with the models."""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    move_execution_results(engine)
+    fill_workflow_revisions(engine)
@@ -1,10 +1,32 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, JSON, Boolean, Text, LargeBinary, Index, UniqueConstraint, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
+import json
+import uuid
+import zlib
 
 Base = declarative_base()
 
+def new_revision() -> str:
+    return uuid.uuid4().hex
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as a zlib-compressed blob."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode())
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return json.loads(zlib.decompress(value))
+
 class Workflow(Base):
     __tablename__ = "workflows"
 
@@ -15,6 +37,10 @@ class Workflow(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
     schedule = Column(String, nullable=True)  # Cron expression for scheduling
+    max_concurrency = Column(Integer, nullable=True)  # Max tasks running at once; None uses the default
+    timeout = Column(Float, nullable=True)  # Wall-clock seconds an execution may take; None uses the default
+    # Replaced whenever the workflow or its tasks change; never reused, even if a deleted workflow's id is, so it keys cached plans
+    revision = Column(String, default=new_revision, index=True)
     tasks = relationship("Task", back_populates="workflow", order_by="Task.order")
 
 class Task(Base):
@@ -26,6 +52,8 @@ class Task(Base):
     task_type = Column(String)  # email, api_call, file_upload, google_sheets, google_calendar, crm_update, employee_assignment
     config = Column(JSON)  # Task-specific configuration
     order = Column(Integer)  # Order of execution in workflow
+    depends_on = Column(JSON, nullable=True)  # Ids of tasks to wait for; None waits for the previous order
+    timeout = Column(Float, nullable=True)  # Seconds one attempt may take; None uses the handler's default
     workflow = relationship("Workflow", back_populates="tasks")
 
     # Task type specific configurations
@@ -59,11 +87,145 @@ class Task(Base):
 
 class Execution(Base):
     __tablename__ = "executions"
+    __table_args__ = (
+        Index("ix_executions_started_at", "started_at"),
+        Index("ix_executions_workflow_id_started_at", "workflow_id", "started_at"),
+        Index("ix_executions_workflow_id_id", "workflow_id", "id"),  # A workflow's executions, newest first
+        Index("ix_executions_status_started_at", "status", "started_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     workflow_id = Column(Integer, ForeignKey("workflows.id"))
     started_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
-    status = Column(String)  # running, completed, failed
+    status = Column(String)  # queued, running, completed, failed, cancelled, timed_out
     error = Column(String, nullable=True)
-    results = Column(JSON, nullable=True) 
\ No newline at end of file
+    deadline_at = Column(DateTime, nullable=True)  # When a running execution times out
+    cancel_requested = Column(Boolean, default=False)  # Checked by whichever worker runs it
+    claimed_by = Column(String, nullable=True)  # Engine instance running it
+    heartbeat_at = Column(DateTime, nullable=True)  # Renewed while running; a stale one means the worker died
+    record_count = Column(Integer, nullable=True)  # Input records of a batch run; None for a single run
+    # Task results live in execution_results so listing executions stays cheap
+    result = relationship("ExecutionResult", uselist=False, cascade="all, delete-orphan")
+    input = relationship("ExecutionInput", uselist=False, cascade="all, delete-orphan")
+
+    @property
+    def results(self):
+        return self.result.data if self.result is not None else None
+
+    @results.setter
+    def results(self, value):
+        if self.result is None:
+            self.result = ExecutionResult(data=value)
+        else:
+            self.result.data = value
+
+class TaskRun(Base):
+    """State of one task within one execution, saved as the task progresses.
+
+    Resuming an execution skips tasks whose run has succeeded. The
+    idempotency key is created once and reused by every attempt, so retried
+    outbound calls can be recognised as duplicates.
+    """
+    __tablename__ = "task_runs"
+    __table_args__ = (
+        UniqueConstraint("execution_id", "task_id", name="uq_task_runs_execution_id_task_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    execution_id = Column(Integer, ForeignKey("executions.id"), index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"))
+    status = Column(String, default="pending")  # pending, running, succeeded, failed, skipped, cancelled, timed_out
+    attempts = Column(Integer, default=0)
+    output = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    idempotency_key = Column(String)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+
+class ExecutionResult(Base):
+    __tablename__ = "execution_results"
+
+    execution_id = Column(Integer, ForeignKey("executions.id"), primary_key=True)
+    data = Column(CompressedJSON, nullable=True) 
+
+class ExecutionInput(Base):
+    """The records a batch run takes its task templates from, one run of the workflow each."""
+    __tablename__ = "execution_inputs"
+
+    execution_id = Column(Integer, ForeignKey("executions.id"), primary_key=True)
+    records = Column(CompressedJSON)
+    concurrency = Column(Integer, nullable=True)  # Records run at once; None uses BATCH_CONCURRENCY
+
+class ExecutionDailyStats(Base):
+    """Per-workflow totals for one UTC day of executions, kept after the executions are archived."""
+    __tablename__ = "execution_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("workflow_id", "day", name="uq_execution_daily_stats_workflow_id_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"))
+    day = Column(Date)
+    executions = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    cancelled = Column(Integer, default=0)
+    timed_out = Column(Integer, default=0)
+    # Start to completion; percentiles are of the day's executions as first rolled up
+    duration_p50_ms = Column(Float, nullable=True)
+    duration_p95_ms = Column(Float, nullable=True)
+    duration_p99_ms = Column(Float, nullable=True)
+    duration_max_ms = Column(Float, nullable=True)
+
+class ExecutionArchive(Base):
+    """One gzip NDJSON file of archived executions, and which ids it holds.
+
+    ``purged_at`` is set once the archived rows have been deleted from
+    ``executions``; until then the retention job keeps deleting them.
+    """
+    __tablename__ = "execution_archives"
+    __table_args__ = (
+        Index("ix_execution_archives_first_last", "first_execution_id", "last_execution_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String)
+    day = Column(Date)
+    first_execution_id = Column(Integer)
+    last_execution_id = Column(Integer)
+    row_count = Column(Integer)
+    execution_ids = Column(CompressedJSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    purged_at = Column(DateTime, nullable=True)
+
+class SchedulerLease(Base):
+    """Time-limited lease held by the one process whose scheduler fires jobs."""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String)
+    expires_at = Column(DateTime)
+
+class ScheduledFire(Base):
+    """One row per scheduled run; the unique key stops a fire from running twice."""
+    __tablename__ = "scheduled_fires"
+    __table_args__ = (
+        UniqueConstraint("workflow_id", "fire_time", name="uq_scheduled_fires_workflow_id_fire_time"),
+        Index("ix_scheduled_fires_fire_time", "fire_time"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"))
+    fire_time = Column(DateTime)  # Scheduled (not actual) run time, UTC
+    execution_id = Column(Integer, ForeignKey("executions.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RateLimitBucket(Base):
+    """Token bucket state shared by all processes when RATE_LIMIT_BACKEND=database."""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)  # integration:hashed credential
+    tokens = Column(Float)
+    updated_at = Column(Float)  # Unix time of the last refill
+    version = Column(Integer, default=0)
\ No newline at end of file
@@ -0,0 +1,56 @@
+from sqlalchemy import DateTime, tuple_
+from sqlalchemy.orm import Query
+from typing import Any, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: List[Any]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong number of values")
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+def keyset_page(query: Query, columns: List[Any], limit: int, cursor: Optional[str] = None,
+                skip: int = 0, descending: bool = False) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page ordered by ``columns`` and the cursor for the next one.
+
+    ``columns`` must uniquely order rows (end with the primary key). With a
+    cursor the page starts right after the row it points at, using a
+    row-value comparison that an index on ``columns`` can seek to, so the
+    cost doesn't grow with page depth. Without one, ``skip`` is applied as a
+    plain offset for compatibility. The next cursor is None on the last page.
+    """
+    if cursor:
+        boundary = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(boundary < values if descending else boundary > values)
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if not cursor and skip:
+        query = query.offset(skip)
+    items = query.limit(limit).all()
+
+    next_cursor = None
+    if limit and len(items) == limit:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return items, next_cursor
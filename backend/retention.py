@@ -0,0 +1,294 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Iterator, List, Optional
+from datetime import date, datetime, timedelta
+from database import SessionLocal
+from models import (
+    Execution, ExecutionResult, ExecutionInput, TaskRun, ScheduledFire,
+    ExecutionDailyStats, ExecutionArchive
+)
+from metrics import Counter
+import gzip
+import json
+import math
+import os
+
+# Raw executions older than this many days are archived and deleted from the
+# database; unset or 0, the default, keeps them forever
+RETENTION_DAYS = int(os.getenv('EXECUTION_RETENTION_DAYS') or 0)
+# Seconds between retention runs
+RETENTION_INTERVAL = int(os.getenv('EXECUTION_RETENTION_INTERVAL', 3600))
+# Executions deleted per transaction, to keep write locks short
+RETENTION_DELETE_BATCH = int(os.getenv('EXECUTION_RETENTION_DELETE_BATCH', 500))
+ARCHIVE_SEGMENT_SIZE = int(os.getenv('EXECUTION_ARCHIVE_SEGMENT_SIZE', 10000))
+# Resolved once, so the paths stored in execution_archives don't depend on the working directory
+ARCHIVE_DIR = os.path.abspath(os.getenv('EXECUTION_ARCHIVE_DIR', 'archive'))
+# Executions that can no longer change; queued and running ones are left until they finish
+FINISHED_STATUSES = ("completed", "failed", "cancelled", "timed_out")
+
+EXECUTIONS_ARCHIVED = Counter(
+    "workflow_executions_archived_total",
+    "Executions moved from the database to archive segments"
+)
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+def duration_ms(started_at: Optional[datetime], completed_at: Optional[datetime]) -> Optional[float]:
+    if started_at is None or completed_at is None:
+        return None
+    return round((completed_at - started_at).total_seconds() * 1000, 1)
+
+def archive_value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+def day_bounds(day: date):
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+def finished_before(start: datetime, end: datetime):
+    return (
+        Execution.started_at >= start,
+        Execution.started_at < end,
+        Execution.status.in_(FINISHED_STATUSES)
+    )
+
+def roll_up_day(db: Session, day: date):
+    """Add the day's finished executions to ``execution_daily_stats``; the caller commits.
+
+    A workflow's day is normally rolled up once. If executions from an
+    already rolled up day finish later, their counts are added and the
+    percentiles are left as they were.
+    """
+    start, end = day_bounds(day)
+    rows = db.query(Execution.workflow_id, Execution.status, Execution.started_at, Execution.completed_at).filter(
+        *finished_before(start, end)
+    )
+    by_workflow: Dict[int, Dict[str, Any]] = {}
+    for workflow_id, status, started_at, completed_at in rows:
+        totals = by_workflow.setdefault(workflow_id, {"executions": 0, "durations": [], **{s: 0 for s in FINISHED_STATUSES}})
+        totals["executions"] += 1
+        totals[status] += 1
+        duration = duration_ms(started_at, completed_at)
+        if duration is not None:
+            totals["durations"].append(duration)
+
+    existing = {
+        stats.workflow_id: stats
+        for stats in db.query(ExecutionDailyStats).filter(
+            ExecutionDailyStats.day == day,
+            ExecutionDailyStats.workflow_id.in_(list(by_workflow))
+        )
+    }
+    for workflow_id, totals in by_workflow.items():
+        durations = sorted(totals.pop("durations"))
+        stats = existing.get(workflow_id)
+        if stats is None:
+            db.add(ExecutionDailyStats(
+                workflow_id=workflow_id,
+                day=day,
+                duration_p50_ms=percentile(durations, 0.50),
+                duration_p95_ms=percentile(durations, 0.95),
+                duration_p99_ms=percentile(durations, 0.99),
+                duration_max_ms=durations[-1] if durations else None,
+                **totals
+            ))
+            continue
+        for name, count in totals.items():
+            setattr(stats, name, (getattr(stats, name) or 0) + count)
+        if durations and (stats.duration_max_ms is None or durations[-1] > stats.duration_max_ms):
+            stats.duration_max_ms = durations[-1]
+
+def task_runs_by_execution(db: Session, execution_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    task_runs: Dict[int, List[Dict[str, Any]]] = {}
+    columns = [column for column in TaskRun.__table__.columns if column.name != "execution_id"]
+    for start in range(0, len(execution_ids), RETENTION_DELETE_BATCH):
+        rows = db.execute(select(TaskRun.execution_id, *columns).where(
+            TaskRun.execution_id.in_(execution_ids[start:start + RETENTION_DELETE_BATCH])
+        ).order_by(TaskRun.id))
+        for row in rows:
+            values = row._mapping
+            task_runs.setdefault(values["execution_id"], []).append(
+                {column.name: archive_value(values[column.name]) for column in columns}
+            )
+    return task_runs
+
+def archived_rows(db: Session, day: date) -> Iterator[List[Dict[str, Any]]]:
+    """The day's finished executions, ``ARCHIVE_SEGMENT_SIZE`` at a time, by id.
+
+    Each row carries everything that is deleted with the execution: its
+    results, a batch run's input records and concurrency (``input``) and
+    its checkpointed task runs (``task_runs``).
+    """
+    start, end = day_bounds(day)
+    statement = select(
+        *Execution.__table__.columns, ExecutionResult.data.label("results"),
+        ExecutionInput.records.label("input_records"), ExecutionInput.concurrency.label("input_concurrency")
+    ).outerjoin(ExecutionResult, ExecutionResult.execution_id == Execution.id).outerjoin(
+        ExecutionInput, ExecutionInput.execution_id == Execution.id
+    ).where(
+        *finished_before(start, end)
+    ).order_by(Execution.id)
+    result = db.execute(statement.execution_options(yield_per=ARCHIVE_SEGMENT_SIZE))
+    for partition in result.partitions():
+        rows = []
+        for row in partition:
+            values = {key: archive_value(value) for key, value in row._mapping.items()}
+            records, concurrency = values.pop("input_records"), values.pop("input_concurrency")
+            values["input"] = None if records is None else {"records": records, "concurrency": concurrency}
+            rows.append(values)
+        task_runs = task_runs_by_execution(db, [values["id"] for values in rows])
+        for values in rows:
+            values["task_runs"] = task_runs.get(values["id"], [])
+        yield rows
+
+def write_segment(day: date, rows: List[Dict[str, Any]]) -> str:
+    """Write one gzip NDJSON segment, one execution per line in id order; returns its path."""
+    directory = os.path.join(ARCHIVE_DIR, f"{day:%Y}", f"{day:%m}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"executions-{day.isoformat()}-{rows[0]['id']}-{rows[-1]['id']}.ndjson.gz")
+    partial = f"{path}.partial"
+    with gzip.open(partial, "wt", encoding="utf-8") as archive:
+        for row in rows:
+            # Compact separators and "id" first let lookups match a line by its prefix
+            archive.write(json.dumps(row, separators=(",", ":"), default=str) + "\n")
+    os.replace(partial, path)
+    return path
+
+def archive_day(db: Session, day: date) -> List[ExecutionArchive]:
+    """Roll up and write out a day of executions; returns the committed, not yet purged, segments."""
+    segments = []
+    paths = []
+    try:
+        for rows in archived_rows(db, day):
+            path = write_segment(day, rows)
+            paths.append(path)
+            segments.append(ExecutionArchive(
+                path=path,
+                day=day,
+                first_execution_id=rows[0]["id"],
+                last_execution_id=rows[-1]["id"],
+                row_count=len(rows),
+                execution_ids=[row["id"] for row in rows]
+            ))
+        roll_up_day(db, day)
+        db.add_all(segments)
+        db.commit()
+    except Exception:
+        db.rollback()
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return segments
+
+def delete_executions(db: Session, execution_ids: List[int]):
+    """Delete executions and the rows that refer to them; the caller commits."""
+    db.query(TaskRun).filter(TaskRun.execution_id.in_(execution_ids)).delete(synchronize_session=False)
+    db.query(ExecutionResult).filter(ExecutionResult.execution_id.in_(execution_ids)).delete(synchronize_session=False)
+    db.query(ExecutionInput).filter(ExecutionInput.execution_id.in_(execution_ids)).delete(synchronize_session=False)
+    # Fire records stay, so the run isn't fired again; they just lose the link
+    db.query(ScheduledFire).filter(ScheduledFire.execution_id.in_(execution_ids)).update(
+        {"execution_id": None}, synchronize_session=False
+    )
+    db.query(Execution).filter(Execution.id.in_(execution_ids)).delete(synchronize_session=False)
+
+def purge_segment(db: Session, segment: ExecutionArchive):
+    """Delete a segment's executions from the database in small batches, then mark it purged."""
+    execution_ids = segment.execution_ids
+    for start in range(0, len(execution_ids), RETENTION_DELETE_BATCH):
+        delete_executions(db, execution_ids[start:start + RETENTION_DELETE_BATCH])
+        db.commit()
+    segment.purged_at = datetime.utcnow()
+    db.commit()
+    EXECUTIONS_ARCHIVED.inc(len(execution_ids))
+
+def purge_fires(db: Session, cutoff: datetime) -> int:
+    """Delete fire records for runs scheduled before ``cutoff``, a small batch per transaction; returns how many.
+
+    A fire record only has to outlive the scheduler's misfire grace time to
+    stop a run from firing twice, so old ones can go with their executions.
+    """
+    purged = 0
+    while True:
+        fire_ids = db.query(ScheduledFire.id).filter(
+            ScheduledFire.fire_time < cutoff
+        ).order_by(ScheduledFire.id).limit(RETENTION_DELETE_BATCH).all()
+        if not fire_ids:
+            db.commit()
+            return purged
+        db.query(ScheduledFire).filter(
+            ScheduledFire.id.in_([fire_id for (fire_id,) in fire_ids])
+        ).delete(synchronize_session=False)
+        db.commit()
+        purged += len(fire_ids)
+
+def run_retention(scheduled_at: Optional[datetime] = None, now: Optional[datetime] = None,
+                  session_factory=SessionLocal) -> int:
+    """Archive and delete executions past the retention period; returns how many were archived.
+
+    Runs as a scheduler job (see ``scheduler.schedule_retention``), so only
+    the leader process does it. Every full UTC day of finished executions
+    older than ``RETENTION_DAYS`` is handled in turn, oldest first: its
+    rows, results, batch inputs and task runs are written to gzip NDJSON
+    segments under ``ARCHIVE_DIR``, then the segment index rows and the
+    day's per-workflow totals are committed together so a day is rolled up
+    once, then the rows are deleted a small batch per transaction. Deletes an interrupted run didn't finish are done first.
+    Scheduled fire records from before the cutoff are deleted last, in the
+    same small batches.
+    """
+    if RETENTION_DAYS <= 0:
+        return 0
+    now = now or datetime.utcnow()
+    cutoff = datetime(now.year, now.month, now.day) - timedelta(days=RETENTION_DAYS)
+    archived = 0
+    db = session_factory()
+    try:
+        # Finish what an interrupted run left behind before picking new rows
+        for segment in db.query(ExecutionArchive).filter(ExecutionArchive.purged_at.is_(None)).order_by(ExecutionArchive.id):
+            purge_segment(db, segment)
+            archived += segment.row_count
+
+        while True:
+            oldest = db.query(Execution.started_at).filter(
+                Execution.started_at < cutoff,
+                Execution.status.in_(FINISHED_STATUSES)
+            ).order_by(Execution.started_at).first()
+            db.commit()
+            if oldest is None:
+                break
+            for segment in archive_day(db, oldest.started_at.date()):
+                purge_segment(db, segment)
+                archived += segment.row_count
+
+        purge_fires(db, cutoff)
+    except Exception as e:
+        print(f"Error archiving executions: {str(e)}")
+    finally:
+        db.close()
+    return archived
+
+def find_archived_execution(db: Session, execution_id: int) -> Optional[Dict[str, Any]]:
+    """Read an archived execution back from its segment; None if it was never archived."""
+    prefix = f'{{"id":{execution_id},'
+    segments = db.query(ExecutionArchive).filter(
+        ExecutionArchive.first_execution_id <= execution_id,
+        ExecutionArchive.last_execution_id >= execution_id
+    ).order_by(ExecutionArchive.id.desc())
+    for segment in segments:
+        if execution_id not in segment.execution_ids:
+            continue
+        try:
+            with gzip.open(segment.path, "rt", encoding="utf-8") as archive:
+                for line in archive:
+                    if line.startswith(prefix):
+                        return json.loads(line)
+        except OSError as e:
+            print(f"Error reading archive {segment.path}: {str(e)}")
+    return None
+
+if __name__ == "__main__":
+    print(f"Archived {run_retention()} executions")
\ No newline at end of file
@@ -1,34 +1,235 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import Execution, Workflow
-from schemas import ExecutionResponse
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
+from typing import Dict, Any, List, Optional
+from datetime import date, datetime
+from database import get_db, SessionLocal
+from models import Execution, ExecutionResult, ExecutionDailyStats, Workflow
+from schemas import ExecutionResponse, ExecutionDailyStatsResponse
+from execution_engine import execution_engine
+from pagination import keyset_page, InvalidCursor, NEXT_CURSOR_HEADER
+from retention import find_archived_execution, FINISHED_STATUSES
+from events import event_bus, stream_events, FINISHED_EVENT, SSE_MEDIA_TYPE, SSE_HEADERS
+import json
+import csv
+import io
+import os
 
 router = APIRouter()
 
+# Rows fetched from the database cursor at a time while exporting
+EXPORT_BATCH_SIZE = int(os.getenv("EXECUTION_EXPORT_BATCH_SIZE", "1000"))
+EXPORT_COLUMNS = ["id", "workflow_id", "status", "started_at", "completed_at", "error"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def results_option(include_results: bool):
+    """Load results in one extra query when asked for, otherwise skip them entirely."""
+    return selectinload(Execution.result) if include_results else noload(Execution.result)
+
+def execution_page(query, response: Response, skip: int, limit: int, cursor: Optional[str]):
+    """Newest-first page of executions; sets the next-page cursor header.
+
+    Pages are keyed on the id alone: ``started_at`` is rewritten when a
+    worker claims or recovers an execution, which would move rows between
+    pages while a client is paging through them.
+    """
+    try:
+        executions, next_cursor = keyset_page(query, [Execution.id], limit, cursor, skip, descending=True)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return executions
+
 @router.get("/workflow/{workflow_id}", response_model=List[ExecutionResponse])
-def list_workflow_executions(workflow_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    # Verify workflow exists
-    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
-    if not workflow:
-        raise HTTPException(status_code=404, detail="Workflow not found")
-    
-    executions = db.query(Execution).filter(
+def list_workflow_executions(workflow_id: int, response: Response, skip: int = 0, limit: int = 100,
+                             cursor: Optional[str] = None, include_results: bool = False,
+                             db: Session = Depends(get_db)):
+    query = db.query(Execution).options(results_option(include_results)).filter(
         Execution.workflow_id == workflow_id
-    ).order_by(Execution.started_at.desc()).offset(skip).limit(limit).all()
+    )
+    executions = execution_page(query, response, skip, limit, cursor)
+    # Only an empty page needs to tell a missing workflow from one without runs
+    if not executions and db.query(Workflow.id).filter(Workflow.id == workflow_id).first() is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
     return executions
 
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def export_rows(statement, format: str):
+    """Yield the export one database batch at a time.
+
+    Runs on its own session with a server-side cursor (``yield_per``), so
+    only one batch of rows is held in memory however many are exported.
+    """
+    db = SessionLocal()
+    try:
+        if format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(EXPORT_COLUMNS + ["results"])
+            yield buffer.getvalue()
+
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    results = getattr(row, "results", None)
+                    writer.writerow([
+                        row.id, row.workflow_id, row.status,
+                        export_value(row.started_at) if row.started_at else "",
+                        export_value(row.completed_at) if row.completed_at else "",
+                        row.error or "",
+                        json.dumps(results, default=str) if results is not None else ""
+                    ])
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(row._mapping), default=export_value) + "\n" for row in rows)
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_executions(format: str = "ndjson", workflow_id: Optional[int] = None, status: Optional[str] = None,
+                      started_after: Optional[datetime] = None, started_before: Optional[datetime] = None,
+                      include_results: bool = False):
+    """Stream execution history as NDJSON or CSV, oldest first."""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+
+    columns = [getattr(Execution, name) for name in EXPORT_COLUMNS]
+    if include_results:
+        statement = select(*columns, ExecutionResult.data.label("results")).outerjoin(
+            ExecutionResult, ExecutionResult.execution_id == Execution.id
+        )
+    else:
+        statement = select(*columns)
+    if workflow_id is not None:
+        statement = statement.where(Execution.workflow_id == workflow_id)
+    if status is not None:
+        statement = statement.where(Execution.status == status)
+    if started_after is not None:
+        statement = statement.where(Execution.started_at >= started_after)
+    if started_before is not None:
+        statement = statement.where(Execution.started_at < started_before)
+    statement = statement.order_by(Execution.id)
+
+    return StreamingResponse(
+        export_rows(statement, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=executions.{format}"}
+    )
+
+@router.get("/stats/daily", response_model=List[ExecutionDailyStatsResponse])
+def list_daily_stats(workflow_id: Optional[int] = None, since: Optional[date] = None, until: Optional[date] = None,
+                     db: Session = Depends(get_db)):
+    """Per-workflow daily totals of archived executions, oldest day first."""
+    query = db.query(ExecutionDailyStats)
+    if workflow_id is not None:
+        query = query.filter(ExecutionDailyStats.workflow_id == workflow_id)
+    if since is not None:
+        query = query.filter(ExecutionDailyStats.day >= since)
+    if until is not None:
+        query = query.filter(ExecutionDailyStats.day <= until)
+    return query.order_by(ExecutionDailyStats.day, ExecutionDailyStats.workflow_id).all()
+
 @router.get("/{execution_id}", response_model=ExecutionResponse)
 def get_execution(execution_id: int, db: Session = Depends(get_db)):
-    execution = db.query(Execution).filter(Execution.id == execution_id).first()
+    execution = db.query(Execution).options(joinedload(Execution.result)).filter(Execution.id == execution_id).first()
     if execution is None:
-        raise HTTPException(status_code=404, detail="Execution not found")
+        # Executions past the retention period are only in the archive
+        execution = find_archived_execution(db, execution_id)
+        if execution is None:
+            raise HTTPException(status_code=404, detail="Execution not found")
+        execution["archived"] = True
     return execution
 
 @router.get("/", response_model=List[ExecutionResponse])
-def list_all_executions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    executions = db.query(Execution).order_by(
-        Execution.started_at.desc()
-    ).offset(skip).limit(limit).all()
-    return executions 
\ No newline at end of file
+def list_all_executions(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                        include_results: bool = False, db: Session = Depends(get_db)):
+    query = db.query(Execution).options(results_option(include_results))
+    return execution_page(query, response, skip, limit, cursor) 
+
+def snapshot_events(execution_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Events describing a finished execution from its stored results, for one this process didn't run.
+
+    Returns an empty list for a queued or running execution, whose events
+    arrive if this process runs it, and None if there is no such execution.
+    """
+    db = SessionLocal()
+    try:
+        execution = db.query(Execution).options(joinedload(Execution.result)).filter(Execution.id == execution_id).first()
+        if execution is not None:
+            execution = {
+                "workflow_id": execution.workflow_id, "status": execution.status, "error": execution.error,
+                "record_count": execution.record_count, "results": execution.results
+            }
+        else:
+            execution = find_archived_execution(db, execution_id)
+    finally:
+        db.close()
+    if execution is None:
+        return None
+    if execution["status"] not in FINISHED_STATUSES:
+        return []
+
+    base = {"id": 0, "execution_id": execution_id, "workflow_id": execution["workflow_id"]}
+    events = []
+    if execution.get("record_count") is not None:
+        counts = {}
+        for outcome in execution["results"] or []:
+            counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+        events.append(dict(base, type="execution.progress", record_count=execution["record_count"], counts=counts))
+    else:
+        for task_result in execution["results"] or []:
+            status = task_result.get("status")
+            kind = {"success": "task.succeeded", "skipped": "task.skipped"}.get(status, "task.failed")
+            events.append(dict(base, type=kind, **{k: v for k, v in task_result.items() if k != "output"}))
+    events.append(dict(base, type=FINISHED_EVENT, status=execution["status"], error=execution["error"]))
+    return events
+
+@router.get("/{execution_id}/events")
+async def stream_execution_events(execution_id: int):
+    """Server-Sent Events for one execution: the current state first, then progress as it happens.
+
+    Tasks report ``task.started``, ``task.succeeded``, ``task.failed`` and
+    ``task.skipped`` (batch runs report ``record.*`` instead) between
+    ``execution.started`` and ``execution.finished``, after which the
+    stream ends.
+    """
+    subscription, replay = event_bus.subscribe(execution_id=execution_id)
+    if not replay:
+        # Not seen by this process lately; one read tells finished and missing executions apart
+        replay = await run_in_threadpool(snapshot_events, execution_id)
+        if replay is None:
+            event_bus.unsubscribe(subscription)
+            raise HTTPException(status_code=404, detail="Execution not found")
+    return StreamingResponse(
+        stream_events(subscription, replay, until_finished=True),
+        media_type=SSE_MEDIA_TYPE,
+        headers=SSE_HEADERS
+    )
+
+@router.post("/{execution_id}/resume", status_code=202)
+def resume_execution(execution_id: int, db: Session = Depends(get_db)):
+    """Re-run a failed, cancelled or timed out execution, skipping the tasks that already succeeded."""
+    execution = db.query(Execution).filter(Execution.id == execution_id).first()
+    if execution is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    if not execution_engine.resume(db, execution_id):
+        raise HTTPException(status_code=409, detail=f"Execution can't be resumed while {execution.status}")
+    return {"message": "Execution resume queued", "execution_id": execution_id, "status": "queued"}
+
+@router.post("/{execution_id}/cancel", status_code=202)
+def cancel_execution(execution_id: int, db: Session = Depends(get_db)):
+    """Cancel a queued or running execution; running tasks are stopped."""
+    execution = db.query(Execution).filter(Execution.id == execution_id).first()
+    if execution is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    status = execution_engine.cancel(db, execution_id)
+    if status is None:
+        raise HTTPException(status_code=409, detail=f"Execution has already finished ({execution.status})")
+    return {"message": f"Execution {status}", "execution_id": execution_id, "status": status}
\ No newline at end of file
@@ -4,24 +4,46 @@ from typing import List
 from database import get_db
 from models import Task, Workflow
 from schemas import TaskCreate, TaskResponse, TaskUpdate
+from task_graph import topological_order
+from handlers import HANDLERS
+from workflow_plans import bump_revision
 
 router = APIRouter()
 
+def validate_task_graph(db: Session, workflow_id: int):
+    """Reject dependencies on unknown tasks or that would form a cycle."""
+    db.flush()
+    tasks = db.query(Task).filter(Task.workflow_id == workflow_id).all()
+    try:
+        topological_order(tasks)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+def validate_task_type(task_type: str):
+    if task_type not in HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown task type: {task_type}")
+
 @router.post("/", response_model=TaskResponse)
 def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     # Verify workflow exists
     workflow = db.query(Workflow).filter(Workflow.id == task.workflow_id).first()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
+    validate_task_type(task.task_type)
     
     db_task = Task(
         workflow_id=task.workflow_id,
         name=task.name,
         task_type=task.task_type,
         config=task.config,
-        order=task.order
+        order=task.order,
+        depends_on=task.depends_on,
+        timeout=task.timeout
     )
     db.add(db_task)
+    validate_task_graph(db, task.workflow_id)
+    bump_revision(db, task.workflow_id)
     db.commit()
     db.refresh(db_task)
     return db_task
@@ -44,9 +66,15 @@ def update_task(task_id: int, task: TaskUpdate, db: Session = Depends(get_db)):
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    for key, value in task.dict(exclude_unset=True).items():
+    updates = task.dict(exclude_unset=True)
+    if "task_type" in updates:
+        validate_task_type(updates["task_type"])
+    
+    for key, value in updates.items():
         setattr(db_task, key, value)
     
+    validate_task_graph(db, db_task.workflow_id)
+    bump_revision(db, db_task.workflow_id)
     db.commit()
     db.refresh(db_task)
     return db_task
@@ -57,6 +85,13 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    # Drop the deleted task from any dependency lists that reference it
+    siblings = db.query(Task).filter(Task.workflow_id == task.workflow_id, Task.id != task.id).all()
+    for sibling in siblings:
+        if sibling.depends_on and task.id in sibling.depends_on:
+            sibling.depends_on = [dep for dep in sibling.depends_on if dep != task.id]
+    
     db.delete(task)
+    bump_revision(db, task.workflow_id)
     db.commit()
     return {"message": "Task deleted successfully"} 
\ No newline at end of file
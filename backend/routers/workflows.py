@@ -1,37 +1,105 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import Workflow, Task, Execution
-from schemas import WorkflowCreate, WorkflowResponse, WorkflowUpdate
-from datetime import datetime
-import json
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, TextIO
+from database import get_db, SessionLocal
+from models import Workflow
+from schemas import WorkflowCreate, WorkflowResponse, WorkflowDetailResponse, WorkflowUpdate, WorkflowImport, WorkflowImportResponse
+from execution_engine import execution_engine
+from pagination import keyset_page, InvalidCursor, NEXT_CURSOR_HEADER
+from scheduler import workflow_trigger, schedule_workflow, sync_workflow_schedule, unschedule_workflow
+from workflow_plans import plan_cache, bump_revision
+from workflow_import import InvalidImport, parse_ndjson, validate_definitions, import_workflows
+from batch_runs import InvalidRecords, parse_records, records_format
+from events import event_bus, stream_events, SSE_MEDIA_TYPE, SSE_HEADERS
+import io
 
 router = APIRouter()
 
+def validate_schedule(schedule: Optional[str]):
+    if schedule:
+        try:
+            workflow_trigger(schedule)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid schedule: {str(e)}")
+
+def workflow_query(db: Session, include_tasks: bool):
+    """Workflows, with their tasks loaded in one extra query for the whole page when asked for."""
+    query = db.query(Workflow)
+    return query.options(selectinload(Workflow.tasks)) if include_tasks else query
+
+def workflow_response(workflow: Workflow, include_tasks: bool):
+    # Without tasks, serialize from the columns only so the relationship is never lazy-loaded
+    if include_tasks:
+        return workflow
+    return {column.name: getattr(workflow, column.name) for column in Workflow.__table__.columns}
+
 @router.post("/", response_model=WorkflowResponse)
 def create_workflow(workflow: WorkflowCreate, db: Session = Depends(get_db)):
+    validate_schedule(workflow.schedule)
     db_workflow = Workflow(
         name=workflow.name,
         description=workflow.description,
-        schedule=workflow.schedule
+        schedule=workflow.schedule,
+        max_concurrency=workflow.max_concurrency,
+        timeout=workflow.timeout
     )
     db.add(db_workflow)
     db.commit()
     db.refresh(db_workflow)
+    sync_workflow_schedule(db_workflow)
     return db_workflow
 
-@router.get("/", response_model=List[WorkflowResponse])
-def list_workflows(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    workflows = db.query(Workflow).offset(skip).limit(limit).all()
-    return workflows
+def create_workflows(db: Session, definitions: List[WorkflowImport]):
+    """Validate and insert definitions in one transaction, then schedule the ones that need it."""
+    try:
+        validate_definitions(definitions)
+    except InvalidImport as e:
+        raise HTTPException(status_code=400, detail=e.errors)
+    results = import_workflows(db, definitions)
+    db.commit()
+    for definition, result in zip(definitions, results):
+        if definition.is_active and definition.schedule:
+            try:
+                schedule_workflow(result["id"], definition.schedule)
+            except Exception as e:
+                print(f"Error scheduling workflow {result['id']}: {str(e)}")
+    return results
 
-@router.get("/{workflow_id}", response_model=WorkflowResponse)
-def get_workflow(workflow_id: int, db: Session = Depends(get_db)):
-    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+@router.post("/bulk", response_model=WorkflowImportResponse)
+def create_workflow_with_tasks(definition: WorkflowImport, db: Session = Depends(get_db)):
+    """Create a workflow and all its tasks in one request; ``depends_on`` names other tasks."""
+    return create_workflows(db, [definition])[0]
+
+@router.post("/import", response_model=List[WorkflowImportResponse])
+async def import_workflow_definitions(request: Request, db: Session = Depends(get_db)):
+    """Create many workflows from NDJSON, one ``/bulk`` definition per line, all or nothing."""
+    try:
+        definitions = parse_ndjson(await request.body())
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8 encoded NDJSON")
+    except InvalidImport as e:
+        raise HTTPException(status_code=400, detail=e.errors)
+    return await run_in_threadpool(create_workflows, db, definitions)
+
+@router.get("/", response_model=List[WorkflowDetailResponse])
+def list_workflows(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                   include_tasks: bool = False, db: Session = Depends(get_db)):
+    try:
+        workflows, next_cursor = keyset_page(workflow_query(db, include_tasks), [Workflow.id], limit, cursor, skip)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [workflow_response(workflow, include_tasks) for workflow in workflows]
+
+@router.get("/{workflow_id}", response_model=WorkflowDetailResponse)
+def get_workflow(workflow_id: int, include_tasks: bool = False, db: Session = Depends(get_db)):
+    workflow = workflow_query(db, include_tasks).filter(Workflow.id == workflow_id).first()
     if workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return workflow
+    return workflow_response(workflow, include_tasks)
 
 @router.put("/{workflow_id}", response_model=WorkflowResponse)
 def update_workflow(workflow_id: int, workflow: WorkflowUpdate, db: Session = Depends(get_db)):
@@ -39,11 +107,16 @@ def update_workflow(workflow_id: int, workflow: WorkflowUpdate, db: Session = De
     if db_workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    for key, value in workflow.dict(exclude_unset=True).items():
+    changes = workflow.dict(exclude_unset=True)
+    validate_schedule(changes.get("schedule"))
+    for key, value in changes.items():
         setattr(db_workflow, key, value)
+    bump_revision(db, workflow_id)
     
     db.commit()
     db.refresh(db_workflow)
+    if "schedule" in changes or "is_active" in changes:
+        sync_workflow_schedule(db_workflow)
     return db_workflow
 
 @router.delete("/{workflow_id}")
@@ -54,54 +127,84 @@ def delete_workflow(workflow_id: int, db: Session = Depends(get_db)):
     
     db.delete(workflow)
     db.commit()
+    unschedule_workflow(workflow_id)
+    plan_cache.invalidate(workflow_id)
     return {"message": "Workflow deleted successfully"}
 
-@router.post("/{workflow_id}/execute")
+@router.post("/{workflow_id}/execute", status_code=202)
 def execute_workflow(workflow_id: int, db: Session = Depends(get_db)):
-    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+    workflow = db.query(Workflow.id).filter(Workflow.id == workflow_id).first()
     if workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    # Create execution record
-    execution = Execution(
-        workflow_id=workflow_id,
-        status="running",
-        started_at=datetime.utcnow()
-    )
-    db.add(execution)
-    db.commit()
-    
+    # Queue the execution; a background worker runs the tasks
+    execution = execution_engine.submit(db, workflow_id)
+    return {"message": "Workflow execution queued", "execution_id": execution.id, "status": execution.status}
+
+def queue_batch_run(db: Session, workflow_id: int, source: TextIO, format: str, concurrency: Optional[int]):
+    if concurrency is not None and concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1")
+    if db.query(Workflow.id).filter(Workflow.id == workflow_id).first() is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
     try:
-        # Get tasks in order
-        tasks = db.query(Task).filter(Task.workflow_id == workflow_id).order_by(Task.order).all()
-        results = []
-        
-        for task in tasks:
-            # Execute task based on type
-            if task.task_type == "email":
-                # Implement email sending logic
-                pass
-            elif task.task_type == "api_call":
-                # Implement API call logic
-                pass
-            elif task.task_type == "file_upload":
-                # Implement file upload logic
-                pass
-            
-            results.append({
-                "task_id": task.id,
-                "status": "completed",
-                "timestamp": datetime.utcnow().isoformat()
-            })
-        
-        execution.status = "completed"
-        execution.completed_at = datetime.utcnow()
-        execution.results = json.dumps(results)
-        
-    except Exception as e:
-        execution.status = "failed"
-        execution.error = str(e)
-        execution.completed_at = datetime.utcnow()
-    
-    db.commit()
-    return {"message": "Workflow execution completed", "execution_id": execution.id} 
\ No newline at end of file
+        records = parse_records(source, format)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Records must be UTF-8 encoded")
+    except InvalidRecords as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    execution = execution_engine.submit(db, workflow_id, records, concurrency)
+    return {
+        "message": "Workflow batch run queued",
+        "execution_id": execution.id,
+        "status": execution.status,
+        "record_count": execution.record_count
+    }
+
+@router.post("/{workflow_id}/execute/batch", status_code=202)
+async def execute_workflow_batch(workflow_id: int, request: Request, concurrency: Optional[int] = None,
+                                 db: Session = Depends(get_db)):
+    """Run a workflow once per input record, filling ``{{field}}`` templates in task fields from the record.
+
+    Records come as the body (a JSON array, NDJSON or CSV, by content type)
+    or as a multipart ``file`` upload (by file name or content type). All
+    records share one execution, whose results hold one outcome per record.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload the records as a 'file' field")
+        format = records_format(upload.content_type, upload.filename)
+        source = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+    else:
+        format = records_format(content_type)
+        source = io.TextIOWrapper(io.BytesIO(await request.body()), encoding="utf-8", newline="")
+    if format is None:
+        raise HTTPException(status_code=415, detail="Records must be JSON, NDJSON or CSV")
+    return await run_in_threadpool(queue_batch_run, db, workflow_id, source, format, concurrency)
+
+def workflow_exists(workflow_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Workflow.id).filter(Workflow.id == workflow_id).first() is not None
+    finally:
+        db.close()
+
+@router.get("/{workflow_id}/events")
+async def stream_workflow_events(workflow_id: int):
+    """Server-Sent Events for every execution of a workflow that this process runs.
+
+    Starts with the current state of its running and recently finished
+    executions, then stays open; see ``GET /executions/{id}/events``.
+    """
+    # Its own short session: a get_db session would be held for as long as the stream
+    if not await run_in_threadpool(workflow_exists, workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    subscription, replay = event_bus.subscribe(workflow_id=workflow_id)
+    return StreamingResponse(
+        stream_events(subscription, replay, until_finished=False),
+        media_type=SSE_MEDIA_TYPE,
+        headers=SSE_HEADERS
+    )
\ No newline at end of file
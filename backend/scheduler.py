@@ -1,48 +1,295 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.executors.base import run_job
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Workflow
-from routers.workflows import execute_workflow
-import asyncio
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from database import SessionLocal, engine
+from models import Workflow, SchedulerLease, ScheduledFire
+from execution_engine import execution_engine
+from retention import RETENTION_DAYS, RETENTION_INTERVAL
+import threading
+import socket
+import uuid
+import os
 
-scheduler = AsyncIOScheduler()
+# Runs fired later than this many seconds after their scheduled time are skipped
+MISFIRE_GRACE_TIME = int(os.getenv('SCHEDULER_MISFIRE_GRACE_TIME', 300))
+# Fire missed runs of a job once instead of once per missed run time
+COALESCE = os.getenv('SCHEDULER_COALESCE', 'true').lower() != 'false'
+# Spread each cron run over this many seconds so workflows due at the same
+# minute don't all hit the queue and the integrations at once
+JITTER = int(os.getenv('SCHEDULER_JITTER', 30))
+# Threads recording fires; a fire only inserts rows, the engine's workers run it
+FIRE_THREADS = int(os.getenv('SCHEDULER_THREADS', 10))
+LEASE_NAME = "scheduler"
+RETENTION_JOB_ID = "execution_retention"
+LEASE_TTL = float(os.getenv('SCHEDULER_LEASE_TTL', 30))
+LEASE_RENEW_INTERVAL = float(os.getenv('SCHEDULER_LEASE_RENEW_INTERVAL', 10))
 
-async def schedule_workflow(workflow_id: int, cron_expression: str):
-    """Schedule a workflow to run based on a cron expression"""
+class ScheduledRun:
+    """A job as ``run_job`` sees it for a single run, with the run time in its kwargs."""
+
+    def __init__(self, job, run_time: datetime):
+        self.job = job
+        self.id = job.id
+        self.func = job.func
+        self.args = job.args
+        self.kwargs = dict(job.kwargs, scheduled_at=run_time)
+        self.misfire_grace_time = job.misfire_grace_time
+
+    def __str__(self):
+        return str(self.job)
+
+class FireTimeExecutor(ThreadPoolExecutor):
+    """Thread pool executor that tells each run the time it was scheduled for.
+
+    APScheduler calls a job with its stored arguments only; the fire lock in
+    ``fire_workflow`` needs the scheduled time, which is the same in every
+    process that picks the run up.
+    """
+
+    def _do_submit_job(self, job, run_times):
+        def run():
+            events = []
+            for run_time in run_times:
+                events.extend(run_job(ScheduledRun(job, run_time), job._jobstore_alias, [run_time], self._logger.name))
+            return events
+
+        def callback(f):
+            if f.exception():
+                self._run_job_error(job.id, f.exception(), f.exception().__traceback__)
+            else:
+                self._run_job_success(job.id, f.result())
+
+        self._pool.submit(run).add_done_callback(callback)
+
+class SchedulerLeader:
+    """Keeps the scheduler running in exactly one process at a time.
+
+    Every process starts its scheduler paused, so schedules can be added and
+    removed from any of them through the shared job store. A background
+    thread competes for a lease row in ``scheduler_leases``; the holder
+    renews it every ``renew_interval`` seconds and resumes its scheduler,
+    and everyone else stays paused. If the leader dies, its lease expires
+    after ``ttl`` seconds and another process takes over, firing anything
+    it missed according to the misfire and coalesce settings.
+    """
+
+    def __init__(self, scheduler, session_factory=SessionLocal, ttl: float = LEASE_TTL,
+                 renew_interval: float = LEASE_RENEW_INTERVAL):
+        self.scheduler = scheduler
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._lease_expires: Optional[datetime] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="scheduler-leader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop competing for the lease and hand it over straight away."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._step_down()
+        db = self.session_factory()
+        try:
+            db.query(SchedulerLease).filter(
+                SchedulerLease.name == LEASE_NAME,
+                SchedulerLease.holder == self.holder
+            ).update({"expires_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            print(f"Error releasing scheduler lease: {str(e)}")
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                acquired = self.try_acquire()
+            except Exception as e:
+                print(f"Error renewing scheduler lease: {str(e)}")
+                # Without a renewal we can't know whether someone else took over
+                acquired = self.is_leader and datetime.utcnow() < self._lease_expires - timedelta(seconds=self.renew_interval)
+
+            if acquired and not self.is_leader:
+                self.is_leader = True
+                self.scheduler.resume()
+            elif not acquired:
+                self._step_down()
+            if self.is_leader:
+                # Pick up jobs other processes added to the store since the last check
+                self.scheduler.wakeup()
+            self._stopping.wait(self.renew_interval)
+
+    def _step_down(self):
+        if self.is_leader:
+            self.is_leader = False
+            self.scheduler.pause()
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; returns whether this process holds it."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        db = self.session_factory()
+        try:
+            renewed = db.query(SchedulerLease).filter(
+                SchedulerLease.name == LEASE_NAME,
+                or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now)
+            ).update({"holder": self.holder, "expires_at": expires_at}, synchronize_session=False)
+            db.commit()
+            if not renewed:
+                db.add(SchedulerLease(name=LEASE_NAME, holder=self.holder, expires_at=expires_at))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Someone else holds an unexpired lease
+                    db.rollback()
+                    return False
+            self._lease_expires = expires_at
+            return True
+        finally:
+            db.close()
+
+scheduler = BackgroundScheduler(
+    jobstores={"default": SQLAlchemyJobStore(engine=engine)},
+    executors={"default": FireTimeExecutor(FIRE_THREADS)},
+    job_defaults={
+        "coalesce": COALESCE,
+        "misfire_grace_time": MISFIRE_GRACE_TIME,
+        "max_instances": 1
+    }
+)
+leader = SchedulerLeader(scheduler)
+
+def fire_workflow(workflow_id: int, scheduled_at: Optional[datetime] = None):
+    """Queue one scheduled run of a workflow unless another process already has.
+
+    Only the fire record and a queued execution, linked to each other, are
+    written, in a single transaction; the execution engine's workers run
+    the tasks. ``scheduled_at``
+    is filled in by ``FireTimeExecutor``.
+    """
+    fire_time = scheduled_at.astimezone(timezone.utc).replace(tzinfo=None) if scheduled_at else datetime.utcnow()
+    db = SessionLocal()
+    try:
+        workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+        if workflow is None or not workflow.is_active:
+            return
+
+        fire = ScheduledFire(workflow_id=workflow_id, fire_time=fire_time)
+        db.add(fire)
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            return
+
+        execution = execution_engine.enqueue(db, workflow_id)
+        fire.execution_id = execution.id
+        db.commit()
+        execution_engine.wake()
+    except Exception as e:
+        print(f"Error firing workflow {workflow_id}: {str(e)}")
+    finally:
+        db.close()
+
+def workflow_trigger(cron_expression: str) -> CronTrigger:
+    """Cron trigger for a schedule; raises ValueError if the expression is invalid."""
     trigger = CronTrigger.from_crontab(cron_expression)
+    trigger.jitter = JITTER or None
+    return trigger
+
+def schedule_workflow(workflow_id: int, cron_expression: str):
+    """Schedule a workflow to run based on a cron expression"""
+    job_id = f"workflow_{workflow_id}"
+    trigger = workflow_trigger(cron_expression)
+    job = scheduler.get_job(job_id)
+    if job is not None and (str(job.trigger), job.trigger.jitter) == (str(trigger), trigger.jitter):
+        # Replacing the job would reset its next run time and lose missed runs
+        return
     scheduler.add_job(
-        execute_workflow,
+        "scheduler:fire_workflow",
         trigger=trigger,
         args=[workflow_id],
-        id=f"workflow_{workflow_id}"
+        id=job_id,
+        replace_existing=True
     )
 
-async def unschedule_workflow(workflow_id: int):
+def unschedule_workflow(workflow_id: int):
     """Remove a workflow from the scheduler"""
     job_id = f"workflow_{workflow_id}"
     if scheduler.get_job(job_id):
         scheduler.remove_job(job_id)
 
-async def initialize_scheduler():
+def sync_workflow_schedule(workflow: Workflow):
+    """Add, update or remove a workflow's job to match its schedule and is_active."""
+    try:
+        if workflow.is_active and workflow.schedule:
+            schedule_workflow(workflow.id, workflow.schedule)
+        else:
+            unschedule_workflow(workflow.id)
+    except Exception as e:
+        print(f"Error syncing schedule for workflow {workflow.id}: {str(e)}")
+
+def schedule_retention():
+    """Run execution retention every ``RETENTION_INTERVAL`` seconds, or stop if it is disabled."""
+    if RETENTION_DAYS <= 0:
+        if scheduler.get_job(RETENTION_JOB_ID):
+            scheduler.remove_job(RETENTION_JOB_ID)
+        return
+    job = scheduler.get_job(RETENTION_JOB_ID)
+    trigger = IntervalTrigger(seconds=RETENTION_INTERVAL)
+    if job is not None and str(job.trigger) == str(trigger):
+        return
+    scheduler.add_job("retention:run_retention", trigger=trigger, id=RETENTION_JOB_ID, replace_existing=True)
+
+def initialize_scheduler():
     """Initialize the scheduler and load existing scheduled workflows"""
-    scheduler.start()
-    
-    # Get database session
-    db = next(get_db())
+    # Paused until this process wins the scheduler lease
+    scheduler.start(paused=True)
+
+    db = SessionLocal()
     try:
         # Load all active workflows with schedules
         workflows = db.query(Workflow).filter(
             Workflow.is_active == True,
             Workflow.schedule.isnot(None)
         ).all()
-        
-        # Schedule each workflow
+
+        # Schedule each workflow, and drop stored jobs whose workflow no longer has one
+        scheduled = set()
         for workflow in workflows:
-            await schedule_workflow(workflow.id, workflow.schedule)
+            try:
+                schedule_workflow(workflow.id, workflow.schedule)
+                scheduled.add(f"workflow_{workflow.id}")
+            except ValueError as e:
+                print(f"Error scheduling workflow {workflow.id}: {str(e)}")
+        for job in scheduler.get_jobs():
+            if job.id.startswith("workflow_") and job.id not in scheduled:
+                scheduler.remove_job(job.id)
     finally:
         db.close()
+    schedule_retention()
+
+    leader.start()
 
 def shutdown_scheduler():
     """Shutdown the scheduler"""
-    scheduler.shutdown() 
\ No newline at end of file
+    leader.stop()
+    scheduler.shutdown()
\ No newline at end of file
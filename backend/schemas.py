@@ -1,11 +1,13 @@
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
-from datetime import datetime
+from datetime import date, datetime
 
 class WorkflowBase(BaseModel):
     name: str
     description: Optional[str] = None
     schedule: Optional[str] = None
+    max_concurrency: Optional[int] = None
+    timeout: Optional[float] = None
 
 class WorkflowCreate(WorkflowBase):
     pass
@@ -28,6 +30,8 @@ class TaskBase(BaseModel):
     task_type: str
     config: Dict[str, Any]
     order: int
+    depends_on: Optional[List[int]] = None
+    timeout: Optional[float] = None
 
 class TaskCreate(TaskBase):
     workflow_id: int
@@ -45,6 +49,22 @@ class TaskResponse(TaskBase):
     class Config:
         orm_mode = True
 
+class WorkflowDetailResponse(WorkflowResponse):
+    # Only set when the tasks were asked for
+    tasks: Optional[List[TaskResponse]] = None
+
+class TaskImport(TaskBase):
+    # Names of other tasks in the same definition, since none has an id yet
+    depends_on: Optional[List[str]] = None
+
+class WorkflowImport(WorkflowBase):
+    is_active: bool = True
+    tasks: List[TaskImport] = []
+
+class WorkflowImportResponse(BaseModel):
+    id: int
+    task_ids: List[int]
+
 class ExecutionResponse(BaseModel):
     id: int
     workflow_id: int
@@ -52,7 +72,27 @@ class ExecutionResponse(BaseModel):
     completed_at: Optional[datetime]
     status: str
     error: Optional[str]
-    results: Optional[Dict[str, Any]]
+    deadline_at: Optional[datetime] = None
+    record_count: Optional[int] = None
+    results: Optional[List[Dict[str, Any]]] = None
+    # Read back from the archive; archived executions are no longer listed
+    archived: bool = False
+
+    class Config:
+        orm_mode = True 
+
+class ExecutionDailyStatsResponse(BaseModel):
+    workflow_id: int
+    day: date
+    executions: int
+    completed: int
+    failed: int
+    cancelled: int
+    timed_out: int
+    duration_p50_ms: Optional[float] = None
+    duration_p95_ms: Optional[float] = None
+    duration_p99_ms: Optional[float] = None
+    duration_max_ms: Optional[float] = None
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True
\ No newline at end of file
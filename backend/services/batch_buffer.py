@@ -0,0 +1,119 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Hashable, Tuple
+import threading
+import time
+
+class BatchBuffer:
+    """Base class for write-behind buffers that coalesce writes into batches.
+
+    Items are queued under a key with ``_enqueue``, which returns a future.
+    A key's pending items are flushed together when there are
+    ``batch_limit(key)`` of them or the oldest has waited ``max_delay``
+    seconds, on ``flush()`` and on ``stop()``. Subclasses implement
+    ``batch_limit`` and ``flush_batch``, which sends one batch and returns
+    one result per item, in order; each future resolves to its item's result.
+    Flushes run on a small thread pool so a slow batch doesn't hold up
+    other keys.
+    """
+
+    def __init__(self, max_delay: float, flush_threads: int = 4, name: str = "batch-buffer"):
+        self.max_delay = max_delay
+        self.name = name
+        self._pending: Dict[Hashable, List[Tuple[Any, Future]]] = {}
+        self._oldest: Dict[Hashable, float] = {}
+        self._condition = threading.Condition()
+        self._flush_pool = ThreadPoolExecutor(max_workers=flush_threads, thread_name_prefix=name)
+        self._thread = None
+        self._stopping = False
+        self.batches_sent = 0
+        self.items_sent = 0
+
+    def batch_limit(self, key: Hashable) -> int:
+        raise NotImplementedError
+
+    def flush_batch(self, key: Hashable, items: List[Any]) -> List[Any]:
+        raise NotImplementedError
+
+    def _enqueue(self, key: Hashable, item: Any) -> Future:
+        future = Future()
+        with self._condition:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            group = self._pending.setdefault(key, [])
+            if not group:
+                self._oldest[key] = time.monotonic()
+            group.append((item, future))
+            if len(group) >= self.batch_limit(key):
+                self._dispatch(key)
+            self._condition.notify()
+        return future
+
+    def _dispatch(self, key: Hashable):
+        """Hand a pending group to the flush pool; the caller holds the lock."""
+        group = self._pending.pop(key, [])
+        self._oldest.pop(key, None)
+        if group:
+            self._flush_pool.submit(self._flush, key, group)
+
+    def _run(self):
+        with self._condition:
+            while not self._stopping:
+                now = time.monotonic()
+                for key, oldest in list(self._oldest.items()):
+                    if now - oldest >= self.max_delay:
+                        self._dispatch(key)
+                if self._oldest:
+                    wait = max(0.0, min(self._oldest.values()) + self.max_delay - time.monotonic())
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+
+    def _flush(self, key: Hashable, group: List[Tuple[Any, Future]]):
+        try:
+            results = self.flush_batch(key, [item for item, _ in group])
+            with self._condition:
+                self.batches_sent += 1
+                self.items_sent += len(group)
+            for (_, future), result in zip(group, results):
+                # A caller that timed out or was cancelled may have cancelled its future already
+                if not future.done():
+                    future.set_result(result)
+            if len(results) != len(group):
+                # Whatever flush_batch didn't answer fails now instead of waiting out its caller's timeout
+                error = RuntimeError(
+                    f"{type(self).__name__}.flush_batch returned {len(results)} results for {len(group)} items"
+                )
+                for _, future in group[len(results):]:
+                    if not future.done():
+                        future.set_exception(error)
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+
+    def flush(self):
+        """Send every pending group now."""
+        with self._condition:
+            for key in list(self._pending):
+                self._dispatch(key)
+
+    def stop(self):
+        """Flush pending items, wait for in-flight batches and stop the background thread."""
+        self.flush()
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._flush_pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "pending": sum(len(group) for group in self._pending.values()),
+                "batches_sent": self.batches_sent,
+                "items_sent": self.items_sent
+            }
@@ -0,0 +1,35 @@
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
+from services.batch_buffer import BatchBuffer
+
+class CRMBatcher(BatchBuffer):
+    """Coalesce individual CRM writes into batch API requests.
+
+    ``submit`` queues one create/update/delete and returns a future. Pending
+    operations are grouped by ``(crm_type, object_type, action)`` across all
+    callers, and a group is flushed as one batch request when it reaches the
+    CRM's batch limit or its oldest operation has waited ``max_delay``
+    seconds. Each future resolves to that record's ``{"success", "id",
+    "errors"}`` result. A group holding a single operation is sent through
+    the regular single-record endpoint.
+    """
+
+    def __init__(self, crm_service, max_delay: float = 0.05, flush_threads: int = 4):
+        super().__init__(max_delay, flush_threads, name="crm-batcher")
+        self.crm_service = crm_service
+
+    def submit(self, crm_type: str, object_type: str, action: str, data: Dict[str, Any],
+               idempotency_key: Optional[str] = None) -> Future:
+        return self._enqueue((crm_type, object_type, action), (data, idempotency_key))
+
+    def batch_limit(self, key: Tuple[str, str, str]) -> int:
+        return self.crm_service.BATCH_LIMITS.get(key[0], 1)
+
+    def flush_batch(self, key: Tuple[str, str, str], items: List[Tuple[Dict[str, Any], Optional[str]]]) -> List[Dict[str, Any]]:
+        crm_type, object_type, action = key
+        records = [record for record, _ in items]
+        idempotency_keys = [idempotency_key for _, idempotency_key in items]
+        if len(records) == 1:
+            success = self.crm_service.update_crm(crm_type, object_type, action, records[0], idempotency_keys[0])
+            return [{"success": success, "id": None, "errors": [] if success else ["Failed to update CRM"]}]
+        return self.crm_service.batch_update_crm(crm_type, object_type, action, records, idempotency_keys)
@@ -1,28 +1,43 @@
-from typing import Dict, Any
-import requests
+from typing import Dict, Any, List, Optional
+from services.http_pool import PooledHTTPClient
+from services.rate_limit import governor
+import hashlib
 import os
 
 class CRMService:
+    # Maximum records per Salesforce sObject Collections / HubSpot batch request
+    BATCH_LIMITS = {'salesforce': 200, 'hubspot': 100}
+
     def __init__(self):
         self.api_keys = {
             'salesforce': os.getenv('SALESFORCE_API_KEY'),
             'hubspot': os.getenv('HUBSPOT_API_KEY')
         }
         self.base_urls = {
-            'salesforce': 'https://your-salesforce-instance.salesforce.com/services/data/v56.0',
-            'hubspot': 'https://api.hubapi.com/crm/v3'
+            'salesforce': os.getenv('SALESFORCE_BASE_URL', 'https://your-salesforce-instance.salesforce.com/services/data/v56.0'),
+            'hubspot': os.getenv('HUBSPOT_BASE_URL', 'https://api.hubapi.com/crm/v3')
         }
+        self.http = PooledHTTPClient(
+            pool_size=int(os.getenv('CRM_POOL_SIZE', 10)),
+            connect_timeout=float(os.getenv('CRM_CONNECT_TIMEOUT', 5)),
+            read_timeout=float(os.getenv('CRM_READ_TIMEOUT', 30)),
+            max_retries=int(os.getenv('CRM_MAX_RETRIES', 3)),
+            backoff_base=float(os.getenv('CRM_BACKOFF_BASE', 0.5)),
+            backoff_max=float(os.getenv('CRM_BACKOFF_MAX', 30)),
+            governor=governor
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        """Connection pool and retry counters for the CRM HTTP client."""
+        return self.http.metrics()
 
-    def update_crm(self, crm_type: str, object_type: str, action: str, data: Dict[str, Any]) -> bool:
+    def update_crm(self, crm_type: str, object_type: str, action: str, data: Dict[str, Any],
+                   idempotency_key: Optional[str] = None) -> bool:
         """Update CRM with provided data."""
         try:
-            if crm_type not in self.api_keys or not self.api_keys[crm_type]:
-                raise ValueError(f"Invalid CRM type or missing API key: {crm_type}")
-
-            headers = {
-                'Authorization': f'Bearer {self.api_keys[crm_type]}',
-                'Content-Type': 'application/json'
-            }
+            headers = self._headers(crm_type)
+            if idempotency_key:
+                headers['Idempotency-Key'] = idempotency_key
 
             if crm_type == 'salesforce':
                 return self._update_salesforce(object_type, action, data, headers)
@@ -34,17 +49,141 @@ class CRMService:
             print(f"Error updating CRM: {str(e)}")
             return False
 
+    def _headers(self, crm_type: str) -> Dict[str, str]:
+        if crm_type not in self.api_keys or not self.api_keys[crm_type]:
+            raise ValueError(f"Invalid CRM type or missing API key: {crm_type}")
+        return {
+            'Authorization': f'Bearer {self.api_keys[crm_type]}',
+            'Content-Type': 'application/json'
+        }
+
+    def _rate_limit(self, crm_type: str):
+        """Rate limit key for calls made with this CRM's API key."""
+        return (crm_type, self.api_keys.get(crm_type))
+
+    def batch_update_crm(self, crm_type: str, object_type: str, action: str, records: List[Dict[str, Any]],
+                         idempotency_keys: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """Apply one action to many records using the CRM's batch API.
+
+        Records are sent in chunks of at most ``BATCH_LIMITS[crm_type]``.
+        When every record in a chunk has an idempotency key, the chunk is sent
+        with an ``Idempotency-Key`` derived from them. Returns one
+        ``{"success", "id", "errors"}`` dict per input record, in input order.
+        """
+        results = []
+        limit = self.BATCH_LIMITS.get(crm_type, 1)
+        for start in range(0, len(records), limit):
+            chunk = records[start:start + limit]
+            try:
+                headers = self._headers(crm_type)
+                chunk_keys = (idempotency_keys or [])[start:start + limit]
+                if len(chunk_keys) == len(chunk) and all(chunk_keys):
+                    headers['Idempotency-Key'] = hashlib.sha256('\n'.join(chunk_keys).encode()).hexdigest()
+                if crm_type == 'salesforce':
+                    results.extend(self._batch_salesforce(object_type, action, chunk, headers))
+                elif crm_type == 'hubspot':
+                    results.extend(self._batch_hubspot(object_type, action, chunk, headers))
+                else:
+                    raise ValueError(f"Invalid CRM type: {crm_type}")
+            except Exception as e:
+                print(f"Error batch updating CRM: {str(e)}")
+                results.extend({'success': False, 'id': None, 'errors': [str(e)]} for _ in chunk)
+        return results
+
+    def _batch_salesforce(self, object_type: str, action: str, records: List[Dict[str, Any]], headers: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Send records through the Salesforce sObject Collections API."""
+        url = f"{self.base_urls['salesforce']}/composite/sobjects"
+        rate_limit = self._rate_limit('salesforce')
+
+        if action in ('create', 'update'):
+            body = {
+                'allOrNone': False,
+                'records': [dict(record, attributes={'type': object_type}) for record in records]
+            }
+            method = 'POST' if action == 'create' else 'PATCH'
+            response = self.http.request(method, url, headers=headers, json=body, rate_limit=rate_limit)
+        elif action == 'delete':
+            ids = ','.join(str(record.get('Id')) for record in records)
+            response = self.http.request('DELETE', url, headers=headers, params={'ids': ids, 'allOrNone': 'false'}, rate_limit=rate_limit)
+        else:
+            raise ValueError(f"Invalid action: {action}")
+
+        if response.status_code != 200:
+            raise Exception(f"Salesforce composite request failed with status {response.status_code}")
+
+        # Salesforce returns one result per record, in request order
+        return [
+            {
+                'success': bool(item.get('success')),
+                'id': item.get('id'),
+                'errors': [error.get('message') for error in item.get('errors') or []]
+            }
+            for item in response.json()
+        ]
+
+    def _batch_hubspot(self, object_type: str, action: str, records: List[Dict[str, Any]], headers: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Send records through the HubSpot batch create/update/archive API."""
+        url = f"{self.base_urls['hubspot']}/objects/{object_type}/batch"
+        rate_limit = self._rate_limit('hubspot')
+
+        if action == 'create':
+            # objectWriteTraceId lets errors be matched back to their input
+            inputs = [
+                {'properties': record, 'objectWriteTraceId': str(index)}
+                for index, record in enumerate(records)
+            ]
+            keys = [str(index) for index in range(len(records))]
+            response = self.http.request('POST', f"{url}/create", headers=headers, json={'inputs': inputs}, rate_limit=rate_limit)
+        elif action == 'update':
+            inputs = [
+                {'id': str(record.get('id')), 'properties': {k: v for k, v in record.items() if k != 'id'}}
+                for record in records
+            ]
+            keys = [item['id'] for item in inputs]
+            response = self.http.request('POST', f"{url}/update", headers=headers, json={'inputs': inputs}, rate_limit=rate_limit)
+        elif action == 'delete':
+            keys = [str(record.get('id')) for record in records]
+            response = self.http.request('POST', f"{url}/archive", headers=headers, json={'inputs': [{'id': key} for key in keys]}, rate_limit=rate_limit)
+        else:
+            raise ValueError(f"Invalid action: {action}")
+
+        if response.status_code not in (200, 201, 204, 207):
+            raise Exception(f"HubSpot batch request failed with status {response.status_code}")
+
+        body = response.json() if response.content else {}
+        errors: Dict[str, List[str]] = {}
+        for error in body.get('errors') or []:
+            context = error.get('context') or {}
+            for key in (context.get('objectWriteTraceId') or []) + (context.get('ids') or []):
+                errors.setdefault(str(key), []).append(error.get('message'))
+
+        # Prefer matching created records by trace id, falling back to order
+        created = body.get('results') or []
+        created_by_key = {str(item['objectWriteTraceId']): item for item in created if 'objectWriteTraceId' in item}
+        unmatched = iter(item for item in created if 'objectWriteTraceId' not in item)
+        results = []
+        for key in keys:
+            if key in errors:
+                results.append({'success': False, 'id': None if action == 'create' else key, 'errors': errors[key]})
+            elif action == 'create':
+                result = created_by_key.get(key) or next(unmatched, {})
+                results.append({'success': True, 'id': result.get('id'), 'errors': []})
+            else:
+                results.append({'success': True, 'id': key, 'errors': []})
+        return results
+
     def _update_salesforce(self, object_type: str, action: str, data: Dict[str, Any], headers: Dict[str, str]) -> bool:
         """Update Salesforce CRM."""
         try:
             url = f"{self.base_urls['salesforce']}/sobjects/{object_type}"
+            rate_limit = self._rate_limit('salesforce')
             
             if action == 'create':
-                response = requests.post(url, headers=headers, json=data)
+                response = self.http.request('POST', url, headers=headers, json=data, rate_limit=rate_limit)
             elif action == 'update':
-                response = requests.patch(f"{url}/{data.get('Id')}", headers=headers, json=data)
+                response = self.http.request('PATCH', f"{url}/{data.get('Id')}", headers=headers, json=data, rate_limit=rate_limit)
             elif action == 'delete':
-                response = requests.delete(f"{url}/{data.get('Id')}", headers=headers)
+                response = self.http.request('DELETE', f"{url}/{data.get('Id')}", headers=headers, rate_limit=rate_limit)
             else:
                 raise ValueError(f"Invalid action: {action}")
 
@@ -57,13 +196,14 @@ class CRMService:
         """Update HubSpot CRM."""
         try:
             url = f"{self.base_urls['hubspot']}/objects/{object_type}"
+            rate_limit = self._rate_limit('hubspot')
             
             if action == 'create':
-                response = requests.post(url, headers=headers, json=data)
+                response = self.http.request('POST', url, headers=headers, json=data, rate_limit=rate_limit)
             elif action == 'update':
-                response = requests.patch(f"{url}/{data.get('id')}", headers=headers, json=data)
+                response = self.http.request('PATCH', f"{url}/{data.get('id')}", headers=headers, json=data, rate_limit=rate_limit)
             elif action == 'delete':
-                response = requests.delete(f"{url}/{data.get('id')}", headers=headers)
+                response = self.http.request('DELETE', f"{url}/{data.get('id')}", headers=headers, rate_limit=rate_limit)
             else:
                 raise ValueError(f"Invalid action: {action}")
 
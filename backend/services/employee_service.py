@@ -1,7 +1,8 @@
-from typing import Dict, Any
-import smtplib
+from typing import Dict, Any, List, Optional
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from services.smtp_pool import SMTPConnectionPool
+from services.rate_limit import governor
 import os
 from datetime import datetime
 
@@ -11,39 +12,102 @@ class EmployeeService:
         self.smtp_port = int(os.getenv('SMTP_PORT', 587))
         self.smtp_username = os.getenv('SMTP_USERNAME')
         self.smtp_password = os.getenv('SMTP_PASSWORD')
+        self.smtp_pool = SMTPConnectionPool(
+            self.smtp_server,
+            self.smtp_port,
+            self.smtp_username,
+            self.smtp_password,
+            max_size=int(os.getenv('SMTP_POOL_SIZE', 4)),
+            use_tls=os.getenv('SMTP_STARTTLS', 'true').lower() == 'true',
+            timeout=float(os.getenv('SMTP_TIMEOUT', 30)),
+            keepalive=float(os.getenv('SMTP_KEEPALIVE', 30))
+        )
 
-    def create_assignment(self, assignee_email: str, title: str, description: str, due_date: datetime) -> bool:
+    def _message_id(self, idempotency_key: str) -> str:
+        """Deterministic Message-ID, so a resent message can be recognised as a duplicate."""
+        domain = (self.smtp_username or '').rpartition('@')[2] or 'workflow-automation.local'
+        return f"<{idempotency_key}@{domain}>"
+
+    def _build_assignment_message(self, assignee_email: str, title: str, description: str, due_date: datetime) -> MIMEMultipart:
+        # Create email message
+        msg = MIMEMultipart()
+        msg['From'] = self.smtp_username
+        msg['To'] = assignee_email
+        msg['Subject'] = f"New Assignment: {title}"
+
+        # Create email body
+        body = f"""
+        <h2>New Assignment</h2>
+        <p><strong>Title:</strong> {title}</p>
+        <p><strong>Description:</strong> {description}</p>
+        <p><strong>Due Date:</strong> {due_date.strftime('%Y-%m-%d %H:%M')}</p>
+        <p>Please log in to the Workflow Automation system to view more details.</p>
+        """
+
+        msg.attach(MIMEText(body, 'html'))
+        return msg
+
+    def create_assignment(self, assignee_email: str, title: str, description: str, due_date: datetime,
+                          idempotency_key: Optional[str] = None) -> bool:
         """Create and send an employee assignment."""
         try:
             if not all([self.smtp_username, self.smtp_password]):
                 raise ValueError("SMTP credentials not configured")
 
-            # Create email message
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_username
-            msg['To'] = assignee_email
-            msg['Subject'] = f"New Assignment: {title}"
+            msg = self._build_assignment_message(assignee_email, title, description, due_date)
+            if idempotency_key:
+                msg['Message-ID'] = self._message_id(idempotency_key)
+            with governor.limit('smtp', self.smtp_username):
+                return self.smtp_pool.send_message(msg)
+        except Exception as e:
+            print(f"Error creating employee assignment: {str(e)}")
+            return False
+
+    def create_assignments(self, assignments: List[Dict[str, Any]]) -> List[bool]:
+        """Send many assignments over one pooled SMTP session.
+
+        Each assignment is a dict with ``assignee_email``, ``title``,
+        ``description`` and ``due_date``. Returns one success flag per
+        assignment, in order.
+        """
+        try:
+            if not all([self.smtp_username, self.smtp_password]):
+                raise ValueError("SMTP credentials not configured")
 
-            # Create email body
-            body = f"""
-            <h2>New Assignment</h2>
-            <p><strong>Title:</strong> {title}</p>
-            <p><strong>Description:</strong> {description}</p>
-            <p><strong>Due Date:</strong> {due_date.strftime('%Y-%m-%d %H:%M')}</p>
-            <p>Please log in to the Workflow Automation system to view more details.</p>
-            """
+            messages = [
+                self._build_assignment_message(
+                    assignment['assignee_email'],
+                    assignment['title'],
+                    assignment['description'],
+                    assignment['due_date']
+                )
+                for assignment in assignments
+            ]
+            # Providers meter messages, not sessions, so the batch takes one token each
+            with governor.limit('smtp', self.smtp_username, tokens=len(messages)):
+                return self.smtp_pool.send_messages(messages)
+        except Exception as e:
+            print(f"Error creating employee assignments: {str(e)}")
+            return [False] * len(assignments)
 
-            msg.attach(MIMEText(body, 'html'))
+    def send_email(self, to: str, subject: str, body: str, idempotency_key: Optional[str] = None) -> bool:
+        """Send a plain HTML email."""
+        try:
+            if not all([self.smtp_username, self.smtp_password]):
+                raise ValueError("SMTP credentials not configured")
 
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            msg = MIMEMultipart()
+            msg['From'] = self.smtp_username
+            msg['To'] = to
+            msg['Subject'] = subject
+            if idempotency_key:
+                msg['Message-ID'] = self._message_id(idempotency_key)
+            msg.attach(MIMEText(body or '', 'html'))
 
-            return True
+            with governor.limit('smtp', self.smtp_username):
+                return self.smtp_pool.send_message(msg)
         except Exception as e:
-            print(f"Error creating employee assignment: {str(e)}")
+            print(f"Error sending email: {str(e)}")
             return False
 
     def update_assignment(self, assignment_id: str, updates: Dict[str, Any]) -> bool:
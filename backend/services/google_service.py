@@ -2,9 +2,15 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from services.rate_limit import governor
+from datetime import datetime, timedelta
+import hashlib
 import os
 import pickle
-from typing import Dict, Any
+import re
+import threading
+from typing import Dict, Any, List, Optional
 
 class GoogleService:
     def __init__(self):
@@ -12,55 +18,127 @@ class GoogleService:
             'sheets': ['https://www.googleapis.com/auth/spreadsheets'],
             'calendar': ['https://www.googleapis.com/auth/calendar']
         }
-        self.credentials = None
+        # Refresh tokens this many seconds before they expire
+        self.refresh_margin = timedelta(seconds=int(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN', 300)))
+        self._credentials: Dict[str, Credentials] = {}
+        self._credential_locks = {service_type: threading.Lock() for service_type in self.SCOPES}
+        # googleapiclient service objects are not thread-safe, so each thread builds its own
+        self._clients = threading.local()
+
+    def _needs_refresh(self, credentials: Optional[Credentials]) -> bool:
+        if credentials is None or not credentials.valid:
+            return True
+        # Without a refresh token the only way to renew is the interactive flow; use them until they expire
+        if not credentials.refresh_token:
+            return False
+        return credentials.expiry is not None and credentials.expiry - datetime.utcnow() < self.refresh_margin
 
     def get_credentials(self, service_type: str) -> Credentials:
-        """Get or refresh Google API credentials."""
-        if os.path.exists(f'token_{service_type}.pickle'):
-            with open(f'token_{service_type}.pickle', 'rb') as token:
-                self.credentials = pickle.load(token)
-
-        if not self.credentials or not self.credentials.valid:
-            if self.credentials and self.credentials.expired and self.credentials.refresh_token:
-                self.credentials.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    'credentials.json', self.SCOPES[service_type])
-                self.credentials = flow.run_local_server(port=0)
-            
-            with open(f'token_{service_type}.pickle', 'wb') as token:
-                pickle.dump(self.credentials, token)
+        """Get or refresh Google API credentials.
+
+        Credentials are loaded from ``token_<type>.pickle`` once and then kept
+        in memory. They are refreshed shortly before they expire, under a
+        per-service lock so concurrent callers share a single refresh and
+        pickle write. The interactive consent flow only runs when there are
+        no valid credentials at all.
+        """
+        credentials = self._credentials.get(service_type)
+        if not self._needs_refresh(credentials):
+            return credentials
+
+        with self._credential_locks[service_type]:
+            credentials = self._credentials.get(service_type)
+            if credentials is None and os.path.exists(f'token_{service_type}.pickle'):
+                with open(f'token_{service_type}.pickle', 'rb') as token:
+                    credentials = pickle.load(token)
 
-        return self.credentials
+            if self._needs_refresh(credentials):
+                if credentials is not None and credentials.refresh_token:
+                    credentials.refresh(Request())
+                else:
+                    flow = InstalledAppFlow.from_client_secrets_file(
+                        'credentials.json', self.SCOPES[service_type])
+                    credentials = flow.run_local_server(port=0)
 
-    def update_google_sheet(self, spreadsheet_id: str, sheet_name: str, data: Dict[str, Any]) -> bool:
+                # Write to a temporary file first so readers never see a partial pickle
+                with open(f'token_{service_type}.pickle.tmp', 'wb') as token:
+                    pickle.dump(credentials, token)
+                os.replace(f'token_{service_type}.pickle.tmp', f'token_{service_type}.pickle')
+
+            self._credentials[service_type] = credentials
+            return credentials
+
+    def get_client(self, service_type: str, api: str, version: str):
+        """Return this thread's cached API client, rebuilding it if the credentials changed."""
+        credentials = self.get_credentials(service_type)
+        cached = getattr(self._clients, api, None)
+        if cached is None or cached[0] is not credentials:
+            # e.g. GOOGLE_SHEETS_API_ENDPOINT, to point a client at a local fake
+            endpoint = os.getenv(f'GOOGLE_{api.upper()}_API_ENDPOINT')
+            cached = (credentials, build(
+                api, version, credentials=credentials, cache_discovery=False,
+                client_options={'api_endpoint': endpoint} if endpoint else None
+            ))
+            setattr(self._clients, api, cached)
+        return cached[1]
+
+    def update_google_sheet(self, spreadsheet_id: str, sheet_name: str, data: Dict[str, Any],
+                            data_range: Optional[str] = None) -> bool:
         """Update Google Sheet with provided data."""
+        return self.append_rows(spreadsheet_id, sheet_name, [self.row_from_data(data)], data_range)[0]['success']
+
+    @staticmethod
+    def row_from_data(data: Dict[str, Any]) -> List[Any]:
+        """Turn a task's data dict into a sheet row, one cell per value."""
+        return [data.get(key) for key in data.keys()]
+
+    def append_rows(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]],
+                    data_range: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Append many rows to a sheet with a single ``values.append`` call.
+
+        ``data_range`` (e.g. ``B2:E``) selects the table to append to and
+        defaults to ``A1``. Returns one ``{"success", "range"}`` dict per row,
+        where ``range`` is the A1 range the row was written to.
+        """
         try:
-            creds = self.get_credentials('sheets')
-            service = build('sheets', 'v4', credentials=creds)
-            
-            # Prepare the data for update
-            values = [[data.get(key) for key in data.keys()]]
-            body = {'values': values}
-            
-            # Update the sheet
-            service.spreadsheets().values().append(
-                spreadsheetId=spreadsheet_id,
-                range=f'{sheet_name}!A1',
-                valueInputOption='RAW',
-                body=body
-            ).execute()
-            
-            return True
+            service = self.get_client('sheets', 'sheets', 'v4')
+
+            with governor.limit('google_sheets', 'sheets'):
+                response = service.spreadsheets().values().append(
+                    spreadsheetId=spreadsheet_id,
+                    range=f'{sheet_name}!{data_range or "A1"}',
+                    valueInputOption='RAW',
+                    body={'values': rows}
+                ).execute()
+
+            updated_range = (response or {}).get('updates', {}).get('updatedRange')
+            return [{'success': True, 'range': row_range} for row_range in self._row_ranges(updated_range, len(rows))]
         except Exception as e:
             print(f"Error updating Google Sheet: {str(e)}")
-            return False
+            return [{'success': False, 'range': None, 'error': str(e)} for _ in rows]
+
+    @staticmethod
+    def _row_ranges(updated_range: Optional[str], count: int) -> List[Optional[str]]:
+        """Split an updated range like ``Sheet1!A5:C7`` into one range per row."""
+        match = re.match(r"^(.*)!([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?$", updated_range or '')
+        if not match:
+            return [None] * count
+        sheet, first_column, first_row, last_column, _ = match.groups()
+        last_column = last_column or first_column
+        return [
+            f"{sheet}!{first_column}{int(first_row) + i}:{last_column}{int(first_row) + i}"
+            for i in range(count)
+        ]
+
+    def create_calendar_event(self, calendar_id: str, event_data: Dict[str, Any],
+                              idempotency_key: Optional[str] = None) -> bool:
+        """Create a new event in Google Calendar.
 
-    def create_calendar_event(self, calendar_id: str, event_data: Dict[str, Any]) -> bool:
-        """Create a new event in Google Calendar."""
+        With an ``idempotency_key`` the event gets an id derived from it, so
+        creating it again is rejected by Calendar and counted as success.
+        """
         try:
-            creds = self.get_credentials('calendar')
-            service = build('calendar', 'v3', credentials=creds)
+            service = self.get_client('calendar', 'calendar', 'v3')
             
             event = {
                 'summary': event_data.get('title'),
@@ -74,11 +152,21 @@ class GoogleService:
                     'timeZone': 'UTC',
                 },
             }
+            if idempotency_key:
+                # Event ids may only use base32hex characters, which hex digits are
+                event['id'] = hashlib.sha1(idempotency_key.encode()).hexdigest()
             
-            service.events().insert(
-                calendarId=calendar_id,
-                body=event
-            ).execute()
+            try:
+                with governor.limit('google_calendar', 'calendar'):
+                    service.events().insert(
+                        calendarId=calendar_id,
+                        body=event
+                    ).execute()
+            except HttpError as e:
+                if idempotency_key and e.resp.status == 409:
+                    # Created by an earlier attempt
+                    return True
+                raise
             
             return True
         except Exception as e:
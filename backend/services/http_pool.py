@@ -0,0 +1,159 @@
+from email.utils import parsedate_to_datetime
+from contextlib import nullcontext
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+from datetime import datetime, timezone
+import requests
+import threading
+import random
+import time
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "PATCH"}
+
+class PooledHTTPClient:
+    """HTTP client with one keep-alive session per host, timeouts and retries.
+
+    Each ``scheme://host`` gets its own ``requests.Session`` whose connection
+    pool holds up to ``pool_size`` connections, so repeated calls reuse TCP
+    and TLS connections instead of opening new ones.
+
+    Requests are retried up to ``max_retries`` times with full-jitter
+    exponential backoff. 429 and 503 responses are always retried and honour
+    ``Retry-After``; 502/504 responses, read timeouts and dropped connections
+    are only retried for idempotent methods, since the server may already
+    have acted on the request. Connect timeouts are always retried.
+
+    With a ``governor`` (see ``services.rate_limit``), a request made with
+    ``rate_limit=(integration, credential)`` waits for that credential's
+    rate limit before every attempt, and a ``Retry-After`` answer holds back
+    all requests on the credential rather than just the one retrying.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 governor=None):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.governor = governor
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0
+        }
+
+    def _session(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+                session.mount(key, adapter)
+                self._sessions[key] = session
+            return session
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None:
+            retry_after = self._retry_after(response)
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def request(self, method: str, url: str, rate_limit: Optional[Tuple[str, Optional[str]]] = None,
+                **kwargs: Any) -> requests.Response:
+        """Send a request, retrying transient failures.
+
+        Returns the final response (which may still be an error status once
+        retries run out) or raises the last connection error.
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        session = self._session(url)
+        governed = self.governor is not None and rate_limit is not None
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                with self.governor.limit(*rate_limit) if governed else nullcontext():
+                    self._count("requests")
+                    response = session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectTimeout:
+                if last_attempt:
+                    self._count("failures")
+                    raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last_attempt or not idempotent:
+                    self._count("failures")
+                    raise
+            else:
+                paused = False
+                if response.status_code in (429, 503):
+                    self._count("rate_limited")
+                    retry_after = self._retry_after(response)
+                    if governed and retry_after and not last_attempt:
+                        # The governor makes this and every other caller wait it out; without
+                        # a rate limit to pause, this caller sleeps through Retry-After below
+                        paused = self.governor.pause(*rate_limit, min(retry_after, self.backoff_max))
+                elif not (response.status_code in (502, 504) and idempotent):
+                    return response
+                if last_attempt:
+                    self._count("failures")
+                    return response
+                self._count("retries")
+                if not paused:
+                    time.sleep(self._backoff(attempt, response))
+                continue
+
+            self._count("retries")
+            time.sleep(self._backoff(attempt))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Request/retry counters plus connection counts for each host pool."""
+        with self._lock:
+            counters = dict(self.counters)
+            sessions = dict(self._sessions)
+
+        pools = {}
+        for host, session in sessions.items():
+            adapter = session.get_adapter(host)
+            opened = 0
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+            pools[host] = {"max_size": self.pool_size, "connections_opened": opened}
+        counters["pools"] = pools
+        return counters
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
@@ -0,0 +1,238 @@
+from contextlib import contextmanager, nullcontext
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, Any, Optional, Tuple
+from metrics import Histogram
+import threading
+import hashlib
+import time
+import os
+
+# Default requests per second, burst size and concurrent calls for each
+# integration, per credential. Override any of them with
+# <INTEGRATION>_RATE_LIMIT, <INTEGRATION>_RATE_BURST and
+# <INTEGRATION>_MAX_CONCURRENCY, e.g. HUBSPOT_RATE_LIMIT=19; 0 disables a limit.
+DEFAULT_LIMITS = {
+    'salesforce': {'rate': 20.0, 'burst': 40, 'concurrency': 25},
+    'hubspot': {'rate': 10.0, 'burst': 100, 'concurrency': 10},
+    'google_sheets': {'rate': 1.0, 'burst': 60, 'concurrency': 10},
+    'google_calendar': {'rate': 10.0, 'burst': 20, 'concurrency': 10},
+    'smtp': {'rate': 10.0, 'burst': 20, 'concurrency': 4}
+}
+
+INTEGRATION_REQUEST_DURATION = Histogram(
+    "workflow_integration_request_duration_seconds",
+    "Duration of calls to external integrations, excluding time spent waiting for the rate limit",
+    ["integration"]
+)
+RATE_LIMIT_WAIT = Histogram(
+    "workflow_rate_limit_wait_seconds",
+    "Time integration calls waited for a concurrency slot and rate limit token",
+    ["integration"]
+)
+
+class TokenBucket:
+    """Thread-safe token bucket holding up to ``burst`` tokens, refilled at ``rate`` per second.
+
+    A request larger than the bucket is let through once the bucket is full
+    and leaves it in debt, so callers after it wait for the refill instead of
+    the large request waiting forever.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float) -> float:
+        """Take ``tokens`` if available; otherwise return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            needed = min(tokens, self.burst)
+            if self._tokens >= needed:
+                self._tokens -= tokens
+                return 0.0
+            return (needed - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until ``tokens`` are available; False if that takes longer than ``timeout``."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Empty the bucket so that nothing is let through for ``seconds``."""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self._updated = time.monotonic()
+
+class DatabaseTokenBucket(TokenBucket):
+    """Token bucket whose state lives in the ``rate_limit_buckets`` table.
+
+    Every worker process and node taking from the same key shares one
+    budget. Tokens are taken with a compare-and-set on the row's version, so
+    no row locks are held while waiting; timestamps are wall-clock, so nodes
+    need reasonably synchronised clocks.
+    """
+
+    def __init__(self, key: str, rate: float, burst: Optional[float] = None, session_factory=None):
+        super().__init__(rate, burst)
+        if session_factory is None:
+            from database import SessionLocal
+            session_factory = SessionLocal
+        self.key = key
+        self.session_factory = session_factory
+
+    def _update(self, change) -> float:
+        from models import RateLimitBucket
+
+        db = self.session_factory()
+        try:
+            while True:
+                bucket = db.query(RateLimitBucket).filter(RateLimitBucket.key == self.key).first()
+                if bucket is None:
+                    db.add(RateLimitBucket(key=self.key, tokens=self.burst, updated_at=time.time(), version=0))
+                    try:
+                        db.commit()
+                    except IntegrityError:
+                        db.rollback()
+                    continue
+
+                now = time.time()
+                tokens = min(self.burst, bucket.tokens + max(0.0, now - bucket.updated_at) * self.rate)
+                new_tokens, wait = change(tokens)
+                if new_tokens is None:
+                    db.rollback()
+                    return wait
+                updated = db.query(RateLimitBucket).filter(
+                    RateLimitBucket.key == self.key,
+                    RateLimitBucket.version == bucket.version
+                ).update(
+                    {"tokens": new_tokens, "updated_at": now, "version": bucket.version + 1},
+                    synchronize_session=False
+                )
+                db.commit()
+                if updated:
+                    return wait
+                # Another process took tokens in between; retry with fresh state
+                db.expire_all()
+        finally:
+            db.close()
+
+    def _take(self, tokens: float) -> float:
+        needed = min(tokens, self.burst)
+
+        def take(available):
+            if available >= needed:
+                return available - tokens, 0.0
+            return None, (needed - available) / self.rate
+        return self._update(take)
+
+    def pause(self, seconds: float):
+        self._update(lambda available: (min(available, -seconds * self.rate), 0.0))
+
+class RateGovernor:
+    """Per-integration, per-credential rate limits and concurrency caps.
+
+    ``limit(integration, credential)`` is a context manager that waits for a
+    concurrency slot and then for a token before the wrapped call goes out,
+    so bursts queue up instead of being answered with 429s. Each credential
+    (API key, OAuth client, SMTP login) gets its own bucket and semaphore,
+    since that's what providers meter. With ``backend="database"`` the token
+    buckets are shared by every process using the database; concurrency caps
+    are always per process. Since every integration call passes through
+    here, this is also where their wait and call durations are measured.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None, backend: str = "memory",
+                 session_factory=None):
+        self.limits = limits if limits is not None else DEFAULT_LIMITS
+        self.backend = backend
+        self.session_factory = session_factory
+        self._buckets: Dict[Tuple[str, str], Optional[TokenBucket]] = {}
+        self._slots: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_env(cls) -> "RateGovernor":
+        limits = {}
+        for integration, defaults in DEFAULT_LIMITS.items():
+            prefix = integration.upper()
+            limits[integration] = {
+                'rate': float(os.getenv(f'{prefix}_RATE_LIMIT', defaults['rate'])),
+                'burst': float(os.getenv(f'{prefix}_RATE_BURST', defaults['burst'])),
+                'concurrency': int(os.getenv(f'{prefix}_MAX_CONCURRENCY', defaults['concurrency']))
+            }
+        return cls(limits, backend=os.getenv('RATE_LIMIT_BACKEND', 'memory'))
+
+    @staticmethod
+    def _credential_key(credential: Optional[str]) -> str:
+        # Keys can end up in the database, so never store the credential itself
+        return hashlib.sha256((credential or '').encode()).hexdigest()[:16]
+
+    def _get(self, integration: str, credential: Optional[str]):
+        key = (integration, self._credential_key(credential))
+        with self._lock:
+            if key not in self._buckets:
+                limit = self.limits.get(integration, {})
+                bucket = None
+                if limit.get('rate'):
+                    if self.backend == "database":
+                        bucket = DatabaseTokenBucket(f"{key[0]}:{key[1]}", limit['rate'], limit.get('burst'),
+                                                     self.session_factory)
+                    else:
+                        bucket = TokenBucket(limit['rate'], limit.get('burst'))
+                self._buckets[key] = bucket
+                concurrency = int(limit.get('concurrency') or 0)
+                self._slots[key] = threading.BoundedSemaphore(concurrency) if concurrency else nullcontext()
+                self.counters.setdefault(integration, {"calls": 0, "waits": 0, "wait_seconds": 0.0})
+            return self._buckets[key], self._slots[key]
+
+    def _record(self, integration: str, waited: float):
+        with self._lock:
+            counters = self.counters[integration]
+            counters["calls"] += 1
+            if waited > 0.001:
+                counters["waits"] += 1
+                counters["wait_seconds"] += waited
+
+    @contextmanager
+    def limit(self, integration: str, credential: Optional[str] = None, tokens: float = 1.0):
+        """Hold a concurrency slot for the duration of the block, after taking ``tokens``."""
+        bucket, slots = self._get(integration, credential)
+        start = time.monotonic()
+        with slots:
+            if bucket is not None:
+                bucket.acquire(tokens)
+            waited = time.monotonic() - start
+            self._record(integration, waited)
+            RATE_LIMIT_WAIT.observe(waited, integration=integration)
+            with INTEGRATION_REQUEST_DURATION.time(integration=integration):
+                yield
+
+    def pause(self, integration: str, credential: Optional[str], seconds: float) -> bool:
+        """Hold back every caller using this credential, e.g. after a 429 with Retry-After.
+
+        Returns False when the integration has no rate limit to pause, in
+        which case the caller has to wait on its own.
+        """
+        bucket, _ = self._get(integration, credential)
+        if bucket is None or seconds <= 0:
+            return False
+        bucket.pause(seconds)
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {integration: dict(counters) for integration, counters in self.counters.items()}
+
+governor = RateGovernor.from_env()
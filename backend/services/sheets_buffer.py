@@ -0,0 +1,28 @@
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
+from services.batch_buffer import BatchBuffer
+
+class SheetsBuffer(BatchBuffer):
+    """Write-behind buffer for Google Sheets appends.
+
+    ``append`` queues one row and returns a future. Rows for the same
+    ``(spreadsheet_id, sheet_name, data_range)`` from any caller accumulate
+    until ``max_rows`` are pending or the oldest has waited ``max_delay``
+    seconds, and are then written with one ``values.append`` call. Each
+    future resolves to that row's ``{"success", "range"}`` result.
+    """
+
+    def __init__(self, google_service, max_rows: int = 500, max_delay: float = 1.0, flush_threads: int = 4):
+        super().__init__(max_delay, flush_threads, name="sheets-buffer")
+        self.google_service = google_service
+        self.max_rows = max_rows
+
+    def append(self, spreadsheet_id: str, sheet_name: str, row: List[Any], data_range: Optional[str] = None) -> Future:
+        return self._enqueue((spreadsheet_id, sheet_name, data_range), row)
+
+    def batch_limit(self, key: Tuple[str, str, Optional[str]]) -> int:
+        return self.max_rows
+
+    def flush_batch(self, key: Tuple[str, str, Optional[str]], rows: List[List[Any]]) -> List[Dict[str, Any]]:
+        spreadsheet_id, sheet_name, data_range = key
+        return self.google_service.append_rows(spreadsheet_id, sheet_name, rows, data_range)
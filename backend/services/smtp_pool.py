@@ -0,0 +1,179 @@
+from contextlib import contextmanager
+from email.message import Message
+from typing import Dict, Any, List, Optional
+import smtplib
+import threading
+import time
+
+def _connection_lost(error: OSError) -> bool:
+    """True for network failures; smtplib's protocol errors subclass OSError as well."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return not isinstance(error, smtplib.SMTPException)
+
+class SMTPConnectionPool:
+    """A bounded pool of authenticated SMTP connections.
+
+    Connections are opened lazily, kept open between sends and handed out one
+    caller at a time. A connection that has been idle for longer than
+    ``keepalive`` seconds is checked with NOOP before reuse, and a connection
+    the server has dropped is replaced transparently, so callers only pay the
+    connect/STARTTLS/login handshake when a connection is first created.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str], password: Optional[str],
+                 max_size: int = 4, use_tls: bool = True, timeout: float = 30.0,
+                 keepalive: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_size = max_size
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle: List[Dict[str, Any]] = []
+        self._in_use = 0
+        self.connects = 0
+        self.reconnects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self.connects += 1
+        return server
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        with self._lock:
+            entry = self._idle.pop() if self._idle else None
+        if entry is None:
+            return self._connect()
+        if time.monotonic() - entry["last_used"] > self.keepalive and not self._is_alive(entry["server"]):
+            self._discard(entry["server"])
+            with self._lock:
+                self.reconnects += 1
+            return self._connect()
+        return entry["server"]
+
+    def _checkin(self, server: smtplib.SMTP):
+        with self._lock:
+            self._idle.append({"server": server, "last_used": time.monotonic()})
+
+    @contextmanager
+    def _borrowed(self):
+        with self._slots:
+            with self._lock:
+                self._in_use += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._in_use -= 1
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, blocking while ``max_size`` are in use.
+
+        If the body raises, the connection is closed instead of being
+        returned to the pool.
+        """
+        with self._borrowed():
+            server = self._checkout()
+            try:
+                yield server
+            except Exception:
+                self._discard(server)
+                raise
+            self._checkin(server)
+
+    def send_messages(self, messages: List[Message]) -> List[bool]:
+        """Send messages over a single pooled session.
+
+        A dropped connection is replaced and the message retried once; a
+        message the server rejects is reported as failed without affecting
+        the rest. If a connection can't be set up for any other reason, such
+        as rejected credentials, the remaining messages are reported as
+        failed without logging in again for each of them. Returns one
+        success flag per message, in order.
+        """
+        results = []
+        with self._borrowed():
+            server = None
+            try:
+                for msg in messages:
+                    for attempt in range(2):
+                        try:
+                            if server is None:
+                                server = self._checkout()
+                            server.send_message(msg)
+                            results.append(True)
+                            break
+                        except OSError as e:
+                            if not _connection_lost(e):
+                                if server is None:
+                                    # Setting up the session failed, e.g. SMTPAuthenticationError
+                                    raise
+                                print(f"Error sending message to {msg['To']}: {str(e)}")
+                                results.append(False)
+                                break
+                            if server is not None:
+                                self._discard(server)
+                                server = None
+                            if attempt:
+                                print(f"Error sending message to {msg['To']}: {str(e)}")
+                                results.append(False)
+                            else:
+                                with self._lock:
+                                    self.reconnects += 1
+            except smtplib.SMTPException as e:
+                print(f"Error opening SMTP session: {str(e)}")
+                results.extend([False] * (len(messages) - len(results)))
+            if server is not None:
+                self._checkin(server)
+        return results
+
+    def send_message(self, msg: Message) -> bool:
+        return self.send_messages([msg])[0]
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._discard(entry["server"])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "connects": self.connects,
+                "reconnects": self.reconnects
+            }
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Any, List, Optional
+from models import Task
+import os
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv('WORKFLOW_MAX_CONCURRENCY', 4))
+
+class CycleError(ValueError):
+    """Raised when task dependencies form a cycle."""
+
+def resolve_dependencies(tasks: List[Task]) -> Dict[int, List[int]]:
+    """Map each task id to the ids of the tasks it waits for.
+
+    Tasks with an explicit ``depends_on`` list use it as-is (an empty list
+    makes the task a root). Tasks without one keep the legacy behaviour of
+    running after every task in the preceding ``order`` group, so existing
+    workflows stay sequential while tasks sharing an order run side by side.
+    """
+    task_ids = {task.id for task in tasks}
+    orders = sorted({task.order or 0 for task in tasks})
+    by_order: Dict[int, List[int]] = {}
+    for task in tasks:
+        by_order.setdefault(task.order or 0, []).append(task.id)
+
+    dependencies = {}
+    for task in tasks:
+        if task.depends_on is not None:
+            missing = [dep for dep in task.depends_on if dep not in task_ids]
+            if missing:
+                raise ValueError(f"Task {task.id} depends on unknown tasks: {missing}")
+            dependencies[task.id] = list(task.depends_on)
+        else:
+            position = orders.index(task.order or 0)
+            dependencies[task.id] = by_order[orders[position - 1]] if position > 0 else []
+    return dependencies
+
+def topological_order(tasks: List[Task]) -> List[Task]:
+    """Return tasks so that every task comes after its dependencies.
+
+    Ties are broken by ``Task.order`` and then id, so the result is stable.
+    Raises ``CycleError`` if the dependencies cannot be ordered.
+    """
+    dependencies = resolve_dependencies(tasks)
+    by_id = {task.id: task for task in tasks}
+    remaining = {task_id: len(set(deps)) for task_id, deps in dependencies.items()}
+    dependents: Dict[int, List[int]] = {task_id: [] for task_id in by_id}
+    for task_id, deps in dependencies.items():
+        for dep in set(deps):
+            dependents[dep].append(task_id)
+
+    sort_key = lambda task_id: (by_id[task_id].order or 0, task_id)
+    ready = sorted((task_id for task_id, count in remaining.items() if count == 0), key=sort_key)
+    ordered = []
+    while ready:
+        task_id = ready.pop(0)
+        ordered.append(by_id[task_id])
+        for dependent in dependents[task_id]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+        ready.sort(key=sort_key)
+
+    if len(ordered) != len(tasks):
+        cyclic = sorted(task_id for task_id, count in remaining.items() if count > 0)
+        raise CycleError(f"Task dependencies contain a cycle involving tasks {cyclic}")
+    return ordered
+
+def run_graph(tasks: List[Task], run: Callable[[Task], Dict[str, Any]],
+              max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+              completed: Optional[Dict[int, Dict[str, Any]]] = None,
+              dependencies: Optional[Dict[int, List[int]]] = None) -> List[Dict[str, Any]]:
+    """Run tasks in dependency order, running independent tasks concurrently.
+
+    ``run`` is called with each task and returns its result dict, whose
+    ``status`` is ``"success"`` or ``"failed"``. After the first failure no
+    new tasks are started; tasks already running finish and everything that
+    never ran is reported as ``"skipped"``. Results follow topological order.
+    ``completed`` maps ids of tasks that already succeeded (in an earlier
+    run) to their results; those are not run again. Callers that already
+    have ``tasks`` in topological order pass their ``dependencies`` (see
+    ``workflow_plans``) to skip resolving the graph again.
+    """
+    if dependencies is None:
+        ordered = topological_order(tasks)
+        dependencies = resolve_dependencies(tasks)
+    else:
+        ordered = tasks
+    results: Dict[int, Dict[str, Any]] = dict(completed or {})
+    waiting = {
+        task.id: set(dependencies[task.id]) - set(results)
+        for task in ordered if task.id not in results
+    }
+    failed = False
+    max_concurrency = max(1, max_concurrency)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        running = {}
+        while True:
+            if not failed:
+                for task in ordered:
+                    if len(running) >= max_concurrency:
+                        break
+                    if task.id in waiting and not waiting[task.id]:
+                        del waiting[task.id]
+                        running[pool.submit(run, task)] = task
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"task_id": task.id, "status": "failed", "error": str(e)}
+                results[task.id] = result
+                if result["status"] != "success":
+                    failed = True
+                for deps in waiting.values():
+                    deps.discard(task.id)
+
+    return [
+        results.get(task.id, {"task_id": task.id, "status": "skipped"})
+        for task in ordered
+    ]
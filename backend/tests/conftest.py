@@ -0,0 +1,127 @@
+import os
+import tempfile
+import threading
+import time
+
+# Settings are read when the application is imported, so they are set before any test module imports it
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}"
+for name, value in (("EXECUTION_POLL_INTERVAL", "0.05"), ("TASK_RETRY_BACKOFF", "0.01"),
+                    ("CRM_BACKOFF_BASE", "0.01")):
+    os.environ.setdefault(name, value)
+for integration in ("SALESFORCE", "HUBSPOT", "GOOGLE_SHEETS", "GOOGLE_CALENDAR", "SMTP"):
+    os.environ.setdefault(f"{integration}_RATE_LIMIT", "0")
+
+import pytest
+
+from handlers import HANDLERS, TaskHandler, register_handler
+
+@register_handler
+class RecordingHandler(TaskHandler):
+    """Waits ``config["seconds"]``, stopping if its execution is cancelled, then fails if its task is named in ``failing``.
+
+    Every run is kept in ``runs`` with its start and end times, so tests can
+    check what ran, how often and in what order. Returns the task's config,
+    so templated values show up in the task's output.
+    """
+    task_type = "test_wait"
+
+    def __init__(self):
+        super().__init__()
+        self.runs = []
+        self.failing = set()
+        self._lock = threading.Lock()
+
+    def run(self, task, context):
+        started = time.monotonic()
+        cancelled = context.cancel_token.wait(float(task.config.get("seconds", 0)))
+        with self._lock:
+            self.runs.append({"name": task.name, "execution_id": context.execution_id, "attempt": context.attempt,
+                              "config": dict(task.config), "started": started, "finished": time.monotonic()})
+        if cancelled:
+            context.cancel_token.raise_if_cancelled()
+        if task.name in self.failing:
+            raise RuntimeError(f"{task.name} failed")
+        return dict(task.config)
+
+    def ran(self, execution_id):
+        with self._lock:
+            return [run["name"] for run in self.runs if run["execution_id"] == execution_id]
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from database import engine
+    from migrations import migrate
+
+    migrate(engine)
+    return engine
+
+@pytest.fixture
+def fakes():
+    """Start fake servers for one test and stop them afterwards: ``crm = fakes(FakeCRMServer())``."""
+    started = []
+
+    def start(fake):
+        started.append(fake.start())
+        return fake
+
+    yield start
+    for fake in started:
+        fake.stop()
+
+@pytest.fixture(scope="session")
+def client():
+    """The application without its startup hooks, so no engine or scheduler runs unless a test starts them."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    return TestClient(app)
+
+@pytest.fixture
+def recorder():
+    """The ``test_wait`` handler, with no runs recorded and no task set to fail."""
+    handler = HANDLERS["test_wait"]
+    handler.runs.clear()
+    handler.failing.clear()
+    return handler
+
+@pytest.fixture
+def engine():
+    """The application's execution engine, running for the duration of one test."""
+    from execution_engine import execution_engine
+
+    execution_engine.start()
+    yield execution_engine
+    execution_engine.stop(timeout=5)
+
+@pytest.fixture
+def create_workflow(client):
+    """Create a workflow of ``test_wait`` tasks through ``/workflows/bulk``; returns its id and task ids.
+
+    ``create_workflow({"name": "a"}, {"name": "b", "depends_on": ["a"]}, timeout=5)``; task fields
+    default to ``test_wait`` with an empty config, in the order given.
+    """
+    def create(*tasks, **fields):
+        definition = {"name": "test workflow", "description": "", **fields, "tasks": [
+            {"task_type": "test_wait", "config": {}, "order": order, **task}
+            for order, task in enumerate(tasks, start=1)
+        ]}
+        response = client.post("/workflows/bulk", json=definition)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
+
+@pytest.fixture
+def wait_for_execution(client):
+    """Poll an execution until it leaves ``queued`` and ``running``; returns it."""
+    def wait(execution_id, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            execution = client.get(f"/executions/{execution_id}").json()
+            if execution["status"] not in ("queued", "running"):
+                return execution
+            if time.monotonic() > deadline:
+                raise AssertionError(f"Execution {execution_id} is still {execution['status']} after {timeout}s")
+            time.sleep(0.02)
+
+    return wait
\ No newline at end of file
@@ -0,0 +1,11 @@
+def test_application_serves_the_routers_and_metrics(client):
+    assert client.get("/").json() == {"message": "Workflow Automation API"}
+    workflow = client.post("/workflows/", json={"name": "main app", "description": ""}).json()
+    assert client.get(f"/workflows/{workflow['id']}").json()["name"] == "main app"
+    assert client.get(f"/tasks/workflow/{workflow['id']}").json() == []
+    assert client.get(f"/executions/workflow/{workflow['id']}").json() == []
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert "workflow_execution_queue_depth" in metrics.text
+    paths = {route.path for route in client.app.routes}
+    assert {"/workflows/{workflow_id}/execute", "/executions/{execution_id}/events", "/metrics"} <= paths
\ No newline at end of file
@@ -0,0 +1,42 @@
+import pytest
+
+from services.batch_buffer import BatchBuffer
+
+class EchoBuffer(BatchBuffer):
+    """Flushes three items at a time and answers only the first ``answered`` of them."""
+
+    def __init__(self, answered: int):
+        super().__init__(max_delay=0.05, name="echo-buffer")
+        self.answered = answered
+
+    def batch_limit(self, key):
+        return 3
+
+    def flush_batch(self, key, items):
+        return items[:self.answered]
+
+def test_each_future_gets_its_items_result():
+    buffer = EchoBuffer(answered=3)
+    futures = [buffer._enqueue("key", i) for i in range(3)]
+    assert [future.result(timeout=5) for future in futures] == [0, 1, 2]
+    buffer.stop()
+    assert buffer.stats() == {"pending": 0, "batches_sent": 1, "items_sent": 3}
+
+def test_unanswered_items_fail_instead_of_hanging():
+    buffer = EchoBuffer(answered=1)
+    futures = [buffer._enqueue("key", i) for i in range(3)]
+    assert futures[0].result(timeout=5) == 0
+    for future in futures[1:]:
+        with pytest.raises(RuntimeError, match="returned 1 results for 3 items"):
+            future.result(timeout=5)
+    buffer.stop()
+
+def test_cancelled_member_does_not_fail_the_rest_of_the_batch():
+    buffer = EchoBuffer(answered=3)
+    futures = [buffer._enqueue("key", i) for i in range(2)]
+    assert futures[0].cancel()
+    futures.append(buffer._enqueue("key", 2))
+    assert [future.result(timeout=5) for future in futures[1:]] == [1, 2]
+    assert futures[0].cancelled()
+    buffer.stop()
+    assert buffer.stats()["items_sent"] == 3
\ No newline at end of file
@@ -0,0 +1,73 @@
+import io
+import json
+
+import pytest
+
+from batch_runs import InvalidRecords, TemplateError, parse_records, records_format, render
+
+def configs(recorder, execution_id):
+    return sorted((run["config"] for run in recorder.runs if run["execution_id"] == execution_id),
+                  key=lambda config: json.dumps(config, sort_keys=True))
+
+def test_render_fills_templates_and_keeps_whole_values_typed():
+    record = {"name": "Ada", "count": 3, "team": {"lead": "Grace"}, "tags": ["a", "b"]}
+    assert render("Hi {{ name }}, {{count}} items", record) == "Hi Ada, 3 items"
+    assert render("{{count}}", record) == 3
+    assert render("{{team}}", record) == {"lead": "Grace"}
+    assert render({"to": ["{{team.lead}}", "{{tags.1}}"], "fixed": 1}, record) == {"to": ["Grace", "b"], "fixed": 1}
+    with pytest.raises(TemplateError, match="Record has no field missing"):
+        render("{{missing}}", record)
+
+def test_records_are_parsed_from_json_ndjson_and_csv():
+    assert parse_records(io.StringIO('[{"a": 1}]'), "json") == [{"a": 1}]
+    assert parse_records(io.StringIO('{"a": 1}\n\n{"a": 2}\n'), "ndjson") == [{"a": 1}, {"a": 2}]
+    assert parse_records(io.StringIO("a,b\n1,2\n"), "csv") == [{"a": "1", "b": "2"}]
+    with pytest.raises(InvalidRecords, match="Expected a JSON array of objects"):
+        parse_records(io.StringIO('{"a": 1}'), "json")
+    with pytest.raises(InvalidRecords, match="line 2"):
+        parse_records(io.StringIO('{"a": 1}\n[1]\n'), "ndjson")
+
+def test_records_format_from_file_name_or_content_type():
+    assert records_format("text/csv; charset=utf-8") == "csv"
+    assert records_format("application/octet-stream", "people.jsonl") == "ndjson"
+    assert records_format("application/json", "people.txt") == "json"
+    assert records_format("text/plain") is None
+
+def test_batch_run_fills_templates_from_each_record(client, engine, recorder, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "greet", "config": {"greeting": "Hi {{name}}", "count": "{{count}}"}})
+    response = client.post(f"/workflows/{workflow['id']}/execute/batch", params={"concurrency": 2},
+                           json=[{"name": "Ada", "count": 1}, {"name": "Grace", "count": 2}, {"count": 3}])
+    assert response.status_code == 202, response.text
+    assert response.json()["record_count"] == 3
+
+    execution = wait_for_execution(response.json()["execution_id"])
+    assert execution["status"] == "failed"
+    assert execution["error"] == "1 of 3 records failed"
+    assert execution["record_count"] == 3
+    assert [outcome["status"] for outcome in execution["results"]] == ["success", "success", "failed"]
+    assert execution["results"][2]["error"] == "Record has no field name"
+    assert configs(recorder, execution["id"]) == [{"greeting": "Hi Ada", "count": 1},
+                                                  {"greeting": "Hi Grace", "count": 2}]
+
+def test_batch_run_reads_ndjson_and_csv_uploads(client, engine, recorder, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "greet", "config": {"greeting": "Hi {{name}}"}})
+    url = f"/workflows/{workflow['id']}/execute/batch"
+
+    response = client.post(url, content=b'{"name": "Ada"}\n{"name": "Grace"}\n',
+                           headers={"content-type": "application/x-ndjson"})
+    execution = wait_for_execution(response.json()["execution_id"])
+    assert execution["status"] == "completed"
+    assert configs(recorder, execution["id"]) == [{"greeting": "Hi Ada"}, {"greeting": "Hi Grace"}]
+
+    response = client.post(url, files={"file": ("people.csv", b"name\nLin\n", "application/octet-stream")})
+    execution = wait_for_execution(response.json()["execution_id"])
+    assert execution["status"] == "completed"
+    assert configs(recorder, execution["id"]) == [{"greeting": "Hi Lin"}]
+
+def test_unreadable_records_are_rejected(client, create_workflow):
+    url = f"/workflows/{create_workflow({'name': 'only'})['id']}/execute/batch"
+    assert client.post(url, content=b"name\nAda\n", headers={"content-type": "text/plain"}).status_code == 415
+    response = client.post(url, content=b'{"name": "Ada"}', headers={"content-type": "application/json"})
+    assert response.status_code == 400
+    assert client.post(url, params={"concurrency": 0}, json=[{}]).status_code == 400
+    assert client.post("/workflows/999999999/execute/batch", json=[{}]).status_code == 404
\ No newline at end of file
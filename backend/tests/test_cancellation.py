@@ -0,0 +1,65 @@
+from datetime import datetime
+import time
+
+from database import SessionLocal
+from models import Execution
+
+def wait_until_running(client, execution_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while client.get(f"/executions/{execution_id}").json()["status"] != "running":
+        assert time.monotonic() < deadline, f"Execution {execution_id} never started"
+        time.sleep(0.02)
+
+def test_cancel_stops_a_running_execution(client, engine, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "long", "config": {"seconds": 10}}, {"name": "after"})
+    execution_id = client.post(f"/workflows/{workflow['id']}/execute").json()["execution_id"]
+    wait_until_running(client, execution_id)
+
+    started = time.monotonic()
+    response = client.post(f"/executions/{execution_id}/cancel")
+    assert response.status_code == 202
+    assert response.json()["status"] == "cancelling"
+
+    execution = wait_for_execution(execution_id)
+    assert time.monotonic() - started < 3
+    assert execution["status"] == "cancelled"
+    assert execution["error"] == "Execution cancelled"
+    assert [result["status"] for result in execution["results"]] == ["cancelled", "skipped"]
+    assert client.post(f"/executions/{execution_id}/cancel").status_code == 409
+
+def test_cancel_drops_a_queued_execution(client, create_workflow):
+    workflow = create_workflow({"name": "only"})
+    db = SessionLocal()
+    execution = Execution(workflow_id=workflow["id"], status="queued", started_at=datetime.utcnow())
+    db.add(execution)
+    db.commit()
+    execution_id = execution.id
+    db.close()
+
+    response = client.post(f"/executions/{execution_id}/cancel")
+    assert response.status_code == 202
+    assert response.json()["status"] == "cancelled"
+    assert client.get(f"/executions/{execution_id}").json()["status"] == "cancelled"
+    assert client.post("/executions/999999999/cancel").status_code == 404
+
+def test_task_timeout_fails_the_task(client, engine, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "stuck", "config": {"seconds": 2}, "timeout": 0.2})
+    started = time.monotonic()
+    execution = wait_for_execution(client.post(f"/workflows/{workflow['id']}/execute").json()["execution_id"])
+
+    # Every attempt is cut off by the task's own timeout, not the handler finishing
+    assert time.monotonic() - started < 2
+    assert execution["status"] == "failed"
+    task_result, = execution["results"]
+    assert task_result["status"] == "timed_out"
+    assert "timed out" in task_result["error"]
+
+def test_workflow_timeout_times_out_the_execution(client, engine, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "slow", "config": {"seconds": 10}}, {"name": "after"}, timeout=0.3)
+    started = time.monotonic()
+    execution = wait_for_execution(client.post(f"/workflows/{workflow['id']}/execute").json()["execution_id"])
+
+    assert time.monotonic() - started < 3
+    assert execution["status"] == "timed_out"
+    assert execution["error"] == "Execution timed out"
+    assert [result["status"] for result in execution["results"]] == ["timed_out", "skipped"]
\ No newline at end of file
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fakes.crm_server import FakeCRMServer
+from services.crm_batcher import CRMBatcher
+from services.crm_service import CRMService
+
+def crm_service(monkeypatch, crm: FakeCRMServer) -> CRMService:
+    monkeypatch.setenv("SALESFORCE_API_KEY", "test")
+    monkeypatch.setenv("SALESFORCE_BASE_URL", f"{crm.url}/salesforce")
+    service = CRMService()
+    service.http.governor = None
+    return service
+
+def test_calls_reuse_keep_alive_connections(fakes, monkeypatch):
+    crm = fakes(FakeCRMServer())
+    service = crm_service(monkeypatch, crm)
+    assert all(service.update_crm("salesforce", "Contact", "create", {"LastName": f"n{i}"}) for i in range(20))
+    service.http.close()
+    assert len(crm.requests) == 20
+    assert crm.connections == 1
+
+def test_rate_limited_calls_are_retried_after_retry_after(fakes, monkeypatch):
+    crm = fakes(FakeCRMServer(rate_limit=5))
+    service = crm_service(monkeypatch, crm)
+    assert all(service.update_crm("salesforce", "Contact", "create", {"LastName": f"n{i}"}) for i in range(8))
+    service.http.close()
+    assert service.http.counters["rate_limited"] > 0
+    assert service.http.counters["failures"] == 0
+    assert len(crm.records) == 8
+
+def test_batcher_coalesces_concurrent_writes(fakes, monkeypatch):
+    crm = fakes(FakeCRMServer())
+    service = crm_service(monkeypatch, crm)
+    batcher = CRMBatcher(service, max_delay=0.2)
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        futures = list(pool.map(
+            lambda i: batcher.submit("salesforce", "Contact", "create", {"LastName": f"n{i}"}), range(50)
+        ))
+    results = [future.result(timeout=10) for future in futures]
+    batcher.stop()
+    service.http.close()
+    assert all(result["success"] for result in results)
+    assert len(crm.records) == 50
+    assert len(crm.requests) < 5
+    assert all("/composite/sobjects" in request["path"] for request in crm.requests)
\ No newline at end of file
@@ -0,0 +1,113 @@
+from datetime import datetime
+import asyncio
+import json
+import threading
+
+from database import SessionLocal
+from events import EventBus, stream_events
+from models import Execution
+
+def parse(body: str):
+    """The events of a Server-Sent Events body, skipping keep-alive comments."""
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+def add_finished_execution(workflow_id: int, results, **fields):
+    db = SessionLocal()
+    try:
+        execution = Execution(workflow_id=workflow_id, status="failed", started_at=datetime.utcnow(),
+                              completed_at=datetime.utcnow(), error="boom", **fields)
+        execution.results = results
+        db.add(execution)
+        db.commit()
+        return execution.id
+    finally:
+        db.close()
+
+def test_finished_execution_is_replayed_from_the_bus(client, engine, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "first"}, {"name": "second"})
+    execution_id = client.post(f"/workflows/{workflow['id']}/execute").json()["execution_id"]
+    assert wait_for_execution(execution_id)["status"] == "completed"
+
+    response = client.get(f"/executions/{execution_id}/events")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse(response.text)
+    assert [event["type"] for event in events] == [
+        "execution.started", "task.succeeded", "task.succeeded", "execution.finished"
+    ]
+    assert [event["task_id"] for event in events[1:3]] == workflow["task_ids"]
+    assert events[-1]["status"] == "completed"
+    assert [event["id"] for event in events] == sorted(event["id"] for event in events)
+
+def test_execution_from_another_process_is_replayed_from_the_database(client, create_workflow):
+    workflow = create_workflow({"name": "first"}, {"name": "second"})
+    first, second = workflow["task_ids"]
+    execution_id = add_finished_execution(workflow["id"], [
+        {"task_id": first, "status": "success", "output": {"large": "value"}},
+        {"task_id": second, "status": "failed", "error": "boom"},
+    ])
+
+    events = parse(client.get(f"/executions/{execution_id}/events").text)
+    assert [(event["type"], event.get("task_id")) for event in events] == [
+        ("task.succeeded", first), ("task.failed", second), ("execution.finished", None)
+    ]
+    assert "output" not in events[0]
+    assert events[-1]["status"] == "failed" and events[-1]["error"] == "boom"
+
+    batch_id = add_finished_execution(workflow["id"], [
+        {"record": 0, "status": "success"}, {"record": 1, "status": "failed"}, {"record": 2, "status": "success"}
+    ], record_count=3)
+    progress, finished = parse(client.get(f"/executions/{batch_id}/events").text)
+    assert progress["type"] == "execution.progress"
+    assert (progress["record_count"], progress["counts"]) == (3, {"success": 2, "failed": 1})
+    assert finished["type"] == "execution.finished"
+
+def test_missing_execution_has_no_events(client):
+    assert client.get("/executions/999999999/events").status_code == 404
+
+def test_late_subscriber_gets_the_current_state_then_live_events():
+    bus = EventBus()
+
+    async def listen():
+        bus.publish("execution.started", 1, 7, status="running")
+        bus.publish("task.started", 1, 7, task_id=10, status="running")
+        bus.publish("task.succeeded", 1, 7, task_id=10, status="success")
+        bus.publish("task.started", 1, 7, task_id=11, status="running")
+        bus.publish("execution.started", 2, 7, status="running")
+        subscription, replay = bus.subscribe(execution_id=1)
+
+        def finish():
+            bus.publish("task.succeeded", 1, 7, task_id=11, status="success")
+            bus.publish("execution.finished", 1, 7, status="completed")
+            bus.publish("execution.finished", 2, 7, status="completed")
+
+        threading.Thread(target=finish).start()
+        return [chunk async for chunk in stream_events(subscription, replay, until_finished=True)]
+
+    events = parse("".join(asyncio.run(listen())))
+    # One event per task in the replay: its latest
+    assert [(event["type"], event.get("task_id")) for event in events] == [
+        ("execution.started", None), ("task.succeeded", 10), ("task.started", 11),
+        ("task.succeeded", 11), ("execution.finished", None),
+    ]
+    assert {event["execution_id"] for event in events} == {1}
+    # The stream ending unsubscribed it
+    assert bus._subscribers == []
+
+def test_finished_executions_expire_from_the_replay():
+    bus = EventBus(replay_ttl=0)
+    loop = asyncio.new_event_loop()
+
+    def replay(**scope):
+        subscription, events = bus.subscribe(loop=loop, **scope)
+        bus.unsubscribe(subscription)
+        return events
+
+    try:
+        bus.publish("execution.started", 1, 7, status="running")
+        assert len(replay(execution_id=1)) == 1
+        bus.publish("execution.finished", 1, 7, status="completed")
+        assert replay(execution_id=1) == []
+        assert replay(workflow_id=7) == []
+    finally:
+        loop.close()
\ No newline at end of file
@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from execution_engine import ExecutionEngine
+from models import Execution, TaskRun
+
+def add_executions(workflow_id: int, count: int, **fields):
+    fields = {"status": "queued", "started_at": datetime.utcnow(), **fields}
+    db = SessionLocal()
+    try:
+        executions = [Execution(workflow_id=workflow_id, **fields)
+                      for _ in range(count)]
+        db.add_all(executions)
+        db.commit()
+        return [execution.id for execution in executions]
+    finally:
+        db.close()
+
+def execution_rows(ids):
+    db = SessionLocal()
+    try:
+        return {execution.id: execution for execution in db.query(Execution).filter(Execution.id.in_(ids))}
+    finally:
+        db.close()
+
+def finish(ids):
+    """Mark executions a test left claimed or queued as completed, so no later engine runs them."""
+    db = SessionLocal()
+    try:
+        db.query(Execution).filter(Execution.id.in_(ids)).update({"status": "completed"}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def test_submitted_execution_is_run_by_a_worker(client, engine, recorder, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "first"}, {"name": "second"})
+    response = client.post(f"/workflows/{workflow['id']}/execute")
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+
+    execution = wait_for_execution(response.json()["execution_id"])
+    assert execution["status"] == "completed"
+    assert [result["status"] for result in execution["results"]] == ["success", "success"]
+    assert recorder.ran(execution["id"]) == ["first", "second"]
+
+def test_each_queued_execution_is_claimed_by_one_engine(create_workflow):
+    ids = add_executions(create_workflow({"name": "only"})["id"], 20)
+    engines = [ExecutionEngine(max_workers=4), ExecutionEngine(max_workers=4)]
+
+    def claim_all(engine):
+        claimed = []
+        while (execution_id := engine._claim_next()) is not None:
+            claimed.append(execution_id)
+        return claimed
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        claimed = list(pool.map(claim_all, engines))
+    try:
+        every_claim = claimed[0] + claimed[1]
+        assert len(every_claim) == len(set(every_claim))
+        assert set(ids) <= set(every_claim)
+
+        rows = execution_rows(ids)
+        for engine, claims in zip(engines, claimed):
+            for execution_id in set(ids) & set(claims):
+                assert rows[execution_id].status == "running"
+                assert rows[execution_id].claimed_by == engine.instance_id
+                assert rows[execution_id].heartbeat_at is not None
+    finally:
+        finish(every_claim)
+
+def test_expired_leases_are_recovered(client, recorder, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "done before the crash"}, {"name": "left to do"})
+    now = datetime.utcnow()
+    running = dict(status="running", claimed_by="dead-worker", heartbeat_at=now - timedelta(minutes=5))
+    requeued, = add_executions(workflow["id"], 1, deadline_at=now + timedelta(hours=1), **running)
+    cancelled, = add_executions(workflow["id"], 1, cancel_requested=True, **running)
+    timed_out, = add_executions(workflow["id"], 1, deadline_at=now - timedelta(seconds=1), **running)
+    alive, = add_executions(workflow["id"], 1, status="running", claimed_by="live-worker", heartbeat_at=now)
+    db = SessionLocal()
+    db.add(TaskRun(execution_id=requeued, task_id=workflow["task_ids"][0], status="succeeded", attempts=1,
+                   output={}, idempotency_key=f"{requeued}:{workflow['task_ids'][0]}"))
+    db.commit()
+    db.close()
+
+    engine = ExecutionEngine(lease_timeout=60)
+    try:
+        assert engine.recover_stale(now=now) >= 3
+        rows = execution_rows([requeued, cancelled, timed_out, alive])
+        assert rows[requeued].status == "queued"
+        assert rows[requeued].claimed_by is None
+        # The deadline survives the requeue, so the execution doesn't get a fresh timeout
+        assert rows[requeued].deadline_at is not None
+        assert rows[cancelled].status == "cancelled"
+        assert rows[timed_out].status == "timed_out"
+        assert rows[alive].status == "running"
+        assert rows[alive].claimed_by == "live-worker"
+
+        # The requeued execution picks up from its saved task runs
+        engine.start()
+        assert wait_for_execution(requeued)["status"] == "completed"
+        assert recorder.ran(requeued) == ["left to do"]
+    finally:
+        engine.stop(timeout=5)
+        finish([alive])
\ No newline at end of file
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+import csv
+import io
+import json
+
+from database import SessionLocal
+from models import Workflow, Execution
+from routers import executions as executions_router
+
+START = datetime(2024, 3, 1, 12, 0, 0)
+
+def seed():
+    """A workflow with five finished executions an hour apart, every other one failed."""
+    db = SessionLocal()
+    try:
+        workflow = Workflow(name="exported", description="")
+        db.add(workflow)
+        db.flush()
+        for i in range(5):
+            execution = Execution(workflow_id=workflow.id, status="failed" if i % 2 else "completed",
+                                  started_at=START + timedelta(hours=i),
+                                  completed_at=START + timedelta(hours=i, seconds=1),
+                                  error="boom" if i % 2 else None)
+            execution.results = [{"task_id": 1, "status": "failed" if i % 2 else "success", "run": i}]
+            db.add(execution)
+        db.commit()
+        return workflow.id
+    finally:
+        db.close()
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_ndjson_export_streams_every_batch_in_id_order(client, monkeypatch):
+    monkeypatch.setattr(executions_router, "EXPORT_BATCH_SIZE", 2)
+    workflow_id = seed()
+    response = client.get("/executions/export", params={"workflow_id": workflow_id})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["content-disposition"] == "attachment; filename=executions.ndjson"
+
+    rows = ndjson(response)
+    assert len(rows) == 5
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    assert set(rows[0]) == set(executions_router.EXPORT_COLUMNS)
+    assert rows[0]["started_at"] == START.isoformat()
+    assert [row["status"] for row in rows] == ["completed", "failed", "completed", "failed", "completed"]
+
+def test_export_filters_and_results(client):
+    workflow_id = seed()
+    rows = ndjson(client.get("/executions/export", params={
+        "workflow_id": workflow_id, "status": "completed", "include_results": True,
+        "started_after": (START + timedelta(hours=1)).isoformat(),
+        "started_before": (START + timedelta(hours=4)).isoformat(),
+    }))
+    assert [row["started_at"] for row in rows] == [(START + timedelta(hours=2)).isoformat()]
+    assert rows[0]["results"] == [{"task_id": 1, "status": "success", "run": 2}]
+
+def test_csv_export(client):
+    workflow_id = seed()
+    response = client.get("/executions/export", params={"workflow_id": workflow_id, "format": "csv",
+                                                       "include_results": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == executions_router.EXPORT_COLUMNS + ["results"]
+    assert len(rows) == 6
+    assert rows[2][2:] == ["failed", (START + timedelta(hours=1)).isoformat(),
+                           (START + timedelta(hours=1, seconds=1)).isoformat(), "boom",
+                           json.dumps([{"task_id": 1, "status": "failed", "run": 1}])]
+
+def test_unsupported_export_format_is_rejected(client):
+    response = client.get("/executions/export", params={"format": "xml"})
+    assert response.status_code == 400
\ No newline at end of file
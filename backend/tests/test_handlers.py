@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import asyncio
+import threading
+import time
+
+import pytest
+
+from handlers import (
+    HANDLERS, TaskHandler, TaskContext, CancelToken, TaskCancelled, register_handler, get_handler, dispatch
+)
+
+def make_task(task_type: str, task_id: int = 1, timeout=None, **config):
+    return SimpleNamespace(id=task_id, name=f"task {task_id}", task_type=task_type, config=config, timeout=timeout)
+
+@pytest.fixture
+def register(monkeypatch):
+    """Register handler classes for one test only."""
+    def add(handler_class):
+        monkeypatch.setitem(HANDLERS, handler_class.task_type, None)
+        return register_handler(handler_class)
+
+    return add
+
+def test_built_in_task_types_are_registered():
+    for task_type in ("email", "google_sheets", "google_calendar", "crm_update", "employee_assignment",
+                      "api_call", "file_upload"):
+        assert get_handler(task_type).task_type == task_type
+
+def test_unknown_task_type_raises():
+    with pytest.raises(ValueError, match="Unknown task type: no_such_type"):
+        get_handler("no_such_type")
+    with pytest.raises(ValueError):
+        dispatch(make_task("no_such_type"))
+
+def test_dispatch_runs_the_registered_handler(register):
+    class Echo(TaskHandler):
+        task_type = "test_echo"
+
+        def run(self, task, context):
+            return {"config": task.config, "attempt": context.attempt}
+
+    class AsyncEcho(TaskHandler):
+        task_type = "test_async_echo"
+        is_async = True
+
+        async def run(self, task, context):
+            await asyncio.sleep(0.01)
+            return {"config": task.config, "loop": threading.current_thread().name}
+
+    register(Echo)
+    register(AsyncEcho)
+    assert isinstance(get_handler("test_echo"), Echo)
+    assert dispatch(make_task("test_echo", value=1), TaskContext(attempt=2)) == {"config": {"value": 1}, "attempt": 2}
+    assert dispatch(make_task("test_async_echo", value=2)) == {"config": {"value": 2}, "loop": "task-handler-loop"}
+
+def test_dispatch_stops_waiting_on_timeout_and_cancellation(register):
+    class Slow(TaskHandler):
+        task_type = "test_slow"
+
+        def run(self, task, context):
+            # Ignores its token, like a handler blocked in I/O, so only dispatch can stop waiting
+            time.sleep(0.5)
+
+    register(Slow)
+    with pytest.raises(TimeoutError):
+        dispatch(make_task("test_slow", timeout=0.05))
+
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel, args=("cancelled",)).start()
+    started = time.monotonic()
+    with pytest.raises(TaskCancelled):
+        dispatch(make_task("test_slow"), TaskContext(cancel_token=token))
+    assert time.monotonic() - started < 0.5
+
+def test_max_concurrency_bounds_runs_of_a_task_type(register):
+    class Limited(TaskHandler):
+        task_type = "test_limited"
+        max_concurrency = 2
+
+        def __init__(self):
+            super().__init__()
+            self.running = 0
+            self.most = 0
+            self.lock = threading.Lock()
+
+        def run(self, task, context):
+            with self.lock:
+                self.running += 1
+                self.most = max(self.most, self.running)
+            time.sleep(0.05)
+            with self.lock:
+                self.running -= 1
+
+    register(Limited)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(dispatch, [make_task("test_limited", task_id) for task_id in range(6)]))
+    assert get_handler("test_limited").most == 2
+
+def test_task_with_an_unknown_type_is_rejected(client, create_workflow):
+    workflow = create_workflow({"name": "only"})
+    response = client.post("/tasks/", json={
+        "workflow_id": workflow["id"], "name": "odd", "task_type": "no_such_type", "config": {}, "order": 2
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown task type: no_such_type"
\ No newline at end of file
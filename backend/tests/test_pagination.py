@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from models import Execution
+from pagination import NEXT_CURSOR_HEADER
+
+def pages(client, path: str, limit: int, between_pages=None):
+    """Follow the cursor header from the first page to the last; returns each page's ids."""
+    ids, cursor = [], None
+    while True:
+        response = client.get(path, params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids.append([item["id"] for item in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+        if between_pages:
+            between_pages()
+
+def test_workflow_pages_cover_every_workflow_once(client):
+    created = [client.post("/workflows/", json={"name": f"paged {i}", "description": ""}).json()["id"]
+               for i in range(5)]
+    seen = [workflow_id for page in pages(client, "/workflows/", 2) for workflow_id in page]
+    assert seen == sorted(seen)
+    assert set(created) <= set(seen)
+    assert len(seen) == len(set(seen))
+
+def test_execution_pages_stay_put_when_started_at_is_rewritten(client):
+    workflow_id = client.post("/workflows/", json={"name": "paged executions", "description": ""}).json()["id"]
+    db = SessionLocal()
+    start = datetime.utcnow() - timedelta(hours=1)
+    executions = [Execution(workflow_id=workflow_id, status="queued", started_at=start + timedelta(minutes=i))
+                  for i in range(7)]
+    db.add_all(executions)
+    db.commit()
+    execution_ids = sorted(execution.id for execution in executions)
+    claims = iter(execution_ids)
+
+    def claim_oldest():
+        # What the engine does when a worker claims a queued execution
+        db.query(Execution).filter(Execution.id == next(claims)).update(
+            {"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+
+    seen = pages(client, f"/executions/workflow/{workflow_id}", 2, between_pages=claim_oldest)
+    db.close()
+    assert [execution_id for page in seen for execution_id in page] == execution_ids[::-1]
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/executions/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/workflows/", params={"cursor": "not-a-cursor"}).status_code == 400
\ No newline at end of file
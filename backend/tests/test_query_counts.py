@@ -0,0 +1,23 @@
+from collections import defaultdict
+import pytest
+
+from benchmarks.query_counts import QUERY_BUDGETS, check_endpoint, import_body, seed
+
+@pytest.fixture(scope="module")
+def api():
+    from fastapi.testclient import TestClient
+    from benchmarks.pipeline import build_app
+    from execution_engine import execution_engine
+
+    request_stats = defaultdict(list)
+    client = TestClient(build_app(request_stats))
+    sizes = {"small": seed(2, 2), "large": seed(50, 300)}
+    bodies = {"small": import_body(2, 2), "large": import_body(100, 50)}
+    yield client, request_stats, sizes, bodies
+    execution_engine.stop(timeout=5)
+
+@pytest.mark.parametrize("endpoint", list(QUERY_BUDGETS))
+def test_query_budget(api, endpoint):
+    client, request_stats, sizes, bodies = api
+    counts, failures = check_endpoint(client, request_stats, endpoint, sizes, bodies)
+    assert not failures, counts
\ No newline at end of file
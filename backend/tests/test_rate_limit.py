@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fakes.crm_server import FakeCRMServer
+from services.crm_service import CRMService
+from services.rate_limit import RateGovernor
+
+def test_shared_database_bucket_keeps_workers_under_the_quota(fakes, monkeypatch):
+    crm = fakes(FakeCRMServer(rate_limit=20))
+    monkeypatch.setenv("SALESFORCE_API_KEY", "quota")
+    monkeypatch.setenv("SALESFORCE_BASE_URL", f"{crm.url}/salesforce")
+    # Stay a little under the quota; the fake counts in fixed one-second windows
+    limits = {"salesforce": {"rate": 15, "burst": 5, "concurrency": 4}}
+    services = []
+    for _ in range(2):
+        service = CRMService()
+        service.http.governor = RateGovernor(limits, backend="database")
+        services.append(service)
+
+    def write(i):
+        return services[i % 2].update_crm("salesforce", "Contact", "create", {"LastName": f"n{i}"})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outcomes = list(pool.map(write, range(30)))
+    for service in services:
+        service.http.close()
+    assert all(outcomes)
+    assert sum(service.http.counters["rate_limited"] for service in services) == 0
+    assert sum(service.http.governor.stats()["salesforce"]["waits"] for service in services) > 0
+
+def test_retry_after_is_honoured_when_the_integration_is_unlimited(fakes, monkeypatch):
+    crm = fakes(FakeCRMServer(rate_limit=2))
+    monkeypatch.setenv("SALESFORCE_API_KEY", "unlimited")
+    monkeypatch.setenv("SALESFORCE_BASE_URL", f"{crm.url}/salesforce")
+    service = CRMService()
+    # A rate of 0 leaves nothing for the governor to pause, so the client has to sleep instead
+    service.http.governor = RateGovernor({"salesforce": {"rate": 0, "burst": 0, "concurrency": 0}})
+    assert service.http.governor.pause("salesforce", "unlimited", 1.0) is False
+    outcomes = [service.update_crm("salesforce", "Contact", "create", {"LastName": f"n{i}"}) for i in range(6)]
+    service.http.close()
+    assert all(outcomes)
+    assert service.http.counters["rate_limited"] > 0
+    assert service.http.counters["failures"] == 0
+    assert len(crm.records) == 6
\ No newline at end of file
@@ -0,0 +1,32 @@
+def test_resume_reruns_only_the_tasks_that_did_not_succeed(client, engine, recorder, create_workflow,
+                                                            wait_for_execution):
+    workflow = create_workflow({"name": "fetch"}, {"name": "store"})
+    recorder.failing.add("store")
+    execution_id = client.post(f"/workflows/{workflow['id']}/execute").json()["execution_id"]
+    execution = wait_for_execution(execution_id)
+    assert execution["status"] == "failed"
+    attempts = recorder.ran(execution_id).count("store")
+    assert recorder.ran(execution_id).count("fetch") == 1
+    assert attempts >= 1
+
+    recorder.failing.clear()
+    response = client.post(f"/executions/{execution_id}/resume")
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+
+    execution = wait_for_execution(execution_id)
+    assert execution["status"] == "completed"
+    assert execution["error"] is None
+    assert [result["status"] for result in execution["results"]] == ["success", "success"]
+    assert recorder.ran(execution_id).count("fetch") == 1
+    assert recorder.ran(execution_id).count("store") == attempts + 1
+
+def test_only_unsuccessful_executions_can_be_resumed(client, engine, create_workflow, wait_for_execution):
+    workflow = create_workflow({"name": "only"})
+    execution_id = client.post(f"/workflows/{workflow['id']}/execute").json()["execution_id"]
+    assert wait_for_execution(execution_id)["status"] == "completed"
+
+    response = client.post(f"/executions/{execution_id}/resume")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Execution can't be resumed while completed"
+    assert client.post("/executions/999999999/resume").status_code == 404
\ No newline at end of file
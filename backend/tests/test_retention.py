@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+import os
+
+import retention
+from database import SessionLocal
+from models import (
+    Workflow, Task, Execution, ExecutionInput, TaskRun, ScheduledFire, ExecutionArchive, ExecutionDailyStats
+)
+
+NOW = datetime.utcnow()
+
+def old_execution(db, workflow: Workflow, task: Task, days_ago: int) -> Execution:
+    started_at = NOW - timedelta(days=days_ago)
+    execution = Execution(workflow_id=workflow.id, status="completed", started_at=started_at,
+                          completed_at=started_at + timedelta(seconds=2), record_count=2)
+    execution.results = [{"index": 0, "status": "completed"}, {"index": 1, "status": "completed"}]
+    execution.input = ExecutionInput(records=[{"name": "a"}, {"name": "b"}], concurrency=2)
+    db.add(execution)
+    db.flush()
+    db.add(TaskRun(execution_id=execution.id, task_id=task.id, status="succeeded", attempts=1,
+                   output={"sent": True}, idempotency_key=f"{execution.id}:{task.id}"))
+    return execution
+
+def seed(db, days_ago: int):
+    workflow = Workflow(name="retention", description="")
+    workflow.tasks = [Task(name="mail", task_type="email", config={}, order=1)]
+    db.add(workflow)
+    db.flush()
+    execution = old_execution(db, workflow, workflow.tasks[0], days_ago)
+    db.add(ScheduledFire(workflow_id=workflow.id, fire_time=execution.started_at, execution_id=execution.id))
+    db.commit()
+    return workflow.id, execution.id
+
+def test_retention_is_disabled_unless_configured():
+    assert retention.RETENTION_DAYS == 0
+    db = SessionLocal()
+    _, execution_id = seed(db, days_ago=400)
+    db.close()
+    assert retention.run_retention(now=NOW) == 0
+    db = SessionLocal()
+    assert db.query(Execution).filter(Execution.id == execution_id).count() == 1
+    db.close()
+
+def test_archived_execution_keeps_its_inputs_and_task_runs(monkeypatch, tmp_path):
+    monkeypatch.setattr(retention, "RETENTION_DAYS", 30)
+    monkeypatch.setattr(retention, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    db = SessionLocal()
+    workflow_id, execution_id = seed(db, days_ago=60)
+    db.close()
+
+    assert retention.run_retention(now=NOW) >= 1
+
+    db = SessionLocal()
+    try:
+        assert db.query(Execution).filter(Execution.id == execution_id).count() == 0
+        assert db.query(TaskRun).filter(TaskRun.execution_id == execution_id).count() == 0
+        assert db.query(ScheduledFire).filter(ScheduledFire.workflow_id == workflow_id).count() == 0
+        stats = db.query(ExecutionDailyStats).filter(ExecutionDailyStats.workflow_id == workflow_id).one()
+        assert (stats.executions, stats.completed, stats.duration_max_ms) == (1, 1, 2000.0)
+        segment = db.query(ExecutionArchive).filter(ExecutionArchive.first_execution_id <= execution_id,
+                                                   ExecutionArchive.last_execution_id >= execution_id).one()
+        assert os.path.isabs(segment.path)
+
+        # The stored path still resolves after the working directory changes
+        monkeypatch.chdir(tmp_path)
+        archived = retention.find_archived_execution(db, execution_id)
+    finally:
+        db.close()
+    assert archived["workflow_id"] == workflow_id
+    assert archived["status"] == "completed"
+    assert archived["results"][1] == {"index": 1, "status": "completed"}
+    assert archived["input"] == {"records": [{"name": "a"}, {"name": "b"}], "concurrency": 2}
+    assert [run["status"] for run in archived["task_runs"]] == ["succeeded"]
+    assert archived["task_runs"][0]["output"] == {"sent": True}
+
+def test_lookup_misses_executions_that_were_never_archived():
+    db = SessionLocal()
+    try:
+        assert retention.find_archived_execution(db, 10 ** 9) is None
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import threading
+
+from sqlalchemy import event
+
+import database
+from database import SessionLocal
+from execution_engine import execution_engine
+from models import Workflow, Execution, ScheduledFire
+from scheduler import fire_workflow
+
+def fires(workflow_id: int):
+    db = SessionLocal()
+    try:
+        return db.query(ScheduledFire).filter(ScheduledFire.workflow_id == workflow_id).all()
+    finally:
+        db.close()
+
+def executions(workflow_id: int):
+    db = SessionLocal()
+    try:
+        return db.query(Execution).filter(Execution.workflow_id == workflow_id).all()
+    finally:
+        db.close()
+
+def test_a_fire_time_is_queued_once(engine, create_workflow, wait_for_execution):
+    workflow_id = create_workflow({"name": "scheduled"})["id"]
+    scheduled_at = datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc)
+
+    fire_workflow(workflow_id, scheduled_at)
+    # Other schedulers that picked up the same fire time, one after another and at once
+    fire_workflow(workflow_id, scheduled_at)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: fire_workflow(workflow_id, scheduled_at), range(4)))
+
+    fired, = fires(workflow_id)
+    assert fired.fire_time == scheduled_at.replace(tzinfo=None)
+    execution, = executions(workflow_id)
+    assert fired.execution_id == execution.id
+    assert wait_for_execution(execution.id)["status"] == "completed"
+
+    # The next fire time is a separate run
+    fire_workflow(workflow_id, datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc))
+    assert len(fires(workflow_id)) == 2
+
+def test_inactive_workflow_does_not_fire(create_workflow):
+    workflow_id = create_workflow({"name": "paused"})["id"]
+    db = SessionLocal()
+    db.query(Workflow).filter(Workflow.id == workflow_id).update({"is_active": False})
+    db.commit()
+    db.close()
+
+    fire_workflow(workflow_id, datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc))
+    assert fires(workflow_id) == []
+    assert executions(workflow_id) == []
+
+def test_fire_and_execution_are_written_in_one_commit(engine, create_workflow, wait_for_execution):
+    workflow_id = create_workflow({"name": "scheduled"})["id"]
+    commits = []
+
+    def count(connection):
+        # Engine workers commit on their own threads while this one fires
+        if threading.get_ident() == caller:
+            commits.append(connection)
+
+    caller = threading.get_ident()
+    event.listen(database.engine, "commit", count)
+    try:
+        fire_workflow(workflow_id, datetime(2024, 5, 2, 9, 0, tzinfo=timezone.utc))
+    finally:
+        event.remove(database.engine, "commit", count)
+    assert len(commits) == 1
+
+    fired, = fires(workflow_id)
+    execution, = executions(workflow_id)
+    assert fired.execution_id == execution.id
+    assert wait_for_execution(execution.id)["status"] == "completed"
+
+def test_failed_enqueue_leaves_no_fire(monkeypatch, create_workflow):
+    workflow_id = create_workflow({"name": "scheduled"})["id"]
+    scheduled_at = datetime(2024, 5, 3, 9, 0, tzinfo=timezone.utc)
+
+    def broken_enqueue(*args, **kwargs):
+        raise RuntimeError("queue unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(execution_engine, "enqueue", broken_enqueue)
+        fire_workflow(workflow_id, scheduled_at)
+    assert fires(workflow_id) == []
+    assert executions(workflow_id) == []
\ No newline at end of file
@@ -0,0 +1,65 @@
+from datetime import datetime
+from email.mime.text import MIMEText
+
+from fakes.smtp_server import FakeSMTPServer
+from services.smtp_pool import SMTPConnectionPool
+
+def message(i: int) -> MIMEText:
+    msg = MIMEText(f"Message {i}")
+    msg["From"] = "sender@example.com"
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = f"Test {i}"
+    return msg
+
+def test_pool_reuses_one_session(fakes):
+    smtp = fakes(FakeSMTPServer())
+    pool = SMTPConnectionPool(smtp.host, smtp.port, "user", "secret", use_tls=False)
+    assert all(pool.send_message(message(i)) for i in range(20))
+    pool.close()
+    assert len(smtp.messages) == 20
+    assert smtp.connections == 1
+    assert pool.stats()["connects"] == 1
+
+def test_pool_replaces_dropped_connections(fakes):
+    smtp = fakes(FakeSMTPServer(drop_after=5))
+    pool = SMTPConnectionPool(smtp.host, smtp.port, "user", "secret", use_tls=False)
+    assert pool.send_messages([message(i) for i in range(12)]) == [True] * 12
+    pool.close()
+    assert len(smtp.messages) == 12
+    assert pool.stats()["reconnects"] == 2
+
+def test_rejected_login_fails_the_batch_without_logging_in_again(fakes):
+    smtp = fakes(FakeSMTPServer(reject_logins=True))
+    pool = SMTPConnectionPool(smtp.host, smtp.port, "user", "wrong", use_tls=False)
+    assert pool.send_messages([message(i) for i in range(10)]) == [False] * 10
+    pool.close()
+    assert smtp.connections == 1
+    assert smtp.messages == []
+
+def test_rejected_message_keeps_the_session(fakes):
+    smtp = fakes(FakeSMTPServer(error_rate=1.0))
+    pool = SMTPConnectionPool(smtp.host, smtp.port, "user", "secret", use_tls=False)
+    assert pool.send_messages([message(i) for i in range(5)]) == [False] * 5
+    pool.close()
+    assert smtp.connections == 1
+    assert pool.stats()["reconnects"] == 0
+
+def test_batched_assignments_share_pooled_sessions(fakes, monkeypatch):
+    smtp = fakes(FakeSMTPServer())
+    monkeypatch.setenv("SMTP_SERVER", smtp.host)
+    monkeypatch.setenv("SMTP_PORT", str(smtp.port))
+    monkeypatch.setenv("SMTP_USERNAME", "user@example.com")
+    monkeypatch.setenv("SMTP_PASSWORD", "secret")
+    monkeypatch.setenv("SMTP_STARTTLS", "false")
+    from services.employee_service import EmployeeService
+
+    service = EmployeeService()
+    assignments = [
+        {"assignee_email": f"employee{i}@example.com", "title": f"Assignment {i}",
+         "description": "Test", "due_date": datetime(2030, 1, 1)}
+        for i in range(30)
+    ]
+    assert service.create_assignments(assignments) == [True] * 30
+    service.smtp_pool.close()
+    assert len(smtp.messages) == 30
+    assert smtp.connections <= service.smtp_pool.max_size
\ No newline at end of file
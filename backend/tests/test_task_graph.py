@@ -0,0 +1,50 @@
+def results_by_name(execution, workflow, *names):
+    by_id = {result["task_id"]: result for result in execution["results"]}
+    return {name: by_id[task_id] for name, task_id in zip(names, workflow["task_ids"])}
+
+def runs_by_name(recorder, execution_id):
+    return {run["name"]: run for run in recorder.runs if run["execution_id"] == execution_id}
+
+def test_independent_tasks_run_side_by_side(client, engine, recorder, create_workflow, wait_for_execution):
+    workflow = create_workflow(
+        {"name": "left", "config": {"seconds": 0.3}, "depends_on": []},
+        {"name": "right", "config": {"seconds": 0.3}, "depends_on": []},
+        {"name": "join", "depends_on": ["left", "right"]},
+    )
+    execution_id = client.post(f"/workflows/{workflow['id']}/execute").json()["execution_id"]
+    assert wait_for_execution(execution_id)["status"] == "completed"
+
+    runs = runs_by_name(recorder, execution_id)
+    left, right, join = runs["left"], runs["right"], runs["join"]
+    assert left["started"] < right["finished"] and right["started"] < left["finished"]
+    assert join["started"] >= max(left["finished"], right["finished"])
+
+def test_dependents_of_a_failed_task_are_skipped(client, engine, recorder, create_workflow, wait_for_execution):
+    workflow = create_workflow(
+        {"name": "breaks", "depends_on": []},
+        {"name": "needs it", "depends_on": ["breaks"]},
+    )
+    recorder.failing.add("breaks")
+    execution = wait_for_execution(client.post(f"/workflows/{workflow['id']}/execute").json()["execution_id"])
+
+    assert execution["status"] == "failed"
+    results = results_by_name(execution, workflow, "breaks", "needs it")
+    assert results["breaks"]["status"] == "failed"
+    assert results["needs it"]["status"] == "skipped"
+    assert "needs it" not in recorder.ran(execution["id"])
+
+def test_unknown_dependency_is_rejected(client, create_workflow):
+    workflow = create_workflow({"name": "only"})
+    response = client.post("/tasks/", json={
+        "workflow_id": workflow["id"], "name": "dangling", "task_type": "test_wait", "config": {}, "order": 2,
+        "depends_on": [999999]
+    })
+    assert response.status_code == 400
+    assert "unknown tasks" in response.json()["detail"]
+    tasks = client.get(f"/tasks/workflow/{workflow['id']}").json()
+    assert [task["name"] for task in tasks] == ["only"]
+
+    response = client.post("/workflows/bulk", json={"name": "dangling", "description": "", "tasks": [
+        {"name": "only", "task_type": "test_wait", "config": {}, "order": 1, "depends_on": ["missing"]}
+    ]})
+    assert response.status_code == 400
\ No newline at end of file
@@ -0,0 +1,75 @@
+import json
+import uuid
+
+from database import SessionLocal
+from models import Workflow
+
+def definition(name, *tasks, **fields):
+    return {"name": name, "description": "", **fields, "tasks": [
+        {"task_type": "test_wait", "config": {}, "order": order, **task}
+        for order, task in enumerate(tasks, start=1)
+    ]}
+
+def unique(prefix):
+    return f"{prefix} {uuid.uuid4().hex[:8]}"
+
+def stored(*names):
+    db = SessionLocal()
+    try:
+        return db.query(Workflow).filter(Workflow.name.in_(names)).count()
+    finally:
+        db.close()
+
+def ndjson(*definitions):
+    return "\n".join(json.dumps(item) for item in definitions).encode()
+
+def test_import_creates_every_workflow_with_its_dependencies(client):
+    names = [unique("imported"), unique("imported")]
+    response = client.post("/workflows/import", content=ndjson(
+        definition(names[0], {"name": "a", "depends_on": []}, {"name": "b", "depends_on": ["a"]}),
+        definition(names[1], {"name": "only"}),
+    ), headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200, response.text
+    first, second = response.json()
+    assert len(first["task_ids"]) == 2 and len(second["task_ids"]) == 1
+
+    tasks = client.get(f"/tasks/workflow/{first['id']}").json()
+    assert [(task["id"], task["depends_on"]) for task in tasks] == [
+        (first["task_ids"][0], []), (first["task_ids"][1], [first["task_ids"][0]])
+    ]
+    assert client.get(f"/workflows/{second['id']}").json()["name"] == names[1]
+
+def test_invalid_definition_reports_every_problem(client):
+    name = unique("invalid")
+    response = client.post("/workflows/bulk", json=definition(
+        name, {"name": "twice"}, {"name": "twice"}, {"name": "odd", "task_type": "no_such_type"},
+        schedule="not a cron"
+    ))
+    assert response.status_code == 400
+    errors = response.json()["detail"]
+    assert len(errors) == 3
+    assert any("invalid schedule" in error for error in errors)
+    assert f"workflow 0 ({name}): duplicate task name: twice" in errors
+    assert f"workflow 0 ({name}): task odd: unknown task type: no_such_type" in errors
+    assert stored(name) == 0
+
+def test_import_is_all_or_nothing(client):
+    good, cyclic = unique("good"), unique("cyclic")
+    response = client.post("/workflows/import", content=ndjson(
+        definition(good, {"name": "only"}),
+        definition(cyclic, {"name": "a", "depends_on": ["b"]}, {"name": "b", "depends_on": ["a"]}),
+    ))
+    assert response.status_code == 400
+    error, = response.json()["detail"]
+    assert error.startswith(f"workflow 1 ({cyclic}): Task dependencies contain a cycle")
+    assert stored(good, cyclic) == 0
+
+def test_unparseable_lines_are_reported_by_number(client):
+    good = unique("good")
+    body = ndjson(definition(good, {"name": "only"})) + b"\n\nnot json\n" + json.dumps({"description": ""}).encode()
+    response = client.post("/workflows/import", content=body)
+    assert response.status_code == 400
+    errors = response.json()["detail"]
+    assert [error.split(":")[0] for error in errors] == ["line 3", "line 4"]
+    assert "name" in errors[1]
+    assert stored(good) == 0
\ No newline at end of file
@@ -0,0 +1,63 @@
+import pytest
+
+from database import SessionLocal
+from handlers import HANDLERS
+from models import Workflow, Task
+from workflow_plans import PlanCache, bump_revision
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+def add_workflow(db, *task_types: str, workflow_id=None) -> Workflow:
+    workflow = Workflow(id=workflow_id, name="planned", description="")
+    workflow.tasks = [Task(name=f"task {i}", task_type=task_type, config={"step": i}, order=i)
+                      for i, task_type in enumerate(task_types)]
+    db.add(workflow)
+    db.commit()
+    return workflow
+
+def revision(db, workflow_id: int) -> str:
+    return db.query(Workflow.revision).filter(Workflow.id == workflow_id).scalar()
+
+def test_plan_is_reused_until_the_revision_changes(db):
+    cache = PlanCache()
+    workflow_id = add_workflow(db, "email", "api_call").id
+    plan = cache.get(db, workflow_id, revision(db, workflow_id))
+    assert [task.task_type for task in plan.tasks] == ["email", "api_call"]
+    assert cache.get(db, workflow_id, revision(db, workflow_id)) is plan
+
+    db.query(Task).filter(Task.workflow_id == workflow_id, Task.task_type == "api_call").update(
+        {"task_type": "crm_update"}, synchronize_session=False
+    )
+    bump_revision(db, workflow_id)
+    db.commit()
+    replanned = cache.get(db, workflow_id, revision(db, workflow_id))
+    assert replanned is not plan
+    assert [task.task_type for task in replanned.tasks] == ["email", "crm_update"]
+
+def test_reused_workflow_id_gets_a_new_plan(db):
+    cache = PlanCache()
+    workflow = add_workflow(db, "email")
+    workflow_id, old_revision = workflow.id, workflow.revision
+    cache.get(db, workflow_id, old_revision)
+    db.query(Task).filter(Task.workflow_id == workflow_id).delete()
+    db.query(Workflow).filter(Workflow.id == workflow_id).delete()
+    db.commit()
+
+    add_workflow(db, "api_call", workflow_id=workflow_id)
+    assert revision(db, workflow_id) != old_revision
+    plan = cache.get(db, workflow_id, revision(db, workflow_id))
+    assert [task.task_type for task in plan.tasks] == ["api_call"]
+
+def test_handlers_are_resolved_when_the_plan_is_compiled(db):
+    cache = PlanCache()
+    workflow_id = add_workflow(db, "email", "google_sheets").id
+    plan = cache.get(db, workflow_id, revision(db, workflow_id))
+    assert {plan.handlers[task.id] for task in plan.tasks} == {HANDLERS["email"], HANDLERS["google_sheets"]}
+
+    broken_id = add_workflow(db, "email", "no_such_handler").id
+    with pytest.raises(ValueError, match="Unknown task type: no_such_handler"):
+        cache.get(db, broken_id, revision(db, broken_id))
\ No newline at end of file
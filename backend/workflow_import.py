@@ -0,0 +1,131 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from types import SimpleNamespace
+from typing import Dict, Any, List
+from models import Workflow, Task, new_revision
+from schemas import WorkflowImport
+from task_graph import topological_order
+from handlers import HANDLERS
+from scheduler import workflow_trigger
+
+WORKFLOW_COLUMNS = ("name", "description", "schedule", "max_concurrency", "timeout", "is_active")
+TASK_COLUMNS = ("name", "task_type", "config", "order", "timeout")
+# Workflows per IN (...) when reading back ids; stays under SQLite's bound parameter limit
+IMPORT_ID_BATCH = 500
+
+class InvalidImport(ValueError):
+    """Raised when workflow definitions fail validation; ``errors`` lists every problem found."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+def parse_ndjson(body: bytes) -> List[WorkflowImport]:
+    """One workflow definition per non-blank line; raises InvalidImport naming every bad line."""
+    definitions, errors = [], []
+    for number, line in enumerate(body.decode("utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            definitions.append(WorkflowImport.parse_raw(line))
+        except ValidationError as e:
+            problems = ", ".join(
+                ": ".join(part for part in (".".join(str(loc) for loc in error["loc"] if loc != "__root__"), error["msg"]) if part)
+                for error in e.errors()
+            )
+            errors.append(f"line {number}: {problems}")
+    if errors:
+        raise InvalidImport(errors)
+    return definitions
+
+def definition_errors(definition: WorkflowImport) -> List[str]:
+    """Problems with one definition that would otherwise only surface as it is created."""
+    errors = []
+    if definition.schedule:
+        try:
+            workflow_trigger(definition.schedule)
+        except ValueError as e:
+            errors.append(f"invalid schedule: {str(e)}")
+
+    names = set()
+    for task in definition.tasks:
+        if task.name in names:
+            errors.append(f"duplicate task name: {task.name}")
+        names.add(task.name)
+        if task.task_type not in HANDLERS:
+            errors.append(f"task {task.name}: unknown task type: {task.task_type}")
+    if errors:
+        return errors
+
+    # Task names stand in for ids, so the graph can be checked before anything is inserted
+    try:
+        topological_order([
+            SimpleNamespace(id=task.name, order=task.order, depends_on=task.depends_on)
+            for task in definition.tasks
+        ])
+    except ValueError as e:
+        errors.append(str(e))
+    return errors
+
+def validate_definitions(definitions: List[WorkflowImport]):
+    """Check every definition up front; raises InvalidImport listing all problems."""
+    errors = [
+        f"workflow {index} ({definition.name}): {error}"
+        for index, definition in enumerate(definitions)
+        for error in definition_errors(definition)
+    ]
+    if errors:
+        raise InvalidImport(errors)
+
+def import_workflows(db: Session, definitions: List[WorkflowImport]) -> List[Dict[str, Any]]:
+    """Insert validated definitions with their tasks; returns each workflow's id and task ids.
+
+    Workflows and then tasks each go in with a single executemany, and
+    their ids are read back with one query per ``IMPORT_ID_BATCH``
+    workflows, since RETURNING in parameter order falls back to a statement
+    per row on SQLite. Workflows are matched by the revision generated for
+    each here, tasks by workflow and (validated unique) name. One more
+    executemany then resolves ``depends_on`` names to the new ids. Nothing
+    is refreshed and nothing is committed; the caller commits, so the whole
+    import lands or none of it does.
+    """
+    if not definitions:
+        return []
+    revisions = [new_revision() for _ in definitions]
+    db.execute(Workflow.__table__.insert(), [
+        dict({column: getattr(definition, column) for column in WORKFLOW_COLUMNS}, revision=revision)
+        for definition, revision in zip(definitions, revisions)
+    ])
+    ids_by_revision = {}
+    for start in range(0, len(revisions), IMPORT_ID_BATCH):
+        rows = db.query(Workflow.id, Workflow.revision).filter(Workflow.revision.in_(revisions[start:start + IMPORT_ID_BATCH]))
+        ids_by_revision.update({revision: workflow_id for workflow_id, revision in rows})
+    workflow_ids = [ids_by_revision[revision] for revision in revisions]
+
+    task_rows = [
+        dict({column: getattr(task, column) for column in TASK_COLUMNS}, workflow_id=workflow_id)
+        for workflow_id, definition in zip(workflow_ids, definitions)
+        for task in definition.tasks
+    ]
+    task_ids = {}
+    if task_rows:
+        db.execute(Task.__table__.insert(), task_rows)
+        for start in range(0, len(workflow_ids), IMPORT_ID_BATCH):
+            batch = workflow_ids[start:start + IMPORT_ID_BATCH]
+            rows = db.query(Task.id, Task.workflow_id, Task.name).filter(Task.workflow_id.in_(batch))
+            task_ids.update({(workflow_id, name): task_id for task_id, workflow_id, name in rows})
+
+    results, dependencies = [], []
+    for workflow_id, definition in zip(workflow_ids, definitions):
+        ids = [task_ids[(workflow_id, task.name)] for task in definition.tasks]
+        for task, task_id in zip(definition.tasks, ids):
+            if task.depends_on is not None:
+                dependencies.append({
+                    "id": task_id,
+                    "depends_on": [task_ids[(workflow_id, name)] for name in task.depends_on]
+                })
+        results.append({"id": workflow_id, "task_ids": ids})
+    if dependencies:
+        db.execute(update(Task), dependencies)
+    return results
\ No newline at end of file
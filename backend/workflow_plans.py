@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from sqlalchemy.orm import Session, joinedload
+from typing import Dict, List, Optional
+from models import Workflow, Task, new_revision
+from handlers import TaskHandler, get_handler, task_config
+from task_graph import topological_order, resolve_dependencies
+from metrics import Counter
+import threading
+import os
+
+PLAN_CACHE_REQUESTS = Counter(
+    "workflow_plan_cache_requests_total",
+    "Compiled workflow plan lookups, by whether the cached plan could be used",
+    ["result"]
+)
+
+class WorkflowPlan:
+    """A workflow definition compiled for running.
+
+    Holds detached copies of the workflow's tasks with their configs
+    parsed, in run order, their dependency graph and the handler each task
+    runs with, so a task type without a registered handler fails here
+    rather than when its task is reached. Plans are shared by every
+    execution of the same workflow ``revision`` and must be treated as
+    read-only.
+    """
+
+    def __init__(self, workflow: Workflow, tasks: List[Task]):
+        self.workflow_id = workflow.id
+        self.revision = workflow.revision
+        self.timeout = workflow.timeout
+        self.max_concurrency = workflow.max_concurrency
+        for task in tasks:
+            # Older rows stored config as a JSON string; parse it once here, not on every run
+            task.config = task_config(task)
+        self.tasks = topological_order(tasks)
+        self.dependencies = resolve_dependencies(tasks)
+        self.handlers: Dict[int, TaskHandler] = {task.id: get_handler(task.task_type) for task in tasks}
+
+class PlanCache:
+    """In-process cache of compiled workflow plans, keyed by workflow id and revision.
+
+    ``Workflow.revision`` is a random token replaced (see ``bump_revision``)
+    in the same transaction as any change to a workflow's definition, and
+    a new workflow gets a fresh one. A caller passes the revision it read
+    and gets the cached plan only if it matches, otherwise the definition
+    is loaded and compiled again. Every process keeps its own cache, and no
+    process can run a stale definition, even one of a deleted workflow
+    whose id was reused. The engine reads the revision together with the
+    execution row, so a cache hit costs no extra queries.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._plans: "OrderedDict[int, WorkflowPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, workflow_id: int, revision: Optional[str]) -> WorkflowPlan:
+        """Return the plan for ``revision`` of a workflow; raises ValueError if it can't be compiled."""
+        with self._lock:
+            plan = self._plans.get(workflow_id)
+            if plan is not None and revision is not None and plan.revision == revision:
+                self._plans.move_to_end(workflow_id)
+                PLAN_CACHE_REQUESTS.inc(result="hit")
+                return plan
+        PLAN_CACHE_REQUESTS.inc(result="miss")
+
+        # The revision and the tasks come from one query, so the plan matches the revision it is stored under
+        workflow = db.query(Workflow).options(joinedload(Workflow.tasks)).filter(Workflow.id == workflow_id).first()
+        if workflow is None:
+            raise ValueError(f"Workflow {workflow_id} not found")
+        tasks = list(workflow.tasks)
+        for task in tasks:
+            db.expunge(task)
+        db.expunge(workflow)
+        plan = WorkflowPlan(workflow, tasks)
+
+        if plan.revision is None:
+            return plan
+        with self._lock:
+            # Revisions aren't ordered; a plan stored by a slower, older load just misses next time
+            self._plans[workflow_id] = plan
+            self._plans.move_to_end(workflow_id)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+        return plan
+
+    def invalidate(self, workflow_id: int):
+        """Drop this process's plan for a workflow, e.g. once it is deleted."""
+        with self._lock:
+            self._plans.pop(workflow_id, None)
+
+def bump_revision(db: Session, workflow_id: int):
+    """Mark a workflow's definition as changed; call in the transaction that changes it."""
+    db.query(Workflow).filter(Workflow.id == workflow_id).update(
+        {Workflow.revision: new_revision()}, synchronize_session=False
+    )
+
+plan_cache = PlanCache(max_size=int(os.getenv('WORKFLOW_PLAN_CACHE_SIZE', 1000)))
\ No newline at end of file